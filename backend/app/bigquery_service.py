@@ -1,12 +1,15 @@
-import os, re, json
-from typing import Any, Dict, List, Optional
+import os, re, json, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from google.cloud import bigquery
 from google.oauth2 import service_account
 
 from .data_config import CANONICAL_COLUMN_ORDER, DATASET_COLUMN_CONFIG, dataset_schema
+from app import duckdb_engine
 from app.firebase import bucket, db
+from app.query_cache import cached_query
+from app.upload_metadata import data_version, get_upload_metadata_many
 from functools import lru_cache
 
 
@@ -32,6 +35,32 @@ UPLOAD_DOC_IDS = {
     "bookstore": "bookstore",
 }
 
+# BigQuery ML models behind the insight endpoints, keyed by the dataset they forecast.
+FORECAST_MODELS = {
+    "bookstore": "bookstore_inventory_forecast",
+    "amazon": "amazon_demand_forecast",
+}
+
+# Where the dashboard analytics queries run: "bigquery" (default) or "duckdb",
+# which runs the same SQL locally over the cleaned CSVs (see app/duckdb_engine.py).
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "bigquery").strip().lower()
+
+# Typed, pre-normalized fact table for all datasets, rebuilt by
+# jobs/run_bigquery_upload.py after the {dataset}_cleaned tables are loaded.
+CANONICAL_TABLE_NAME = os.getenv("BIGQUERY_CANONICAL_TABLE") or "canonical_purchases"
+
+# Daily dataset x quarter x item x merchant x category aggregates of the
+# canonical table. Time-series and period summaries read this instead of rows.
+ROLLUP_TABLE_NAME = os.getenv("BIGQUERY_ROLLUP_TABLE") or "daily_spend_rollup"
+
+# Model creation times and canonical table presence are looked up at most this
+# often; refresh_data drops them right after retraining.
+MODEL_VERSION_TTL_SECONDS = float(os.getenv("MODEL_VERSION_TTL_SECONDS") or "300")
+
+# lookup key -> {"fetched_at": <monotonic seconds>, "value": <Any>}
+_bigquery_metadata: Dict[str, Dict[str, Any]] = {}
+_bigquery_metadata_lock = threading.Lock()
+
 SEARCH_TOKEN_PATTERN = re.compile(r'(\w+):"([^"]+)"|(\w+):(\S+)')
 CANONICAL_SQL_ALIASES = {
     "Transaction Date": "transaction_date",
@@ -90,17 +119,131 @@ def _amazon_gift_card_condition() -> str:
 
 def _latest_upload_metadata(dataset: str) -> Optional[Dict[str, Any]]:
     """Return the storage metadata for the dataset CSV BigQuery should read."""
-    upload_id = UPLOAD_DOC_IDS.get(dataset)
-    if not upload_id:
-        return None
+    return _latest_upload_metadata_many([dataset]).get(dataset)
+
+
+def _latest_upload_metadata_many(datasets: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Return upload metadata for several datasets from the shared TTL cache in one lookup."""
+    if QUERY_ENGINE == "duckdb":
+        local_paths = duckdb_engine.cleaned_csv_paths()
+        return {
+            dataset: {"storagePath": local_paths[dataset], "upload_id": dataset} if dataset in local_paths else None
+            for dataset in datasets
+        }
+
+    upload_ids = {dataset: UPLOAD_DOC_IDS.get(dataset) for dataset in datasets}
+    metadata = get_upload_metadata_many([upload_id for upload_id in upload_ids.values() if upload_id])
+    return {
+        dataset: metadata.get(upload_id) if upload_id else None
+        for dataset, upload_id in upload_ids.items()
+    }
+
+
+def _query_datasets(dataset: str) -> List[str]:
+    """Return the datasets a query over `dataset` reads, or [] for an unknown name."""
+    try:
+        normalized_dataset = _normalize_dataset(dataset)
+    except ValueError:
+        return []
+    return list(UPLOAD_DOC_IDS) if normalized_dataset == "overall" else [normalized_dataset]
+
+
+def _cached_bigquery_metadata(key: str, fetch: Callable[[], Any]) -> Any:
+    """Return fetch() for a BigQuery metadata lookup, reused for MODEL_VERSION_TTL_SECONDS."""
+    with _bigquery_metadata_lock:
+        entry = _bigquery_metadata.get(key)
+        if entry and time.monotonic() - entry["fetched_at"] < MODEL_VERSION_TTL_SECONDS:
+            return entry["value"]
+
+    value = fetch()
+    with _bigquery_metadata_lock:
+        _bigquery_metadata[key] = {"fetched_at": time.monotonic(), "value": value}
+    return value
+
+
+def _model_version(model_name: str, dev_mode: bool) -> str:
+    """Return the creation time of a BigQuery ML model."""
+    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
+    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
+    model_id = f"{bq_project}.{bq_dataset}.{model_name}{'_dev' if dev_mode else ''}"
+
+    def fetch() -> str:
+        try:
+            created = _bigquery_client().get_model(model_id).created
+            return created.isoformat() if created else "unknown"
+        except Exception as model_error:
+            print(f"[WARN] Could not read model metadata for {model_id}: {model_error}")
+            return "unknown"
+
+    return _cached_bigquery_metadata(f"model:{model_id}", fetch)
+
+
+def _table_id(table_name: str) -> str:
+    """Qualify a table name for the active query engine."""
+    if QUERY_ENGINE == "duckdb":
+        return table_name
+    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
+    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
+    return f"{bq_project}.{bq_dataset}.{table_name}"
+
+
+def _canonical_table_id() -> str:
+    return _table_id(CANONICAL_TABLE_NAME)
+
 
-    doc = db.collection("uploads").document(upload_id).get()
-    if not doc.exists:
-        return None
+def _rollup_table_id() -> str:
+    return _table_id(ROLLUP_TABLE_NAME)
 
-    payload = doc.to_dict() or {}
-    payload["upload_id"] = upload_id
-    return payload
+
+def _table_available(table_id: str) -> bool:
+    """Return whether a materialized table exists."""
+    if QUERY_ENGINE == "duckdb":
+        return duckdb_engine.table_exists(table_id)
+
+    def fetch() -> bool:
+        try:
+            _bigquery_client().get_table(table_id)
+            return True
+        except Exception:
+            return False
+
+    return _cached_bigquery_metadata(f"table:{table_id}", fetch)
+
+
+def _canonical_table_available() -> bool:
+    return _table_available(_canonical_table_id())
+
+
+def invalidate_bigquery_metadata() -> None:
+    """Forget cached model creation times and table lookups so they are re-read."""
+    with _bigquery_metadata_lock:
+        _bigquery_metadata.clear()
+
+
+def _dataset_query_version(arguments: Dict[str, Any]) -> str:
+    """Cache version for the query_* functions: only the datasets the call reads."""
+    datasets = _query_datasets(arguments.get("dataset", "overall"))
+    if QUERY_ENGINE == "duckdb":
+        return f"duckdb:{duckdb_engine.data_version(datasets)}"
+    return data_version(datasets)
+
+
+def _forecast_version(dataset: str) -> Callable[[Dict[str, Any]], str]:
+    """Cache version for a forecast fetcher: its dataset's upload plus its model."""
+    def version(arguments: Dict[str, Any]) -> str:
+        model_version = _model_version(FORECAST_MODELS[dataset], bool(arguments.get("dev_mode")))
+        return f"{data_version([dataset])}:{model_version}"
+
+    return version
+
+
+def _item_history_version(arguments: Dict[str, Any]) -> str:
+    dataset = "amazon" if arguments.get("dataset_type") == "amazon" else "bookstore"
+    return data_version([dataset])
+
+
+def _recommendations_version(arguments: Dict[str, Any]) -> str:
+    return data_version(["amazon", "bookstore"])
 
 
 def _build_external_config(storage_uri: str) -> bigquery.ExternalConfig:
@@ -181,6 +324,18 @@ def _year_expression(column_name: str) -> str:
         f"REGEXP_EXTRACT(CAST(`{resolved_name}` AS STRING), r'(?:19|20)\\d{{2}}')"
     )
 
+def _year_range_filter(date_column: str) -> str:
+    """
+    Build the @selected_year filter as a date range so BigQuery can prune the
+    month partitions of the canonical and rollup tables.
+    """
+    return (
+        f"(@selected_year = 'All Time' OR ("
+        f"{date_column} >= SAFE.DATE(SAFE_CAST(@selected_year AS INT64), 1, 1) "
+        f"AND {date_column} < SAFE.DATE(SAFE_CAST(@selected_year AS INT64) + 1, 1, 1)))"
+    )
+
+
 def _normalized_quarter(selected_quarter: Optional[str]) -> str:
     """Normalize quarter labels from the UI/search into supported values."""
     raw = (selected_quarter or "All Quarters").strip().lower()
@@ -303,17 +458,166 @@ def _source_select_sql(table_name: str, dataset: str) -> str:
     """.strip()
 
 
-def _build_search_where(parsed_query: Dict[str, Any], category_originals: Optional[List[str]] = None) -> str:
+def _canonical_select_sql(table_name: str, dataset: str) -> str:
+    """Extend the normalized source SELECT with the condensed group and display name."""
+    condensed_group_case = _condensed_group_case_expression("s")
+    return f"""
+        SELECT
+          s.*,
+          {condensed_group_case} AS condensed_group,
+          COALESCE({condensed_group_case}, s.clean_item_name) AS display_item_name
+        FROM (
+          {_source_select_sql(table_name, dataset)}
+        ) s
+    """.strip()
+
+
+def _source_data_sql(datasets: List[str]) -> str:
+    """
+    Return the canonical rows for the given datasets.
+
+    Reads the materialized canonical table when it exists; otherwise
+    normalizes the {dataset}_cleaned tables inline.
+    """
+    return _compiled_source_data_sql(tuple(datasets), _canonical_table_available())
+
+
+@lru_cache(maxsize=64)
+def _compiled_source_data_sql(datasets: Tuple[str, ...], use_canonical: bool) -> str:
+    if use_canonical:
+        dataset_list = ", ".join(f"'{dataset}'" for dataset in datasets)
+        return f"SELECT * FROM `{_canonical_table_id()}` WHERE dataset IN ({dataset_list})"
+
+    return " UNION ALL ".join(
+        _canonical_select_sql(_table_id(f"{dataset}_cleaned"), dataset)
+        for dataset in datasets
+    )
+
+
+def build_canonical_table_sql(datasets: Optional[List[str]] = None) -> str:
+    """Build the CREATE OR REPLACE statement for the canonical fact table."""
+    source_queries = [
+        _canonical_select_sql(_table_id(f"{dataset}_cleaned"), dataset)
+        for dataset in (datasets or list(UPLOAD_DOC_IDS))
+    ]
+    return f"""
+        CREATE OR REPLACE TABLE `{_canonical_table_id()}`
+        PARTITION BY DATE_TRUNC(parsed_transaction_date, MONTH)
+        CLUSTER BY dataset, clean_item_name, vendor_name
+        AS
+        {' UNION ALL '.join(source_queries)}
+    """.strip()
+
+
+def materialize_canonical_table(datasets: Optional[List[str]] = None) -> str:
+    """Rebuild the canonical fact table from the {dataset}_cleaned tables and return its ID."""
+    _bigquery_client().query(build_canonical_table_sql(datasets)).result()
+    invalidate_bigquery_metadata()
+    return _canonical_table_id()
+
+
+# Expressions shared by the rollup build and the row-level fallback so both
+# produce identical merchant/category buckets.
+PERIOD_MERCHANT_EXPRESSION = "IFNULL(NULLIF(merchant_name, ''), IFNULL(NULLIF(vendor_name, ''), 'Unknown'))"
+PERIOD_CATEGORY_EXPRESSION = "IFNULL(NULLIF(category, ''), 'Uncategorized')"
+
+
+def build_rollup_table_sql() -> str:
+    """Build the CREATE OR REPLACE statement for the daily spend rollup."""
+    return f"""
+        CREATE OR REPLACE TABLE `{_rollup_table_id()}`
+        PARTITION BY DATE_TRUNC(transaction_day, MONTH)
+        CLUSTER BY dataset
+        AS
+        SELECT
+          dataset,
+          parsed_transaction_date AS transaction_day,
+          transaction_quarter,
+          clean_item_name,
+          {PERIOD_MERCHANT_EXPRESSION} AS merchant_name,
+          {PERIOD_CATEGORY_EXPRESSION} AS category,
+          COUNT(*) AS row_count,
+          SUM(amount) AS spend
+        FROM `{_canonical_table_id()}`
+        WHERE parsed_transaction_date IS NOT NULL
+          AND amount IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """.strip()
+
+
+def materialize_rollup_table() -> str:
+    """Rebuild the daily spend rollup from the canonical table and return its ID."""
+    _bigquery_client().query(build_rollup_table_sql()).result()
+    invalidate_bigquery_metadata()
+    return _rollup_table_id()
+
+
+def _period_facts_sql(datasets: List[str]) -> str:
+    """
+    Plan the source for day-or-coarser spend queries.
+
+    Every grain those queries expose (day/week/month/year, year and quarter
+    filters, one period's top items/merchants/categories) is a sum over the
+    daily rollup, so it is read whenever it exists. Without it, canonical rows
+    are projected into the same columns with a row_count of 1.
+    """
+    if _table_available(_rollup_table_id()):
+        return _compiled_period_facts_sql(tuple(datasets), True, True)
+    return _compiled_period_facts_sql(tuple(datasets), False, _canonical_table_available())
+
+
+@lru_cache(maxsize=64)
+def _compiled_period_facts_sql(datasets: Tuple[str, ...], use_rollup: bool, use_canonical: bool) -> str:
+    dataset_list = ", ".join(f"'{dataset}'" for dataset in datasets)
+    if use_rollup:
+        return f"""
+            SELECT dataset, transaction_day, transaction_quarter, clean_item_name,
+                   merchant_name, category, row_count, spend
+            FROM `{_rollup_table_id()}`
+            WHERE dataset IN ({dataset_list})
+        """.strip()
+
+    return f"""
+        SELECT
+          dataset,
+          parsed_transaction_date AS transaction_day,
+          transaction_quarter,
+          clean_item_name,
+          {PERIOD_MERCHANT_EXPRESSION} AS merchant_name,
+          {PERIOD_CATEGORY_EXPRESSION} AS category,
+          1 AS row_count,
+          amount AS spend
+        FROM ({_compiled_source_data_sql(datasets, use_canonical)})
+        WHERE parsed_transaction_date IS NOT NULL
+          AND amount IS NOT NULL
+    """.strip()
+
+
+def _search_shape(
+    parsed_query: Dict[str, Any], category_originals: Optional[List[str]] = None
+) -> Tuple[bool, int, int, bool]:
+    """Return which search filters a request uses; the values themselves are query parameters."""
+    return (
+        bool(parsed_query["free_text"]),
+        len(parsed_query["item_terms"]),
+        len(parsed_query["vendor_terms"]),
+        bool(category_originals),
+    )
+
+
+def _build_search_where(search_shape: Tuple[bool, int, int, bool]) -> str:
     """Build the WHERE clause used for year, text, item, vendor, and category filters."""
+    has_free_text, item_term_count, vendor_term_count, has_categories = search_shape
     clauses = [
         "clean_item_name IS NOT NULL",
         "clean_item_name != ''",
         "parsed_transaction_date IS NOT NULL",
         "(@selected_year = 'All Time' OR transaction_year = @selected_year)",
+        _year_range_filter("parsed_transaction_date"),
         "(@selected_quarter = 'All Quarters' OR transaction_quarter = @selected_quarter)",
     ]
 
-    if parsed_query["free_text"]:
+    if has_free_text:
         clauses.append(
             "("
             "SEARCH(clean_item_name, @free_text) "
@@ -321,17 +625,17 @@ def _build_search_where(parsed_query: Dict[str, Any], category_originals: Option
             ")"
         )
 
-    for index, _ in enumerate(parsed_query["item_terms"]):
+    for index in range(item_term_count):
         clauses.append(
             f"SEARCH(clean_item_name, @item_term_{index})"
         )
 
-    for index, _ in enumerate(parsed_query["vendor_terms"]):
+    for index in range(vendor_term_count):
         clauses.append(
             f"SEARCH(vendor_name, @vendor_term_{index})"
         )
 
-    if category_originals:
+    if has_categories:
         clauses.append("LOWER(COALESCE(category, '')) IN UNNEST(@category_list)")
 
     return " AND ".join(clauses)
@@ -458,6 +762,15 @@ def _bigquery_client() -> bigquery.Client:
         )
 
 
+def _run_query(sql: str, query_parameters: List[bigquery.ScalarQueryParameter]) -> Any:
+    """Run a dashboard analytics query on the configured engine and return its rows."""
+    if QUERY_ENGINE == "duckdb":
+        return duckdb_engine.run_query(sql, query_parameters)
+
+    job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+    return _bigquery_client().query(sql, job_config=job_config).result()
+
+
 def _serialize_vendors(vendors: Any) -> List[Dict[str, Any]]:
     """Convert BigQuery vendor structs into JSON-safe vendor dictionaries."""
     serialized: List[Dict[str, Any]] = []
@@ -524,9 +837,8 @@ def _calculate_high_impact_scores(items: List[Dict[str, Any]]) -> List[Dict[str,
 
 def _representative_text_field(alias: str) -> str:
     """Build SQL that picks one representative non-null text value per grouped item."""
-    return (
-        f"ARRAY_AGG({alias} IGNORE NULLS ORDER BY {alias} LIMIT 1)[SAFE_OFFSET(0)] AS {alias}"
-    )
+    # MIN is the first non-null value in ascending order, without building an array.
+    return f"MIN({alias}) AS {alias}"
 
 
 def _serialize_row_values(row: Any) -> Dict[str, Any]:
@@ -587,93 +899,28 @@ def _serialize_detail_rows(rows: Any) -> List[Dict[str, Any]]:
     return serialized
 
 
-@lru_cache(maxsize=32)
-def query_top_items_from_bigquery(
-    *,
-    dataset: str = "overall",
-    search_query: str = "",
-    selected_year: str = "All Time",
-    selected_quarter: str = "All Quarters",
-    min_spend: float = 0,
-    limit: int = 20,
-    sort_mode: str = "frequency",
-    group_by: str = "item",
-    category_originals: Optional[List[str]] = None,
-    high_impact_only: bool = False,
-) -> Dict[str, Any]:
-    """Query BigQuery external CSV tables for filtered and ranked top items."""
-    normalized_dataset = _normalize_dataset(dataset)
-    parsed_query = _parse_search_query(search_query)
-    chosen_sort_mode = (sort_mode or "frequency").strip().lower()
-    chosen_group_by = (group_by or "item").strip().lower()
-    if chosen_sort_mode not in {"frequency", "cost"}:
-        raise ValueError("sort_mode must be one of: frequency, cost")
-    if chosen_group_by not in {"item", "merchant", "category"}:
-        raise ValueError("group_by must be one of: item, merchant, category")
-    if parsed_query["year"] and selected_year == "All Time":
-        selected_year = parsed_query["year"]
-    if parsed_query.get("quarter") and selected_quarter == "All Quarters":
-        selected_quarter = parsed_query["quarter"]
-
-    selected_quarter = _normalized_quarter(selected_quarter)
-
-    datasets = (
-        ["amazon", "cruzbuy", "onecard", "bookstore"]
-        if normalized_dataset == "overall"
-        else [normalized_dataset]
-    )
-    
-    source_queries: List[str] = []
-    storage_paths: Dict[str, str] = {}
-    
-    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
-    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
-
-    for current_dataset in datasets:
-        latest_upload = _latest_upload_metadata(current_dataset)
-
-        if not latest_upload or not latest_upload.get("storagePath"):
-            continue
-
-        storage_paths[current_dataset] = latest_upload["storagePath"]
-        table_name = f"{bq_project}.{bq_dataset}.{current_dataset}_cleaned"
-        source_queries.append(_source_select_sql(table_name, current_dataset))
-
-    if not source_queries:
-        return {
-            "items": [],
-            "dataset": normalized_dataset,
-            "selected_year": selected_year,
-            "search_query": search_query,
-            "schema": dataset_schema(normalized_dataset),
-            "storage_paths": storage_paths,
-            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
-        }
-
-    if chosen_group_by == "item":
+@lru_cache(maxsize=128)
+def _top_items_sql(source_sql: str, group_by: str, sort_mode: str, search_shape: Tuple[bool, int, int, bool]) -> str:
+    """Compile the top-items SQL for one query shape; request values are bound as parameters."""
+    if group_by == "item":
         order_by_clause = (
             "ir.count DESC, ir.total_spent DESC, ir.dataset, ir.display_item_name"
-            if chosen_sort_mode == "frequency"
+            if sort_mode == "frequency"
             else "ir.total_spent DESC, ir.count DESC, ir.dataset, ir.display_item_name"
         )
 
-        condensed_group_case = _condensed_group_case_expression("fs")
-
         sql = f"""
         WITH source_data AS (
-          {' UNION ALL '.join(source_queries)}
+          {source_sql}
         ),
         filtered_source AS (
           SELECT *
           FROM source_data
-          WHERE {_build_search_where(parsed_query, category_originals)}
+          WHERE {_build_search_where(search_shape)}
         ),
                 classified_source AS (
-                    SELECT
-                        fs.*,
-                        {condensed_group_case} AS condensed_group,
-                        COALESCE({condensed_group_case}, fs.clean_item_name) AS display_item_name
-                    FROM filtered_source fs
+                    SELECT *
+                    FROM filtered_source
                 ),
                 subitem_vendor_rollup AS (
                     SELECT
@@ -802,7 +1049,7 @@ def query_top_items_from_bigquery(
           SELECT
             dataset,
                         display_item_name,
-                        ARRAY_AGG(condensed_group IGNORE NULLS LIMIT 1)[SAFE_OFFSET(0)] AS condensed_group,
+                        MAX(condensed_group) AS condensed_group,
             COUNT(*) AS count,
             MAX(transaction_date) AS transaction_date,
             {_representative_text_field('item_name')},
@@ -868,23 +1115,23 @@ def query_top_items_from_bigquery(
     else:
         group_expr = (
             "IFNULL(NULLIF(vendor_name, ''), 'Unknown')"
-            if chosen_group_by == "merchant"
+            if group_by == "merchant"
             else "IFNULL(NULLIF(category, ''), 'Unknown')"
         )
         order_by_clause = (
             "gr.count DESC, gr.total_spent DESC, gr.dataset, gr.group_name"
-            if chosen_sort_mode == "frequency"
+            if sort_mode == "frequency"
             else "gr.total_spent DESC, gr.count DESC, gr.dataset, gr.group_name"
         )
 
         sql = f"""
         WITH source_data AS (
-          {' UNION ALL '.join(source_queries)}
+          {source_sql}
         ),
         filtered_source AS (
           SELECT *
           FROM source_data
-          WHERE {_build_search_where(parsed_query, category_originals)}
+          WHERE {_build_search_where(search_shape)}
         ),
         grouped_rollup AS (
           SELECT
@@ -950,9 +1197,77 @@ def query_top_items_from_bigquery(
         LIMIT @limit
     """
 
-    client = _bigquery_client()
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=_query_parameters(
+    return sql
+
+
+@cached_query(version=_dataset_query_version)
+def query_top_items_from_bigquery(
+    *,
+    dataset: str = "overall",
+    search_query: str = "",
+    selected_year: str = "All Time",
+    selected_quarter: str = "All Quarters",
+    min_spend: float = 0,
+    limit: int = 20,
+    sort_mode: str = "frequency",
+    group_by: str = "item",
+    category_originals: Optional[List[str]] = None,
+    high_impact_only: bool = False,
+) -> Dict[str, Any]:
+    """Query BigQuery external CSV tables for filtered and ranked top items."""
+    normalized_dataset = _normalize_dataset(dataset)
+    parsed_query = _parse_search_query(search_query)
+    chosen_sort_mode = (sort_mode or "frequency").strip().lower()
+    chosen_group_by = (group_by or "item").strip().lower()
+    if chosen_sort_mode not in {"frequency", "cost"}:
+        raise ValueError("sort_mode must be one of: frequency, cost")
+    if chosen_group_by not in {"item", "merchant", "category"}:
+        raise ValueError("group_by must be one of: item, merchant, category")
+    if parsed_query["year"] and selected_year == "All Time":
+        selected_year = parsed_query["year"]
+    if parsed_query.get("quarter") and selected_quarter == "All Quarters":
+        selected_quarter = parsed_query["quarter"]
+
+    selected_quarter = _normalized_quarter(selected_quarter)
+
+    datasets = (
+        ["amazon", "cruzbuy", "onecard", "bookstore"]
+        if normalized_dataset == "overall"
+        else [normalized_dataset]
+    )
+    
+    storage_paths: Dict[str, str] = {}
+
+    latest_uploads = _latest_upload_metadata_many(datasets)
+    for current_dataset in datasets:
+        latest_upload = latest_uploads[current_dataset]
+
+        if not latest_upload or not latest_upload.get("storagePath"):
+            continue
+
+        storage_paths[current_dataset] = latest_upload["storagePath"]
+
+    if not storage_paths:
+        return {
+            "items": [],
+            "dataset": normalized_dataset,
+            "selected_year": selected_year,
+            "search_query": search_query,
+            "schema": dataset_schema(normalized_dataset),
+            "storage_paths": storage_paths,
+            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
+        }
+
+    sql = _top_items_sql(
+        _source_data_sql(list(storage_paths)),
+        chosen_group_by,
+        chosen_sort_mode,
+        _search_shape(parsed_query, category_originals),
+    )
+
+    results = _run_query(
+        sql,
+        _query_parameters(
             selected_year=selected_year,
             selected_quarter=selected_quarter,
             min_spend=min_spend,
@@ -961,8 +1276,6 @@ def query_top_items_from_bigquery(
             category_originals=category_originals,
         ),
     )
-
-    results = client.query(sql, job_config=job_config).result()
     items: List[Dict[str, Any]] = []
     for row in results:
         items.append(
@@ -1005,104 +1318,35 @@ def query_top_items_from_bigquery(
 
 
 
-@lru_cache(maxsize=32)
-def query_spend_over_time_from_bigquery(
-    *,
-    dataset: str = "overall",
-    time_period: str = "month",
-    selected_year: str = "All Time",
-    selected_quarter: str = "All Quarters",
-) -> Dict[str, Any]:
-    """Query BigQuery external CSV tables for spend or quantity grouped over time."""
-    normalized_dataset = _normalize_dataset(dataset)
-    chosen_time_period = (time_period or "month").strip().lower()
-    if chosen_time_period not in {"day", "week", "month", "year"}:
-        raise ValueError("time_period must be one of: day, week, month, year")
-    selected_quarter = _normalized_quarter(selected_quarter)
-
-    datasets = (
-        ["amazon", "cruzbuy", "onecard", "bookstore"]
-        if normalized_dataset == "overall"
-        else [normalized_dataset]
-    )
-
-    table_definitions: Dict[str, bigquery.ExternalConfig] = {}
-    source_queries: List[str] = []
-    storage_paths: Dict[str, str] = {}
-    
-    source_queries: List[str] = []
-    storage_paths: Dict[str, str] = {}
-    
-    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
-    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
-
-    for current_dataset in datasets:
-        latest_upload = _latest_upload_metadata(current_dataset)
-
-        if not latest_upload or not latest_upload.get("storagePath"):
-            continue
-
-        config = DATASET_COLUMN_CONFIG[current_dataset]["bigquery"]
-        storage_paths[current_dataset] = latest_upload["storagePath"]
-        table_name = f"{bq_project}.{bq_dataset}.{current_dataset}_cleaned"
-        parsed_date_expression = _parsed_date_expression(config["date_column"])
-
-        source_queries.append(
-            f"""
-            SELECT
-              '{current_dataset}' AS dataset,
-              {_amount_expression(config["metric_column"])} AS amount,
-              {parsed_date_expression} AS parsed_date
-            FROM `{table_name}`
-            """.strip()
-        )
-
-    if not source_queries:
-        return {
-            "dataset": normalized_dataset,
-            "time_period": chosen_time_period,
-            "schema": dataset_schema(normalized_dataset),
-            "storage_paths": storage_paths,
-            "datasets": {},
-            "combined": [],
-            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
-        }
-
-    period_expression = {
-        "day": "FORMAT_DATE('%Y-%m-%d', parsed_date)",
-        "week": "FORMAT_DATE('%G-W%V', parsed_date)",
-        "month": "FORMAT_DATE('%Y-%m', parsed_date)",
-        "year": "FORMAT_DATE('%Y', parsed_date)",
-    }[chosen_time_period]
+@lru_cache(maxsize=128)
+def _spend_over_time_sql(facts_sql: str, time_period: str) -> str:
+    """Compile the spend-over-time SQL for one source and grain."""
+    period_expression = {
+        "day": "FORMAT_DATE('%Y-%m-%d', transaction_day)",
+        "week": "FORMAT_DATE('%G-W%V', transaction_day)",
+        "month": "FORMAT_DATE('%Y-%m', transaction_day)",
+        "year": "FORMAT_DATE('%Y', transaction_day)",
+    }[time_period]
 
     sql = f"""
-        WITH source_data AS (
-          {' UNION ALL '.join(source_queries)}
-        ),
-        normalized AS (
-          SELECT
-            dataset,
-            amount,
-            parsed_date,
-            {_quarter_case_expression('parsed_date')} AS transaction_quarter
-          FROM source_data
+        WITH period_facts AS (
+          {facts_sql}
         ),
         filtered AS (
           SELECT
             dataset,
             {period_expression} AS period,
-            amount
-          FROM normalized
-          WHERE parsed_date IS NOT NULL
-            AND amount IS NOT NULL
-            AND (@selected_year = 'All Time' OR FORMAT_DATE('%Y', parsed_date) = @selected_year)
+            spend
+          FROM period_facts
+          WHERE {_year_range_filter("transaction_day")}
+            AND (@selected_year = 'All Time' OR FORMAT_DATE('%Y', transaction_day) = @selected_year)
             AND (@selected_quarter = 'All Quarters' OR transaction_quarter = @selected_quarter)
         ),
         dataset_rollup AS (
           SELECT
             dataset,
             period,
-            ROUND(SUM(amount), 2) AS spend
+            ROUND(SUM(spend), 2) AS spend
           FROM filtered
           GROUP BY dataset, period
         ),
@@ -1129,14 +1373,61 @@ def query_spend_over_time_from_bigquery(
         ORDER BY period, dataset
     """
 
-    client = _bigquery_client()
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
+    return sql
+
+
+@cached_query(version=_dataset_query_version)
+def query_spend_over_time_from_bigquery(
+    *,
+    dataset: str = "overall",
+    time_period: str = "month",
+    selected_year: str = "All Time",
+    selected_quarter: str = "All Quarters",
+) -> Dict[str, Any]:
+    """Query BigQuery external CSV tables for spend or quantity grouped over time."""
+    normalized_dataset = _normalize_dataset(dataset)
+    chosen_time_period = (time_period or "month").strip().lower()
+    if chosen_time_period not in {"day", "week", "month", "year"}:
+        raise ValueError("time_period must be one of: day, week, month, year")
+    selected_quarter = _normalized_quarter(selected_quarter)
+
+    datasets = (
+        ["amazon", "cruzbuy", "onecard", "bookstore"]
+        if normalized_dataset == "overall"
+        else [normalized_dataset]
+    )
+
+    storage_paths: Dict[str, str] = {}
+
+    latest_uploads = _latest_upload_metadata_many(datasets)
+    for current_dataset in datasets:
+        latest_upload = latest_uploads[current_dataset]
+
+        if not latest_upload or not latest_upload.get("storagePath"):
+            continue
+
+        storage_paths[current_dataset] = latest_upload["storagePath"]
+
+    if not storage_paths:
+        return {
+            "dataset": normalized_dataset,
+            "time_period": chosen_time_period,
+            "schema": dataset_schema(normalized_dataset),
+            "storage_paths": storage_paths,
+            "datasets": {},
+            "combined": [],
+            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
+        }
+
+    sql = _spend_over_time_sql(_period_facts_sql(list(storage_paths)), chosen_time_period)
+
+    results = _run_query(
+        sql,
+        [
             bigquery.ScalarQueryParameter("selected_year", "STRING", selected_year),
             bigquery.ScalarQueryParameter("selected_quarter", "STRING", selected_quarter),
         ],
     )
-    results = client.query(sql, job_config=job_config).result()
 
     dataset_series: Dict[str, List[Dict[str, Any]]] = {key: [] for key in datasets}
     combined: List[Dict[str, Any]] = []
@@ -1164,90 +1455,28 @@ def query_spend_over_time_from_bigquery(
     }
 
 
-@lru_cache(maxsize=32)
-def query_period_summary_from_bigquery(
-    *,
-    dataset: str = "overall",
-    period: str = "month",
-    date: str = "",
-    limit: int = 5,
-) -> Dict[str, Any]:
-    """Return a compact weekly or monthly spending report for one selected period."""
-    normalized_dataset = _normalize_dataset(dataset)
-    chosen_period = (period or "month").strip().lower()
-    if chosen_period not in {"week", "month"}:
-        raise ValueError("period must be one of: week, month")
-
-    safe_limit = max(1, min(int(limit or 5), 25))
-    period_key = (date or "").strip()
-    if period_key and chosen_period == "month" and not re.fullmatch(r"\d{4}-\d{2}", period_key):
-        raise ValueError("date must use YYYY-MM for monthly summaries")
-    if period_key and chosen_period == "week" and not re.fullmatch(r"\d{4}-W\d{2}", period_key):
-        raise ValueError("date must use YYYY-Www for weekly summaries")
-
-    datasets = (
-        ["amazon", "cruzbuy", "onecard", "bookstore"]
-        if normalized_dataset == "overall"
-        else [normalized_dataset]
-    )
-
-    source_queries: List[str] = []
-    storage_paths: Dict[str, str] = {}
-    
-    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
-    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
-
-    for current_dataset in datasets:
-        latest_upload = _latest_upload_metadata(current_dataset)
-
-        if not latest_upload or not latest_upload.get("storagePath"):
-            continue
-
-        storage_paths[current_dataset] = latest_upload["storagePath"]
-        table_name = f"{bq_project}.{bq_dataset}.{current_dataset}_cleaned"
-        source_queries.append(_source_select_sql(table_name, current_dataset))
-
-    if not source_queries:
-        return {
-            "dataset": normalized_dataset,
-            "period": chosen_period,
-            "period_key": period_key,
-            "period_label": period_key,
-            "schema": dataset_schema(normalized_dataset),
-            "summary": {
-                "total_spend": 0,
-                "transaction_count": 0,
-                "top_item": None,
-                "top_merchant": None,
-                "top_category": None,
-            },
-            "top_items": [],
-            "top_merchants": [],
-            "top_categories": [],
-            "storage_paths": storage_paths,
-            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
-        }
-
+@lru_cache(maxsize=128)
+def _period_summary_sql(facts_sql: str, period: str) -> str:
+    """Compile the period-summary SQL for one source and period type."""
     period_expression = {
-        "week": "FORMAT_DATE('%G-W%V', parsed_transaction_date)",
-        "month": "FORMAT_DATE('%Y-%m', parsed_transaction_date)",
-    }[chosen_period]
+        "week": "FORMAT_DATE('%G-W%V', transaction_day)",
+        "month": "FORMAT_DATE('%Y-%m', transaction_day)",
+    }[period]
 
     sql = f"""
-        WITH source_data AS (
-          {' UNION ALL '.join(source_queries)}
+        WITH period_facts AS (
+          {facts_sql}
         ),
         periodized AS (
           SELECT
             dataset,
             clean_item_name,
-            IFNULL(NULLIF(merchant_name, ''), IFNULL(NULLIF(vendor_name, ''), 'Unknown')) AS merchant_name,
-            IFNULL(NULLIF(category, ''), 'Uncategorized') AS category,
-            amount,
+            merchant_name,
+            category,
+            row_count,
+            spend AS amount,
             {period_expression} AS period_key
-          FROM source_data
-          WHERE parsed_transaction_date IS NOT NULL
-            AND amount IS NOT NULL
+          FROM period_facts
         ),
         selected_period AS (
           SELECT COALESCE(NULLIF(@period_key, ''), (SELECT MAX(period_key) FROM periodized)) AS period_key
@@ -1261,13 +1490,13 @@ def query_period_summary_from_bigquery(
         summary AS (
           SELECT
             ROUND(SUM(IFNULL(amount, 0)), 2) AS total_spend,
-            COUNT(*) AS transaction_count
+            SUM(row_count) AS transaction_count
           FROM filtered
         ),
         item_rollup AS (
           SELECT
             clean_item_name AS name,
-            COUNT(*) AS count,
+            SUM(row_count) AS count,
             ROUND(SUM(IFNULL(amount, 0)), 2) AS total_spent
           FROM filtered
           GROUP BY clean_item_name
@@ -1275,7 +1504,7 @@ def query_period_summary_from_bigquery(
         merchant_rollup AS (
           SELECT
             merchant_name AS name,
-            COUNT(*) AS count,
+            SUM(row_count) AS count,
             ROUND(SUM(IFNULL(amount, 0)), 2) AS total_spent
           FROM filtered
           GROUP BY merchant_name
@@ -1283,7 +1512,7 @@ def query_period_summary_from_bigquery(
         category_rollup AS (
           SELECT
             category AS name,
-            COUNT(*) AS count,
+            SUM(row_count) AS count,
             ROUND(SUM(IFNULL(amount, 0)), 2) AS total_spent
           FROM filtered
           GROUP BY category
@@ -1323,14 +1552,77 @@ def query_period_summary_from_bigquery(
         FROM ranked_categories
     """
 
-    client = _bigquery_client()
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
+    return sql
+
+
+@cached_query(version=_dataset_query_version)
+def query_period_summary_from_bigquery(
+    *,
+    dataset: str = "overall",
+    period: str = "month",
+    date: str = "",
+    limit: int = 5,
+) -> Dict[str, Any]:
+    """Return a compact weekly or monthly spending report for one selected period."""
+    normalized_dataset = _normalize_dataset(dataset)
+    chosen_period = (period or "month").strip().lower()
+    if chosen_period not in {"week", "month"}:
+        raise ValueError("period must be one of: week, month")
+
+    safe_limit = max(1, min(int(limit or 5), 25))
+    period_key = (date or "").strip()
+    if period_key and chosen_period == "month" and not re.fullmatch(r"\d{4}-\d{2}", period_key):
+        raise ValueError("date must use YYYY-MM for monthly summaries")
+    if period_key and chosen_period == "week" and not re.fullmatch(r"\d{4}-W\d{2}", period_key):
+        raise ValueError("date must use YYYY-Www for weekly summaries")
+
+    datasets = (
+        ["amazon", "cruzbuy", "onecard", "bookstore"]
+        if normalized_dataset == "overall"
+        else [normalized_dataset]
+    )
+
+    storage_paths: Dict[str, str] = {}
+
+    latest_uploads = _latest_upload_metadata_many(datasets)
+    for current_dataset in datasets:
+        latest_upload = latest_uploads[current_dataset]
+
+        if not latest_upload or not latest_upload.get("storagePath"):
+            continue
+
+        storage_paths[current_dataset] = latest_upload["storagePath"]
+
+    if not storage_paths:
+        return {
+            "dataset": normalized_dataset,
+            "period": chosen_period,
+            "period_key": period_key,
+            "period_label": period_key,
+            "schema": dataset_schema(normalized_dataset),
+            "summary": {
+                "total_spend": 0,
+                "transaction_count": 0,
+                "top_item": None,
+                "top_merchant": None,
+                "top_category": None,
+            },
+            "top_items": [],
+            "top_merchants": [],
+            "top_categories": [],
+            "storage_paths": storage_paths,
+            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
+        }
+
+    sql = _period_summary_sql(_period_facts_sql(list(storage_paths)), chosen_period)
+
+    results = _run_query(
+        sql,
+        [
             bigquery.ScalarQueryParameter("period_key", "STRING", period_key),
             bigquery.ScalarQueryParameter("limit", "INT64", safe_limit),
         ],
     )
-    results = client.query(sql, job_config=job_config).result()
 
     selected_period_key = period_key
     summary = {
@@ -1382,96 +1674,19 @@ def query_period_summary_from_bigquery(
         "warnings": [],
     }
 
-@lru_cache(maxsize=32)
-def query_item_spend_over_time_from_bigquery(
-    *,
-    dataset: str = "overall",
-    query: str = "",
-    time_period: str = "month",
-    selected_year: str = "All Time",
-    selected_quarter: str = "All Quarters",
-    limit: int = 10,
-) -> Dict[str, Any]:
-    """Aggregate spend/quantity over time for rows matching an item keyword."""
-    normalized_dataset = _normalize_dataset(dataset)
-    item_query = (query or "").strip()
-    chosen_time_period = (time_period or "month").strip().lower()
-    if chosen_time_period not in {"day", "week", "month", "year"}:
-        raise ValueError("time_period must be one of: day, week, month, year")
-    if not item_query:
-        return {
-            "query": item_query,
-            "dataset": normalized_dataset,
-            "time_period": chosen_time_period,
-            "selected_year": selected_year,
-            "selected_quarter": selected_quarter,
-            "schema": dataset_schema(normalized_dataset),
-            "storage_paths": {},
-            "series": [],
-            "matched_items": [],
-            "summary": {
-                "total_spend": 0,
-                "purchase_count": 0,
-                "total_quantity": 0,
-                "average_period_spend": 0,
-            },
-            "warnings": [],
-        }
-
-    selected_quarter = _normalized_quarter(selected_quarter)
-    safe_limit = max(1, min(int(limit or 10), 25))
-    datasets = (
-        ["amazon", "cruzbuy", "onecard", "bookstore"]
-        if normalized_dataset == "overall"
-        else [normalized_dataset]
-    )
-
-    source_queries: List[str] = []
-    storage_paths: Dict[str, str] = {}
-    
-    bq_project = os.getenv("VITE_FIREBASE_PROJECT_ID", "")
-    bq_dataset = os.getenv("BIGQUERY_DATASET", "")
-
-    for current_dataset in datasets:
-        latest_upload = _latest_upload_metadata(current_dataset)
-
-        if not latest_upload or not latest_upload.get("storagePath"):
-            continue
-
-        storage_paths[current_dataset] = latest_upload["storagePath"]
-        table_name = f"{bq_project}.{bq_dataset}.{current_dataset}_cleaned"
-        source_queries.append(_source_select_sql(table_name, current_dataset))
-
-    if not source_queries:
-        return {
-            "query": item_query,
-            "dataset": normalized_dataset,
-            "time_period": chosen_time_period,
-            "selected_year": selected_year,
-            "selected_quarter": selected_quarter,
-            "schema": dataset_schema(normalized_dataset),
-            "storage_paths": storage_paths,
-            "series": [],
-            "matched_items": [],
-            "summary": {
-                "total_spend": 0,
-                "purchase_count": 0,
-                "total_quantity": 0,
-                "average_period_spend": 0,
-            },
-            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
-        }
-
+@lru_cache(maxsize=128)
+def _item_spend_sql(source_sql: str, time_period: str) -> str:
+    """Compile the item-spend-over-time SQL for one source and grain."""
     period_expression = {
         "day": "FORMAT_DATE('%Y-%m-%d', parsed_transaction_date)",
         "week": "FORMAT_DATE('%G-W%V', parsed_transaction_date)",
         "month": "FORMAT_DATE('%Y-%m', parsed_transaction_date)",
         "year": "FORMAT_DATE('%Y', parsed_transaction_date)",
-    }[chosen_time_period]
+    }[time_period]
 
     sql = f"""
         WITH source_data AS (
-          {' UNION ALL '.join(source_queries)}
+          {source_sql}
         ),
         filtered AS (
           SELECT
@@ -1497,6 +1712,7 @@ def query_item_spend_over_time_from_bigquery(
               OR LOWER(COALESCE(category, '')) LIKE CONCAT('%', LOWER(@item_query), '%')
             )
             AND (@selected_year = 'All Time' OR transaction_year = @selected_year)
+            AND {_year_range_filter("parsed_transaction_date")}
             AND (@selected_quarter = 'All Quarters' OR transaction_quarter = @selected_quarter)
         ),
         series_rollup AS (
@@ -1516,7 +1732,7 @@ def query_item_spend_over_time_from_bigquery(
             ROUND(SUM(IFNULL(item_quantity, 0)), 2) AS quantity,
             COUNT(*) AS purchase_count
           FROM filtered
-          GROUP BY dataset, item_name
+          GROUP BY dataset, clean_item_name
           ORDER BY total_spend DESC, purchase_count DESC, item_name
           LIMIT @limit
         ),
@@ -1562,16 +1778,95 @@ def query_item_spend_over_time_from_bigquery(
         ORDER BY row_type, period, total_spend DESC
     """
 
-    client = _bigquery_client()
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
+    return sql
+
+
+@cached_query(version=_dataset_query_version)
+def query_item_spend_over_time_from_bigquery(
+    *,
+    dataset: str = "overall",
+    query: str = "",
+    time_period: str = "month",
+    selected_year: str = "All Time",
+    selected_quarter: str = "All Quarters",
+    limit: int = 10,
+) -> Dict[str, Any]:
+    """Aggregate spend/quantity over time for rows matching an item keyword."""
+    normalized_dataset = _normalize_dataset(dataset)
+    item_query = (query or "").strip()
+    chosen_time_period = (time_period or "month").strip().lower()
+    if chosen_time_period not in {"day", "week", "month", "year"}:
+        raise ValueError("time_period must be one of: day, week, month, year")
+    if not item_query:
+        return {
+            "query": item_query,
+            "dataset": normalized_dataset,
+            "time_period": chosen_time_period,
+            "selected_year": selected_year,
+            "selected_quarter": selected_quarter,
+            "schema": dataset_schema(normalized_dataset),
+            "storage_paths": {},
+            "series": [],
+            "matched_items": [],
+            "summary": {
+                "total_spend": 0,
+                "purchase_count": 0,
+                "total_quantity": 0,
+                "average_period_spend": 0,
+            },
+            "warnings": [],
+        }
+
+    selected_quarter = _normalized_quarter(selected_quarter)
+    safe_limit = max(1, min(int(limit or 10), 25))
+    datasets = (
+        ["amazon", "cruzbuy", "onecard", "bookstore"]
+        if normalized_dataset == "overall"
+        else [normalized_dataset]
+    )
+
+    storage_paths: Dict[str, str] = {}
+
+    latest_uploads = _latest_upload_metadata_many(datasets)
+    for current_dataset in datasets:
+        latest_upload = latest_uploads[current_dataset]
+
+        if not latest_upload or not latest_upload.get("storagePath"):
+            continue
+
+        storage_paths[current_dataset] = latest_upload["storagePath"]
+
+    if not storage_paths:
+        return {
+            "query": item_query,
+            "dataset": normalized_dataset,
+            "time_period": chosen_time_period,
+            "selected_year": selected_year,
+            "selected_quarter": selected_quarter,
+            "schema": dataset_schema(normalized_dataset),
+            "storage_paths": storage_paths,
+            "series": [],
+            "matched_items": [],
+            "summary": {
+                "total_spend": 0,
+                "purchase_count": 0,
+                "total_quantity": 0,
+                "average_period_spend": 0,
+            },
+            "warnings": ["No uploaded CSV files with storage paths were found for the selected dataset."],
+        }
+
+    sql = _item_spend_sql(_source_data_sql(list(storage_paths)), chosen_time_period)
+
+    results = _run_query(
+        sql,
+        [
             bigquery.ScalarQueryParameter("item_query", "STRING", item_query),
             bigquery.ScalarQueryParameter("selected_year", "STRING", selected_year),
             bigquery.ScalarQueryParameter("selected_quarter", "STRING", selected_quarter),
             bigquery.ScalarQueryParameter("limit", "INT64", safe_limit),
         ],
     )
-    results = client.query(sql, job_config=job_config).result()
 
     series: List[Dict[str, Any]] = []
     matched_items: List[Dict[str, Any]] = []
@@ -1629,7 +1924,7 @@ def query_item_spend_over_time_from_bigquery(
     }
 
 
-@lru_cache(maxsize=5)
+@cached_query(version=_recommendations_version)
 def fetch_amazon_bookstore_recommendations():
     """
     Returns top Amazon items grouped by category and flags which ones are
@@ -1695,8 +1990,7 @@ def fetch_amazon_bookstore_recommendations():
 
     return {"overlap": overlap[:15], "gaps": gaps[:15]}
 
-# This caches the last 10 unique (time_period, dev_mode) combos in server RAM.
-@lru_cache(maxsize=10)
+@cached_query(version=_forecast_version("bookstore"))
 def fetch_bookstore_forecast_from_bigquery(time_period: str, dev_mode: bool = False):
     """
     Retrieves inventory health insights by comparing current stock against BQML demand forecasts.
@@ -1936,7 +2230,7 @@ def fetch_bookstore_forecast_from_bigquery(time_period: str, dev_mode: bool = Fa
     return results
 
 
-@lru_cache(maxsize=10)
+@cached_query(version=_forecast_version("amazon"))
 def fetch_amazon_forecast_from_bigquery(time_period: str, dev_mode: bool = False):
     """
     Retrieves Amazon demand forecasts per item name using BQML ARIMA+.
@@ -2123,7 +2417,7 @@ def fetch_amazon_forecast_from_bigquery(time_period: str, dev_mode: bool = False
     return results
 
 
-@lru_cache(maxsize=50)
+@cached_query(version=_item_history_version)
 def fetch_item_history(item_name: str, dev_mode: bool = False, dataset_type: str = "bookstore"):
     """
     Returns monthly aggregated purchase quantities for an item.
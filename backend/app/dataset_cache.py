@@ -0,0 +1,138 @@
+# Local caches for Dataset Explorer frames.
+#
+# On disk: each cleaned CSV is downloaded (or read from disk) once, written to
+# Parquet, and memory-mapped on later requests. Cache files are keyed by the
+# upload's storagePath plus the blob generation, so a new pipeline upload
+# automatically misses the old entry and the stale file is pruned when the new
+# one is written.
+#
+# In memory: one resident, already-normalized frame per dataset is shared by
+# every request and rebuilt only when the dataset's version token changes.
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+
+# Vercel/Cloud Run only allow writes under the temp directory, so default there
+# and let local deployments point the cache somewhere persistent.
+CACHE_DIR = os.getenv("DATASET_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "slugsmart_dataset_cache"
+)
+
+# Serializes cache writes so two concurrent first requests for the same upload
+# don't both download and write the same Parquet file.
+_write_lock = threading.Lock()
+
+# dataset -> {"version": <token>, "frame": <DataFrame>, ...}
+_resident_datasets: Dict[str, Dict[str, Any]] = {}
+_resident_locks: Dict[str, threading.Lock] = {}
+_resident_locks_guard = threading.Lock()
+
+
+def cache_key(dataset: str, source: str, version: Any) -> str:
+    """Return the cache file stem for one dataset source at one version."""
+    digest = hashlib.sha1(f"{source}|{version}".encode("utf-8")).hexdigest()[:16]
+    return f"{dataset}_{digest}"
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.parquet")
+
+
+def read_cached_frame(dataset: str, source: str, version: Any) -> Optional[pd.DataFrame]:
+    """Return the cached frame for this source/version, or None on a miss."""
+    path = _cache_path(cache_key(dataset, source, version))
+    if not os.path.exists(path):
+        return None
+
+    try:
+        return pd.read_parquet(path, memory_map=True)
+    except Exception as read_error:
+        # A partially written or corrupted file should never break the explorer;
+        # drop it so the next request rebuilds it from the source CSV.
+        print(f"[WARN] Dataset cache read failed for '{dataset}': {read_error}")
+        _remove_quietly(path)
+        return None
+
+
+def write_cached_frame(dataset: str, source: str, version: Any, df: pd.DataFrame) -> None:
+    """Persist a freshly loaded frame and prune older versions for the dataset."""
+    key = cache_key(dataset, source, version)
+    path = _cache_path(key)
+
+    with _write_lock:
+        if os.path.exists(path):
+            return
+
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                df.to_parquet(tmp_path, index=False)
+            except Exception:
+                # Raw CSV columns can mix numbers and text; Arrow needs one type
+                # per column, so fall back to storing mixed columns as strings.
+                _parquet_safe_frame(df).to_parquet(tmp_path, index=False)
+
+            # Atomic rename so readers only ever see complete files.
+            os.replace(tmp_path, path)
+        except Exception as write_error:
+            print(f"[WARN] Dataset cache write failed for '{dataset}': {write_error}")
+            _remove_quietly(f"{path}.{os.getpid()}.tmp")
+            return
+
+        for stale_path in glob.glob(os.path.join(CACHE_DIR, f"{dataset}_*.parquet")):
+            if stale_path != path:
+                _remove_quietly(stale_path)
+
+
+def resident_dataset(
+    dataset: str,
+    version: str,
+    build: Callable[[], Any],
+) -> Dict[str, Any]:
+    """
+    Return the shared in-memory entry for a dataset, building it with build()
+    only when no entry exists yet or the stored version no longer matches.
+
+    Callers must treat the returned frame as read-only since it is shared
+    across concurrent requests.
+    """
+    entry = _resident_datasets.get(dataset)
+    if entry is not None and entry["version"] == version:
+        return entry
+
+    with _resident_locks_guard:
+        lock = _resident_locks.setdefault(dataset, threading.Lock())
+
+    # Only one request rebuilds a dataset; the others wait and reuse its result.
+    with lock:
+        entry = _resident_datasets.get(dataset)
+        if entry is not None and entry["version"] == version:
+            return entry
+
+        entry = {"version": version, "frame": build()}
+        _resident_datasets[dataset] = entry
+        return entry
+
+
+def _parquet_safe_frame(df: pd.DataFrame) -> pd.DataFrame:
+    safe = df.copy()
+    for column in safe.columns:
+        if safe[column].dtype == object:
+            safe[column] = safe[column].astype("string")
+    return safe
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import io
 import os
-import math
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException
 
 from .data_config import CANONICAL_COLUMN_ORDER, dataset_schema
+from .dataset_cache import read_cached_frame, resident_dataset, write_cached_frame
+from .dataset_index import facet_counts, search_mask, sort_permutation
+from .upload_metadata import get_upload_metadata
 
 
 DATASET_UPLOAD_IDS = {
@@ -25,6 +28,23 @@ LOCAL_CLEANED_FILENAMES = {
     "bookstore": "bookstore_clean.csv",
 }
 
+# Columns stored as float64 in the resident frame. Amazon and CruzBuy keep
+# "$1,234.56" strings in their cleaned CSVs, so these are stripped first.
+NUMERIC_COLUMNS = ["Subtotal", "Sales Tax", "Total Price", "Quantity"]
+
+# Low-cardinality text columns stored as pandas categoricals so filtering and
+# facet lookups work on small integer codes instead of full strings.
+CATEGORICAL_COLUMNS = ["Merchant Name", "Category", "Merchant State", "Transaction Type"]
+
+# Rows formatted per chunk when streaming an export.
+EXPORT_BATCH_SIZE = 5000
+
+# Filter dropdowns returned under available_filters, keyed by response field.
+FACET_COLUMNS = {
+    "merchants": "Merchant Name",
+    "categories": "Category",
+}
+
 SEARCH_FIELD_MAP = {
     "all": None,
     "item": ["Item Name", "Item Description"],
@@ -33,28 +53,42 @@ SEARCH_FIELD_MAP = {
 }
 
 
-def _load_dataset_frame(dataset: str) -> pd.DataFrame:
+def _dataset_source(dataset: str) -> Dict[str, Any]:
+    """Resolve where a dataset's cleaned CSV lives and which version it is at."""
     upload_id = DATASET_UPLOAD_IDS.get(dataset)
     if not upload_id:
         raise HTTPException(status_code=400, detail=f"Unsupported dataset '{dataset}'.")
 
     try:
-        db, bucket = _get_firebase_clients()
-
-        snapshot = db.collection("uploads").document(upload_id).get()
-        if snapshot.exists:
-            payload = snapshot.to_dict() or {}
+        payload = get_upload_metadata(upload_id)
+        if payload is not None:
+            _, bucket = _get_firebase_clients()
             storage_path = payload.get("storagePath")
             if storage_path:
-                blob = bucket.blob(storage_path)
-                if blob.exists():
-                    return pd.read_csv(io.BytesIO(blob.download_as_bytes()))
+                # get_blob() fetches object metadata only (None when missing), so
+                # one call replaces exists() and gives us the generation to key on.
+                blob = bucket.get_blob(storage_path)
+                if blob is not None:
+                    return {
+                        "source": storage_path,
+                        "version": blob.generation or blob.updated,
+                        "read": lambda: pd.read_csv(io.BytesIO(blob.download_as_bytes())),
+                        "remote": True,
+                    }
     except Exception as firebase_error:
         print(f"[WARN] Dataset Explorer Firebase read failed for '{dataset}': {firebase_error}")
 
+    return _local_dataset_source(dataset)
+
+
+def _local_dataset_source(dataset: str) -> Dict[str, Any]:
     local_path = _local_cleaned_csv_path(dataset)
     if os.path.exists(local_path):
-        return pd.read_csv(local_path)
+        return {
+            "source": local_path,
+            "version": os.path.getmtime(local_path),
+            "read": lambda: pd.read_csv(local_path),
+        }
 
     raise HTTPException(
         status_code=404,
@@ -65,6 +99,45 @@ def _load_dataset_frame(dataset: str) -> pd.DataFrame:
     )
 
 
+class _RemoteReadError(Exception):
+    """The Firebase download for a dataset failed after its metadata resolved."""
+
+
+def _load_dataset_frame(dataset: str, source: Dict[str, Any]) -> pd.DataFrame:
+    cached = read_cached_frame(dataset, source["source"], source["version"])
+    if cached is not None:
+        return cached
+
+    try:
+        frame = source["read"]()
+    except Exception as read_error:
+        if not source.get("remote"):
+            raise
+        raise _RemoteReadError(str(read_error)) from read_error
+    write_cached_frame(dataset, source["source"], source["version"], frame)
+    return frame
+
+
+def _resident_dataset(dataset: str) -> Dict[str, Any]:
+    """Return the shared, normalized frame for a dataset's current upload."""
+    source = _dataset_source(dataset)
+    try:
+        return _resident_from_source(dataset, source)
+    except _RemoteReadError as firebase_error:
+        # Nothing is cached or stored under the failed source's version, so the
+        # next request tries Firebase again.
+        print(f"[WARN] Dataset Explorer Firebase read failed for '{dataset}': {firebase_error}")
+        return _resident_from_source(dataset, _local_dataset_source(dataset))
+
+
+def _resident_from_source(dataset: str, source: Dict[str, Any]) -> Dict[str, Any]:
+    return resident_dataset(
+        dataset,
+        f"{source['source']}|{source['version']}",
+        lambda: _typed_frame(_normalize_frame(_load_dataset_frame(dataset, source), dataset)),
+    )
+
+
 def _local_cleaned_csv_path(dataset: str) -> str:
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data_cleaning", "data", "clean"))
     return os.path.join(base_dir, LOCAL_CLEANED_FILENAMES[dataset])
@@ -94,107 +167,141 @@ def _normalize_frame(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
     return normalized
 
 
-def _apply_search(df: pd.DataFrame, search: str, search_field: str) -> pd.DataFrame:
+def _typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce a normalized frame to the dtypes the explorer filters and sorts on."""
+    date_column = "Transaction Date"
+    df[date_column] = pd.to_datetime(df[date_column], errors="coerce")
+
+    for column in NUMERIC_COLUMNS:
+        series = df[column]
+        if not pd.api.types.is_numeric_dtype(series):
+            series = series.astype(str).str.replace(r"[\$,]", "", regex=True).str.strip()
+        df[column] = pd.to_numeric(series, errors="coerce").astype("float64")
+
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype("category")
+
+    return df
+
+
+def _search_mask(entry: Dict[str, Any], search: str, search_field: str) -> Optional[np.ndarray]:
     if not search.strip():
-        return df
+        return None
 
+    df = entry["frame"]
     search_targets = SEARCH_FIELD_MAP.get(search_field, SEARCH_FIELD_MAP["all"])
     if search_targets is None:
         search_targets = list(df.columns)
 
     available_targets = [column for column in search_targets if column in df.columns]
     if not available_targets:
-        return df
-
-    mask = pd.Series(False, index=df.index)
-    lowered = search.strip().lower()
-
-    for column in available_targets:
-        mask = mask | df[column].fillna("").astype(str).str.lower().str.contains(lowered, regex=False)
+        return None
 
-    return df[mask]
+    return search_mask(entry, available_targets, search.strip().lower())
 
 
-def _apply_exact_filter(df: pd.DataFrame, column: str, value: str) -> pd.DataFrame:
+def _exact_filter_mask(df: pd.DataFrame, column: str, value: str) -> Optional[np.ndarray]:
     if not value.strip() or column not in df.columns:
-        return df
-    return df[df[column].fillna("").astype(str) == value]
+        return None
 
+    # Match the stripped string labels facet_counts offers, so non-string
+    # categories (e.g. numeric merchant ids) still compare equal to the UI value.
+    target = value.strip()
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = series.cat.categories.astype(str).str.strip()
+        matching_codes = np.flatnonzero(labels == target)
+        return np.isin(series.cat.codes.to_numpy(), matching_codes)
+    return (series.fillna("").astype(str).str.strip() == target).to_numpy(dtype=bool)
 
-def _apply_date_range(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+
+def _date_range_mask(df: pd.DataFrame, start_date: str, end_date: str) -> Optional[np.ndarray]:
     date_column = "Transaction Date"
     if date_column not in df.columns or (not start_date and not end_date):
-        return df
-
-    dated = df.copy()
-    dated[date_column] = pd.to_datetime(dated[date_column], errors="coerce")
+        return None
 
+    # The resident frame already stores datetime64, so no re-parse or copy here.
+    mask = np.ones(len(df), dtype=bool)
     if start_date:
-        dated = dated[dated[date_column] >= pd.to_datetime(start_date)]
+        mask &= (df[date_column] >= pd.to_datetime(start_date)).to_numpy(dtype=bool)
     if end_date:
-        dated = dated[dated[date_column] <= pd.to_datetime(end_date)]
+        mask &= (df[date_column] <= pd.to_datetime(end_date)).to_numpy(dtype=bool)
 
-    return dated
+    return mask
 
 
-def _sort_frame(df: pd.DataFrame, sort_by: str, sort_dir: str) -> pd.DataFrame:
-    column = sort_by if sort_by in df.columns else "Transaction Date"
-    ascending = sort_dir.lower() != "desc"
+def _combine_masks(*masks: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    combined = None
+    for mask in masks:
+        if mask is None:
+            continue
+        combined = mask if combined is None else combined & mask
+    return combined
 
-    sortable = df.copy()
-    numeric_series = pd.to_numeric(sortable[column], errors="coerce")
-    if numeric_series.notna().any():
-        sortable["_sort_value"] = numeric_series
-    else:
-        sortable["_sort_value"] = sortable[column].fillna("").astype(str).str.lower()
 
-    sortable = sortable.sort_values(by="_sort_value", ascending=ascending, na_position="last")
-    return sortable.drop(columns=["_sort_value"])
-
-
-def _available_filter_values(df: pd.DataFrame, column: str, *, limit: int = 200) -> List[str]:
-    if column not in df.columns:
-        return []
-
-    values = (
-        df[column]
-        .dropna()
-        .astype(str)
-        .str.strip()
-    )
-    values = values[values != ""].drop_duplicates().sort_values()
-    return values.head(limit).tolist()
+def _sorted_positions(
+    entry: Dict[str, Any],
+    mask: Optional[np.ndarray],
+    sort_by: str,
+    sort_dir: str,
+) -> np.ndarray:
+    """Return filtered row positions in the requested order without sorting rows."""
+    column = sort_by if sort_by in entry["frame"].columns else "Transaction Date"
+    permutation = sort_permutation(entry, column, descending=sort_dir.lower() == "desc")
+    if mask is None:
+        return permutation
+    return permutation[mask[permutation]]
+
+
+def _visible_rows(df: pd.DataFrame, positions: np.ndarray, visible_columns: List[str]) -> pd.DataFrame:
+    """Materialize only the requested rows and columns, formatted for output."""
+    rows = df[visible_columns].take(positions)
+    if "Transaction Date" in rows.columns:
+        formatted_dates = rows["Transaction Date"].dt.strftime("%Y-%m-%d")
+        rows = rows.assign(
+            **{"Transaction Date": formatted_dates.astype(object).where(formatted_dates.notna(), None)}
+        )
+    return rows
 
 
-def _sanitize_value(value: Any) -> Any:
-    if value is None:
-        return None
+def _available_filters(entry: Dict[str, Any], positions: np.ndarray, facet_scope: str) -> Dict[str, Any]:
+    """
+    Dropdown values and row counts for the merchant/category filters.
 
-    if isinstance(value, float):
-        if math.isnan(value) or math.isinf(value):
-            return None
-        return value
+    "all" counts the whole dataset (cached per dataset version); "filtered"
+    counts only the rows matching the current request.
+    """
+    scoped = facet_scope == "filtered" and len(positions) != len(entry["frame"])
+    filters: Dict[str, Any] = {"scope": "filtered" if facet_scope == "filtered" else "all", "counts": {}}
 
-    # Pandas sometimes returns numpy scalar objects here.
-    try:
-        if pd.isna(value):
-            return None
-    except Exception:
-        pass
+    for key, column in FACET_COLUMNS.items():
+        counts = facet_counts(entry, column, positions if scoped else None)
+        filters[key] = [value for value, _ in counts]
+        filters["counts"][key] = dict(counts)
 
-    return value
+    return filters
 
 
 def _records_for_json(df: pd.DataFrame) -> List[Dict[str, Any]]:
-    sanitized_df = df.astype(object)
-    records = sanitized_df.to_dict(orient="records")
-    return [
-        {key: _sanitize_value(value) for key, value in record.items()}
-        for record in records
-    ]
-
-
-def _filtered_dataset_frame(
+    # Clean each column in one vectorized pass (NaN/NaT/inf -> None, numpy
+    # scalars -> Python values) rather than checking every cell.
+    cleaned_columns = []
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series):
+            numbers = series.to_numpy(dtype="float64", na_value=np.nan)
+            values = numbers.astype(object)
+            values[~np.isfinite(numbers)] = None
+        else:
+            values = series.to_numpy(dtype=object, copy=True)
+            values[pd.isna(values)] = None
+        cleaned_columns.append(values)
+
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*cleaned_columns)]
+
+
+def _filtered_positions(
     *,
     dataset: str,
     search: str,
@@ -205,17 +312,19 @@ def _filtered_dataset_frame(
     end_date: str,
     sort_by: str,
     sort_dir: str,
-) -> tuple[pd.DataFrame, pd.DataFrame, Dict[str, Any], str]:
+) -> tuple[np.ndarray, Dict[str, Any], Dict[str, Any], str, List[str]]:
     normalized_dataset = dataset.strip().lower()
     schema = dataset_schema(normalized_dataset)
-    raw_df = _load_dataset_frame(normalized_dataset)
-    df = _normalize_frame(raw_df, normalized_dataset)
-
-    filtered = _apply_search(df, search, search_field)
-    filtered = _apply_exact_filter(filtered, "Merchant Name", merchant)
-    filtered = _apply_exact_filter(filtered, "Category", category)
-    filtered = _apply_date_range(filtered, start_date, end_date)
-    filtered = _sort_frame(filtered, sort_by, sort_dir)
+    entry = _resident_dataset(normalized_dataset)
+    df = entry["frame"]
+
+    mask = _combine_masks(
+        _search_mask(entry, search, search_field),
+        _exact_filter_mask(df, "Merchant Name", merchant),
+        _exact_filter_mask(df, "Category", category),
+        _date_range_mask(df, start_date, end_date),
+    )
+    positions = _sorted_positions(entry, mask, sort_by, sort_dir)
 
     visible_columns = [
         column_details["canonical_name"]
@@ -223,16 +332,7 @@ def _filtered_dataset_frame(
         if column_details["available"]
     ]
 
-    export_df = filtered[visible_columns].copy()
-    if "Transaction Date" in export_df.columns:
-        export_df["Transaction Date"] = pd.to_datetime(
-            export_df["Transaction Date"], errors="coerce"
-        ).dt.strftime("%Y-%m-%d")
-        export_df["Transaction Date"] = export_df["Transaction Date"].where(
-            export_df["Transaction Date"].notna(), None
-        )
-
-    return export_df, df, schema, normalized_dataset
+    return positions, entry, schema, normalized_dataset, visible_columns
 
 
 def get_dataset_explorer_rows(
@@ -248,8 +348,9 @@ def get_dataset_explorer_rows(
     end_date: str,
     sort_by: str,
     sort_dir: str,
+    facet_scope: str = "all",
 ) -> Dict[str, Any]:
-    filtered, df, schema, normalized_dataset = _filtered_dataset_frame(
+    positions, entry, schema, normalized_dataset, visible_columns = _filtered_positions(
         dataset=dataset,
         search=search,
         search_field=search_field,
@@ -260,17 +361,17 @@ def get_dataset_explorer_rows(
         sort_by=sort_by,
         sort_dir=sort_dir,
     )
+    df = entry["frame"]
 
     safe_page = max(page, 1)
     safe_page_size = min(max(page_size, 10), 100)
-    total_rows = len(filtered)
+    total_rows = len(positions)
     total_pages = max((total_rows + safe_page_size - 1) // safe_page_size, 1)
     current_page = min(safe_page, total_pages)
     start_index = (current_page - 1) * safe_page_size
     end_index = start_index + safe_page_size
 
-    page_df = filtered.iloc[start_index:end_index].copy()
-    visible_columns = list(page_df.columns)
+    page_df = _visible_rows(df, positions[start_index:end_index], visible_columns)
 
     return {
         "dataset": normalized_dataset,
@@ -283,10 +384,7 @@ def get_dataset_explorer_rows(
         "total_pages": total_pages,
         "sort_by": sort_by if sort_by in visible_columns else "Transaction Date",
         "sort_dir": "desc" if sort_dir.lower() == "desc" else "asc",
-        "available_filters": {
-            "merchants": _available_filter_values(df, "Merchant Name"),
-            "categories": _available_filter_values(df, "Category"),
-        },
+        "available_filters": _available_filters(entry, positions, facet_scope),
         "schema": schema,
     }
 
@@ -303,7 +401,7 @@ def export_dataset_explorer_rows(
     sort_by: str,
     sort_dir: str,
 ) -> Dict[str, Any]:
-    filtered, _, schema, normalized_dataset = _filtered_dataset_frame(
+    positions, entry, schema, normalized_dataset, visible_columns = _filtered_positions(
         dataset=dataset,
         search=search,
         search_field=search_field,
@@ -314,13 +412,20 @@ def export_dataset_explorer_rows(
         sort_by=sort_by,
         sort_dir=sort_dir,
     )
+    frame = entry["frame"]
+
+    # Rows are formatted one batch at a time while the response is streamed, so
+    # an export never holds more than EXPORT_BATCH_SIZE formatted rows at once.
+    def batches() -> Iterator[pd.DataFrame]:
+        for start in range(0, len(positions), EXPORT_BATCH_SIZE):
+            yield _visible_rows(frame, positions[start:start + EXPORT_BATCH_SIZE], visible_columns)
 
     return {
         "dataset": normalized_dataset,
         "label": schema["label"],
-        "columns": list(filtered.columns),
-        "rows": _records_for_json(filtered),
-        "total_rows": len(filtered),
-        "sort_by": sort_by if sort_by in filtered.columns else "Transaction Date",
+        "columns": visible_columns,
+        "batches": batches(),
+        "total_rows": len(positions),
+        "sort_by": sort_by if sort_by in visible_columns else "Transaction Date",
         "sort_dir": "desc" if sort_dir.lower() == "desc" else "asc",
     }
@@ -0,0 +1,98 @@
+# Streaming writers for Dataset Explorer exports.
+#
+# Each writer consumes formatted row batches (see
+# dataset_explorer.export_dataset_explorer_rows) and yields encoded chunks, so
+# the response starts as soon as the first batch is ready and memory stays flat
+# no matter how many rows are exported.
+from __future__ import annotations
+
+import tempfile
+from typing import Any, Iterable, Iterator, List
+
+import pandas as pd
+from openpyxl import Workbook
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Read size when copying the finished workbook into the response.
+_FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def stream_export(batches: Iterable[pd.DataFrame], columns: List[str], format: str) -> Iterator[bytes]:
+    """Return an iterator of encoded chunks for one export format."""
+    if format == "csv":
+        return _stream_csv(batches, columns)
+    if format == "ndjson":
+        return _stream_ndjson(batches)
+    if format == "json":
+        return _stream_json_array(batches)
+    if format == "xlsx":
+        return _stream_xlsx(batches, columns)
+    raise ValueError(f"Unsupported export format '{format}'.")
+
+
+def _stream_csv(batches: Iterable[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+    # Header comes from an empty frame so it's sent even when no rows match.
+    yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+    for batch in batches:
+        yield batch.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _stream_ndjson(batches: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    for batch in batches:
+        if batch.empty:
+            continue
+        yield (_json_lines(batch) + "\n").encode("utf-8")
+
+
+def _stream_json_array(batches: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for batch in batches:
+        if batch.empty:
+            continue
+        # JSON strings escape raw newlines, so the only newlines in
+        # _json_lines() output are the record separators.
+        records = _json_lines(batch).replace("\n", ",\n")
+        yield (("\n" if first else ",\n") + records).encode("utf-8")
+        first = False
+    yield b"\n]\n"
+
+
+def _json_lines(batch: pd.DataFrame) -> str:
+    return batch.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n")
+
+
+def _stream_xlsx(batches: Iterable[pd.DataFrame], columns: List[str]) -> Iterator[bytes]:
+    # An .xlsx file is a zip archive whose directory is written last, so the
+    # bytes can't be sent before the sheet is complete. A write-only workbook
+    # keeps memory flat while rows are added; the finished file is spooled to
+    # disk and then streamed out in chunks.
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Dataset Explorer")
+    worksheet.append(columns)
+
+    for batch in batches:
+        for row in _excel_rows(batch):
+            worksheet.append(row)
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(_FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _excel_rows(batch: pd.DataFrame) -> Iterator[tuple[Any, ...]]:
+    # openpyxl can't write NaN/NA; blank cells need None.
+    cleaned = batch.astype(object).where(batch.notna(), None)
+    return cleaned.itertuples(index=False, name=None)
@@ -0,0 +1,258 @@
+# Per-dataset indexes built once on top of the resident Dataset Explorer frame
+# (see dataset_cache.resident_dataset). Each index is memoized inside the
+# dataset's resident entry, so it is rebuilt automatically whenever a new
+# upload replaces that entry.
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def sort_permutation(entry: Dict[str, Any], column: str, descending: bool) -> np.ndarray:
+    """
+    Return the row positions of entry["frame"] ordered by column, with missing
+    values last in both directions.
+
+    Permutations are computed on first use per (column, direction) and reused
+    for every later request against the same dataset version.
+    """
+    permutations = entry.setdefault("sort_permutations", {})
+    cache_key = (column, descending)
+    permutation = permutations.get(cache_key)
+    if permutation is not None:
+        return permutation
+
+    keys, valid = _sort_keys(entry["frame"][column])
+    valid_positions = np.flatnonzero(valid)
+    ordered = valid_positions[np.argsort(keys[valid_positions], kind="stable")]
+    if descending:
+        ordered = ordered[::-1]
+
+    permutation = np.concatenate([ordered, np.flatnonzero(~valid)])
+    permutations[cache_key] = permutation
+    return permutation
+
+
+def _sort_keys(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Return (sortable key array, not-missing mask) for one column."""
+    valid = series.notna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype="datetime64[ns]").view("int64"), valid
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64", na_value=np.nan), valid
+
+    # Text sorts case-insensitively. Rank the distinct lowered values once and
+    # sort rows by integer rank instead of comparing Python strings per row.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories.astype(str).str.lower()
+    else:
+        lowered = series.astype(object).where(series.notna(), "").astype(str).str.lower()
+        codes, uniques = pd.factorize(lowered)
+
+    ranks = np.empty(len(uniques), dtype=np.int64)
+    ranks[np.argsort(np.asarray(uniques, dtype=object), kind="stable")] = np.arange(len(uniques))
+    keys = np.where(codes >= 0, ranks[np.clip(codes, 0, None)], -1) if len(uniques) else np.full(len(codes), -1)
+    return keys, valid
+
+
+# Free-text search ------------------------------------------------------------
+#
+# Each searched column gets an index over its *distinct* lowered values:
+#   value  -> row positions      (postings, stored as one argsort by value id)
+#   token  -> value ids          (tokens are maximal runs of letters/digits)
+#   3-gram -> token ids          (so substring queries skip most of the vocabulary)
+# A query is resolved against the vocabulary first and then expanded to rows,
+# so its cost follows the number of distinct values and matches, not the
+# number of rows in the dataset.
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+_NGRAM_SIZE = 3
+
+
+def search_mask(entry: Dict[str, Any], columns: List[str], query: str) -> np.ndarray:
+    """
+    Return a boolean row mask of entry["frame"] where any of columns contains
+    query (already lowercased) as a substring, matching case-insensitively
+    like str.contains on the lowered column text.
+    """
+    mask = np.zeros(len(entry["frame"]), dtype=bool)
+    for column in columns:
+        index = _column_search_index(entry, column)
+        value_ids = _matching_value_ids(index, query)
+        if value_ids.size:
+            mask[_value_positions(index, value_ids)] = True
+    return mask
+
+
+def _column_search_index(entry: Dict[str, Any], column: str) -> Dict[str, Any]:
+    indexes = entry.setdefault("search_indexes", {})
+    index = indexes.get(column)
+    if index is None:
+        index = _build_search_index(entry["frame"][column])
+        indexes[column] = index
+    return index
+
+
+def _build_search_index(series: pd.Series) -> Dict[str, Any]:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+
+    if pd.api.types.is_datetime64_any_dtype(uniques):
+        # Match what the explorer displays rather than the full timestamp.
+        values = [value.strftime("%Y-%m-%d") for value in uniques]
+    else:
+        values = [str(value) for value in uniques]
+    values = np.array([value.lower() for value in values], dtype=object)
+
+    # Postings for every value id in one array: rows grouped by value id, with
+    # starts/counts locating each group. Missing values (code -1) are skipped.
+    valid_positions = np.flatnonzero(codes >= 0)
+    valid_codes = codes[valid_positions]
+    order = valid_positions[np.argsort(valid_codes, kind="stable")]
+    counts = np.bincount(valid_codes, minlength=len(values))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+
+    token_values: Dict[str, List[int]] = {}
+    for value_id, value in enumerate(values):
+        for token in set(_TOKEN_PATTERN.findall(value)):
+            token_values.setdefault(token, []).append(value_id)
+
+    tokens = list(token_values)
+    ngram_tokens: Dict[str, List[int]] = {}
+    for token_id, token in enumerate(tokens):
+        for gram in {token[i:i + _NGRAM_SIZE] for i in range(len(token) - _NGRAM_SIZE + 1)}:
+            ngram_tokens.setdefault(gram, []).append(token_id)
+
+    return {
+        "values": values,
+        "order": order,
+        "starts": starts,
+        "counts": counts,
+        "tokens": tokens,
+        "token_values": [np.array(token_values[token], dtype=np.int64) for token in tokens],
+        "ngram_tokens": {gram: np.array(ids, dtype=np.int64) for gram, ids in ngram_tokens.items()},
+    }
+
+
+def _matching_value_ids(index: Dict[str, Any], query: str) -> np.ndarray:
+    values = index["values"]
+    pieces = _TOKEN_PATTERN.findall(query)
+    if not pieces:
+        # Pure punctuation/whitespace queries can't use the token index.
+        return np.array([i for i, value in enumerate(values) if query in value], dtype=np.int64)
+
+    candidates: Optional[np.ndarray] = None
+    for piece in pieces:
+        piece_ids = _value_ids_with_token_substring(index, piece)
+        candidates = piece_ids if candidates is None else np.intersect1d(candidates, piece_ids)
+        if not candidates.size:
+            return candidates
+
+    # A single letters/digits run can't span a separator, so token matches are
+    # exact; anything else is confirmed against the (few) candidate values.
+    if pieces == [query]:
+        return candidates
+    return candidates[np.array([query in values[i] for i in candidates], dtype=bool)]
+
+
+def _value_ids_with_token_substring(index: Dict[str, Any], piece: str) -> np.ndarray:
+    tokens = index["tokens"]
+    if len(piece) >= _NGRAM_SIZE:
+        grams = {piece[i:i + _NGRAM_SIZE] for i in range(len(piece) - _NGRAM_SIZE + 1)}
+        postings = [index["ngram_tokens"].get(gram) for gram in grams]
+        if any(posting is None for posting in postings):
+            return np.array([], dtype=np.int64)
+        postings.sort(key=len)
+        token_ids = postings[0]
+        for posting in postings[1:]:
+            token_ids = np.intersect1d(token_ids, posting, assume_unique=True)
+        token_ids = [token_id for token_id in token_ids if piece in tokens[token_id]]
+    else:
+        token_ids = [token_id for token_id, token in enumerate(tokens) if piece in token]
+
+    if not token_ids:
+        return np.array([], dtype=np.int64)
+    return np.unique(np.concatenate([index["token_values"][token_id] for token_id in token_ids]))
+
+
+def _value_positions(index: Dict[str, Any], value_ids: np.ndarray) -> np.ndarray:
+    """Expand value ids to row positions by gathering their postings slices."""
+    starts = index["starts"][value_ids]
+    counts = index["counts"][value_ids]
+    total = int(counts.sum())
+    if not total:
+        return np.array([], dtype=np.int64)
+    # offsets[k] = start of k's slice minus the number of rows emitted before it.
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return index["order"][offsets + np.arange(total)]
+
+
+# Facets ----------------------------------------------------------------------
+#
+# Filter dropdown values with row counts. Each facet column is mapped once to
+# integer ids in display order (stripped text, blanks dropped); counts are then
+# a bincount over those ids, either cached for the whole dataset or computed
+# from just the filtered row positions.
+
+def facet_counts(
+    entry: Dict[str, Any],
+    column: str,
+    positions: Optional[np.ndarray] = None,
+    limit: int = 200,
+) -> List[tuple[str, int]]:
+    """
+    Return up to limit (value, row count) pairs for column, sorted by value.
+
+    With positions=None the counts cover the whole dataset and are cached on
+    the entry; otherwise only those rows are counted and values with no rows
+    are left out.
+    """
+    index = _facet_index(entry, column)
+    if positions is None:
+        counts = index["counts"]
+    else:
+        row_ids = index["row_ids"][positions]
+        counts = np.bincount(row_ids[row_ids >= 0], minlength=len(index["values"]))
+
+    present = np.flatnonzero(counts)[:limit]
+    return [(index["values"][i], int(counts[i])) for i in present]
+
+
+def _facet_index(entry: Dict[str, Any], column: str) -> Dict[str, Any]:
+    facets = entry.setdefault("facets", {})
+    index = facets.get(column)
+    if index is not None:
+        return index
+
+    series = entry["frame"][column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+
+    # Several raw values can strip to the same label, so map raw ids onto the
+    # sorted distinct labels (-1 for missing or blank).
+    labels = [str(value).strip() for value in uniques]
+    values = sorted({label for label in labels if label})
+    value_ids = {value: i for i, value in enumerate(values)}
+    raw_to_value = np.array([value_ids.get(label, -1) for label in labels] + [-1], dtype=np.int64)
+
+    # codes == -1 (missing) indexes the trailing -1 sentinel.
+    row_ids = raw_to_value[codes]
+    index = {
+        "values": values,
+        "row_ids": row_ids,
+        "counts": np.bincount(row_ids[row_ids >= 0], minlength=len(values)),
+    }
+    facets[column] = index
+    return index
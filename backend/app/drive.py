@@ -2,7 +2,8 @@
 # raw-data directory for processing. It checks for new or modified 
 # files, downloads and normalizes them, and tracks metadata to 
 # avoid unnecessary reprocessing.
-import os, re, json
+import os, re, json, threading
+from concurrent.futures import ThreadPoolExecutor
 
 # check if running in a google cloud env
 is_gcp = os.getenv("K_SERVICE") is not None
@@ -10,22 +11,63 @@ is_gcp = os.getenv("K_SERVICE") is not None
 # define the scopes the pipeline needs
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# Folder listings run at once while walking the Drive folder tree
+DRIVE_LIST_CONCURRENCY = int(os.getenv("DRIVE_LIST_CONCURRENCY") or "4")
+
+# Folders listed by one files().list query ("'a' in parents or 'b' in parents ...")
+PARENTS_PER_QUERY = 20
+
+# Largest page size files().list allows
+LIST_PAGE_SIZE = 1000
+
+# Credentials are loaded once per process. Drive clients are not thread-safe
+# (each wraps its own httplib2 connection), so one is built per thread and
+# reused for every later call on that thread
+_drive_credentials = None
+_drive_credentials_lock = threading.Lock()
+_drive_clients = threading.local()
+
+# Long-lived so its threads keep their Drive clients between listings
+_list_pool = ThreadPoolExecutor(max_workers=max(1, DRIVE_LIST_CONCURRENCY), thread_name_prefix="drive-list")
+
 
 # ----------------------------------------------------
 # DRIVE SERVICE
 # ----------------------------------------------------
-# Authenticates and creates a Google Drive service client using 
-# a service account
+# Returns a Google Drive service client authenticated with a service
+# account. The client is cached for the calling thread
 def get_drive_service():
+    from googleapiclient.discovery import build
+
+    service = getattr(_drive_clients, "service", None)
+    if service is None:
+        service = build("drive", "v3", credentials=get_drive_credentials(), cache_discovery=False)
+        _drive_clients.service = service
+    return service
+
+
+# Loads the Drive credentials once per process
+def get_drive_credentials():
+    global _drive_credentials
+
+    with _drive_credentials_lock:
+        if _drive_credentials is None:
+            _drive_credentials = _load_drive_credentials()
+        return _drive_credentials
+
+
+# Authenticates with Google Drive using a service account
+def _load_drive_credentials():
     import google.auth
     from google.oauth2 import service_account
-    from googleapiclient.discovery import build
 
     # authenticate using default creds (GCP environment)
     if is_gcp:
         print("[INFO] Authenticating Google Drive via GCP Application Default Credentials.")
         credentials, project = google.auth.default(scopes=SCOPES)
-        return build("drive", "v3", credentials=credentials, cache_discovery=False)
+        return credentials
     
 
     # vercel prod path (fallback)
@@ -34,11 +76,10 @@ def get_drive_service():
         print("[INFO] Authenticating Google Drive via Vercel Environment Variable.")
         try:
             cred_dict = json.loads(env_creds)
-            creds = service_account.Credentials.from_service_account_info(
+            return service_account.Credentials.from_service_account_info(
                 cred_dict, 
                 scopes=SCOPES
             )
-            return build("drive", "v3", credentials=creds, cache_discovery=False)
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to parse GOOGLE_CREDENTIALS_JSON for Drive. Error: {e}")
 
@@ -53,38 +94,81 @@ def get_drive_service():
     if not os.path.exists(absolute_cred_path):
         raise FileNotFoundError(f"[ERROR] Missing Drive credentials at: {absolute_cred_path}")
 
-    creds = service_account.Credentials.from_service_account_file(
+    return service_account.Credentials.from_service_account_file(
         absolute_cred_path,
         scopes=SCOPES
     )
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
+
+# Lists the children of several folders with one paginated query and returns
+# {folder_id: [metadata (id, name, modified time, mime type), ...]}
+def list_children(folder_ids):
+    service = get_drive_service()
+    children = {folder_id: [] for folder_id in folder_ids}
+    parents_query = " or ".join(f"'{folder_id}' in parents" for folder_id in folder_ids)
+
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=f"({parents_query}) and trashed = false",
+            fields="nextPageToken, files(id, name, modifiedTime, mimeType, parents)",
+            pageSize=LIST_PAGE_SIZE,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True,
+            corpora="allDrives",
+        ).execute()
+
+        for item in results.get("files", []):
+            parents = item.pop("parents", None) or []
+            for parent in parents:
+                if parent in children:
+                    children[parent].append(dict(item))
+
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return children
 
 # Lists files in the specified Google Drive folder and returns 
 # their metadata (id, name, modified time)
 def list_files(folder_id):
-    service = get_drive_service()
-    results = service.files().list(
-        q=f"'{folder_id}' in parents and trashed = false",
-        fields="files(id, name, modifiedTime, mimeType)",
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True,
-        corpora="allDrives",
-    ).execute()
-    return results.get("files", [])
+    return list_children([folder_id])[folder_id]
 
+# Lists every file under the folder. Folders are listed breadth-first, a level
+# at a time, with each level's folders grouped into multi-parent queries that
+# run concurrently. Files come back in the same depth-first order as walking
+# the folders one by one
 def list_files_recursive(folder_id, parent_path=""):
+    children = {}
+    level = [folder_id]
+
+    while level:
+        groups = [level[i:i + PARENTS_PER_QUERY] for i in range(0, len(level), PARENTS_PER_QUERY)]
+        for listed in _list_pool.map(list_children, groups):
+            children.update(listed)
+
+        level = list(dict.fromkeys(
+            item["id"]
+            for folder in level
+            for item in children[folder]
+            if item.get("mimeType", "") == FOLDER_MIME_TYPE and item["id"] not in children
+        ))
+
+    return _walk_listed_folders(children, folder_id, parent_path, set())
+
+def _walk_listed_folders(children, folder_id, parent_path, ancestors):
     all_files = []
-    items = list_files(folder_id)
+    ancestors = ancestors | {folder_id}
 
-    for item in items:
+    for item in children.get(folder_id, []):
         name = item["name"]
         mime_type = item.get("mimeType", "")
         current_path = os.path.join(parent_path, name)
 
-        if mime_type == "application/vnd.google-apps.folder":
-            all_files.extend(list_files_recursive(item["id"], current_path))
+        if mime_type == FOLDER_MIME_TYPE:
+            if item["id"] not in ancestors:
+                all_files.extend(_walk_listed_folders(children, item["id"], current_path, ancestors))
         else:
-            item["path"] = parent_path
+            item = dict(item, path=parent_path)
             all_files.append(item)
 
     return all_files
@@ -0,0 +1,187 @@
+# Local DuckDB engine for the dashboard analytics queries.
+#
+# With QUERY_ENGINE=duckdb, bigquery_service runs its top-items,
+# spend-over-time, period-summary and item-spend queries here instead of in
+# BigQuery. The cleaned CSVs written by the pipeline are loaded as
+# {dataset}_cleaned tables, and the canonical and rollup tables are built from
+# them with the same statements the BigQuery upload job runs. Generated
+# BigQuery SQL is transpiled to DuckDB with sqlglot; the few BigQuery functions
+# DuckDB lacks (SEARCH, SAFE.PARSE_DATE, SAFE.DATE) are provided as macros.
+#
+# The database lives in memory per process and is rebuilt whenever one of the
+# cleaned CSVs changes on disk.
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import duckdb
+    import sqlglot
+    from sqlglot import ErrorLevel, exp
+except ImportError:  # pragma: no cover - only needed when QUERY_ENGINE=duckdb
+    duckdb = None
+    sqlglot = None
+
+
+CLEAN_DATA_DIR = os.getenv("CLEAN_DATA_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data_cleaning", "data", "clean")
+)
+
+CLEANED_FILENAMES = {
+    "amazon": "amazon_clean.csv",
+    "cruzbuy": "cruzbuy_clean.csv",
+    "onecard": "onecard_clean.csv",
+    "bookstore": "bookstore_clean.csv",
+}
+
+MACROS = (
+    # BigQuery SEARCH() matches when every search token appears in the text.
+    """
+    CREATE OR REPLACE MACRO search(text_value, terms) AS list_bool_and(
+      list_transform(
+        string_split(lower(trim(terms)), ' '),
+        term -> term = '' OR contains(lower(coalesce(text_value, '')), term)
+      )
+    )
+    """,
+    "CREATE OR REPLACE MACRO safe_parse_date(fmt, value) AS TRY_CAST(TRY_STRPTIME(value, fmt) AS DATE)",
+    "CREATE OR REPLACE MACRO safe_date(y, m, d) AS CASE WHEN y BETWEEN 1 AND 9999 THEN make_date(y, m, d) END",
+)
+
+# BigQuery SAFE.<fn> calls rewritten to the macros above before transpiling.
+SAFE_FUNCTION_REWRITES = (
+    ("SAFE.PARSE_DATE(", "safe_parse_date("),
+    ("SAFE.DATE(", "safe_date("),
+)
+
+PARAMETER_PATTERN = re.compile(r"\$(\w+)")
+
+_connection = None
+_loaded_version: Optional[str] = None
+_tables: set = set()
+_translations: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def cleaned_csv_paths() -> Dict[str, str]:
+    """Return {dataset: path} for every cleaned CSV present on disk."""
+    paths = {
+        dataset: os.path.join(CLEAN_DATA_DIR, filename)
+        for dataset, filename in CLEANED_FILENAMES.items()
+    }
+    return {dataset: path for dataset, path in paths.items() if os.path.exists(path)}
+
+
+def data_version(datasets: Optional[Iterable[str]] = None) -> str:
+    """Return a token that changes whenever one of the datasets' cleaned CSVs changes."""
+    paths = cleaned_csv_paths()
+    parts = []
+    for dataset in sorted(datasets if datasets is not None else CLEANED_FILENAMES):
+        path = paths.get(dataset)
+        if path:
+            stat = os.stat(path)
+            parts.append(f"{dataset}:{stat.st_mtime_ns}:{stat.st_size}")
+        else:
+            parts.append(f"{dataset}:-")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def table_exists(table_name: str) -> bool:
+    _ensure_loaded()
+    return table_name in _tables
+
+
+def translate(sql: str) -> str:
+    """Transpile BigQuery SQL generated by bigquery_service into DuckDB SQL."""
+    cached = _translations.get(sql)
+    if cached is not None:
+        return cached
+
+    rewritten = sql
+    for bigquery_name, macro_name in SAFE_FUNCTION_REWRITES:
+        rewritten = rewritten.replace(bigquery_name, macro_name)
+
+    tree = sqlglot.parse_one(rewritten, read="bigquery")
+    # PARTITION BY / CLUSTER BY have no DuckDB equivalent and are dropped.
+    translated = tree.transform(_limited_array_agg).sql(
+        dialect="duckdb", unsupported_level=ErrorLevel.IGNORE
+    )
+    _translations[sql] = translated
+    return translated
+
+
+def run_query(sql: str, query_parameters: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    """Execute generated BigQuery SQL locally and return rows as dicts."""
+    connection = _ensure_loaded()
+    translated = translate(sql)
+
+    used = set(PARAMETER_PATTERN.findall(translated))
+    params = {
+        param.name: list(param.values) if hasattr(param, "values") else param.value
+        for param in query_parameters or []
+        if param.name in used
+    }
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(translated, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _limited_array_agg(node):
+    """DuckDB has no LIMIT inside ARRAY_AGG, so slice the aggregated list instead."""
+    if isinstance(node, exp.ArrayAgg) and isinstance(node.this, exp.Limit):
+        limit = node.this
+        return exp.Anonymous(
+            this="list_slice",
+            expressions=[exp.ArrayAgg(this=limit.this), exp.Literal.number(1), limit.expression],
+        )
+    return node
+
+
+def _ensure_loaded():
+    global _connection, _loaded_version, _tables
+
+    if duckdb is None or sqlglot is None:
+        raise RuntimeError("QUERY_ENGINE=duckdb requires the duckdb and sqlglot packages.")
+
+    version = data_version()
+    if _connection is not None and _loaded_version == version:
+        return _connection
+
+    with _lock:
+        if _connection is not None and _loaded_version == version:
+            return _connection
+
+        from .bigquery_service import build_canonical_table_sql, build_rollup_table_sql
+
+        connection = duckdb.connect(":memory:")
+        for macro in MACROS:
+            connection.execute(macro)
+
+        paths = cleaned_csv_paths()
+        for dataset, path in paths.items():
+            # All-text columns mirror how the BigQuery SQL treats the cleaned
+            # tables: every field is CAST to STRING and parsed explicitly.
+            connection.execute(
+                f'CREATE TABLE "{dataset}_cleaned" AS '
+                "SELECT * FROM read_csv(?, header = true, all_varchar = true)",
+                [path],
+            )
+
+        if paths:
+            for statement in (build_canonical_table_sql(list(paths)), build_rollup_table_sql()):
+                connection.execute(translate(statement))
+
+        tables = {row[0] for row in connection.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+
+        # The previous connection is left for in-flight queries to finish on.
+        _connection, _loaded_version, _tables = connection, version, tables
+        return connection
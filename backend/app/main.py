@@ -28,9 +28,10 @@ from .routes.chatbot import router as chatbot_router
 
 def _warm_insight_caches():
     """
-    Pre-populate the lru_cache for the two most expensive ML endpoints
+    Pre-populate the query result cache for the two most expensive ML endpoints
     (ML.EXPLAIN_FORECAST) so the first real user request is served from
-    cache instead of waiting 5-15s for BigQuery inference.
+    cache instead of waiting 5-15s for BigQuery inference, then build the
+    chatbot's per-quarter analytics context snapshots.
 
     Runs in a daemon thread at startup — errors are logged but never
     surface to users since the endpoints will still work on demand.
@@ -40,10 +41,13 @@ def _warm_insight_caches():
             fetch_bookstore_forecast_from_bigquery,
             fetch_amazon_forecast_from_bigquery,
         )
+        from app.routes.chatbot import warm_analytics_context
         print("[STARTUP] Warming bookstore insights cache...")
         fetch_bookstore_forecast_from_bigquery("1_quarter", False)
         print("[STARTUP] Warming Amazon insights cache...")
         fetch_amazon_forecast_from_bigquery("1_quarter", False)
+        print("[STARTUP] Warming chatbot analytics context...")
+        warm_analytics_context()
         print("[STARTUP] Cache warm-up complete.")
     except Exception as e:
         print(f"[STARTUP] Cache warm-up failed (non-fatal): {e}")
@@ -107,7 +111,7 @@ app.include_router(insights_router)
 # Google Drive syncing, and triggering the ML retraining pipeline.
 # Key Routes: 
 #   - GET  /health, /status
-#   - POST /refresh
+#   - POST /refresh (starts a background job), GET /refresh/{job_id}
 #   - GET  /api/drive/available-years
 app.include_router(system_router)
 
@@ -0,0 +1,297 @@
+# Result cache for BigQuery-backed analytics and insight queries.
+#
+# Results are pickled once when stored, so the byte budget counts real payload
+# size and every hit hands the caller its own copy. Keys combine the function
+# name, its normalized arguments (defaults applied, keyword order ignored) and
+# a version token for just the datasets/models that call reads. A refresh that
+# replaces one upload or retrains one model changes only that token, so entries
+# for everything else stay warm and stale ones simply age out of the LRU.
+#
+# Two backends:
+#   memory - per-process LRU bounded by QUERY_CACHE_MAX_BYTES (default)
+#   sqlite - one file at QUERY_CACHE_PATH shared by every uvicorn worker on
+#            the host, with the same byte budget enforced across all of them
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .upload_metadata import data_version
+
+
+QUERY_CACHE_BACKEND = (os.getenv("QUERY_CACHE_BACKEND") or "memory").strip().lower()
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS") or "3600")
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES") or 64 * 1024 * 1024)
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "slugsmart_query_cache.sqlite3"
+)
+
+
+class MemoryBackend:
+    """In-process LRU of pickled results with a TTL and a total byte budget."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # key -> (namespace, expires_at, payload)
+        self._entries: "OrderedDict[str, Tuple[str, float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        """Return (payload or None, expired)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            if entry[1] <= time.time():
+                self._drop(key)
+                return None, True
+            self._entries.move_to_end(key)
+            return entry[2], False
+
+    def set(self, key: str, namespace: str, payload: bytes, ttl: float) -> int:
+        """Store a payload and return how many entries were evicted to fit it."""
+        if len(payload) > self.max_bytes:
+            return 0
+
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (namespace, time.time() + ttl, payload)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                evicted += 1
+        return evicted
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [key for key, entry in self._entries.items() if entry[0] == namespace]:
+                self._drop(key)
+
+    def size(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+    def _drop(self, key: str) -> None:
+        _, _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+class SQLiteBackend:
+    """Pickled results in a SQLite file so several worker processes share one cache."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_cache (
+              key TEXT PRIMARY KEY,
+              namespace TEXT NOT NULL,
+              expires_at REAL NOT NULL,
+              last_access REAL NOT NULL,
+              size INTEGER NOT NULL,
+              payload BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS query_cache_lru ON query_cache(last_access)")
+
+    def get(self, key: str) -> Tuple[Optional[bytes], bool]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, payload FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            if row[0] <= now:
+                self._conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                return None, True
+            self._conn.execute("UPDATE query_cache SET last_access = ? WHERE key = ?", (now, key))
+            return row[1], False
+
+    def set(self, key: str, namespace: str, payload: bytes, ttl: float) -> int:
+        if len(payload) > self.max_bytes:
+            return 0
+
+        now = time.time()
+        evicted = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, now + ttl, now, len(payload), sqlite3.Binary(payload)),
+                )
+                self._conn.execute("DELETE FROM query_cache WHERE expires_at <= ?", (now,))
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM query_cache").fetchone()[0]
+                if total > self.max_bytes:
+                    for old_key, size in self._conn.execute(
+                        "SELECT key, size FROM query_cache ORDER BY last_access"
+                    ).fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        self._conn.execute("DELETE FROM query_cache WHERE key = ?", (old_key,))
+                        total -= size
+                        evicted += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return evicted
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM query_cache")
+            else:
+                self._conn.execute("DELETE FROM query_cache WHERE namespace = ?", (namespace,))
+
+    def size(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM query_cache"
+            ).fetchone()
+        return {"entries": entries, "bytes": total}
+
+
+def _create_backend():
+    if QUERY_CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteBackend(QUERY_CACHE_PATH, QUERY_CACHE_MAX_BYTES)
+        except Exception as sqlite_error:
+            print(f"[WARN] Query cache could not open '{QUERY_CACHE_PATH}', using memory: {sqlite_error}")
+    return MemoryBackend(QUERY_CACHE_MAX_BYTES)
+
+
+_backend = _create_backend()
+
+# namespace -> {"hits": n, "misses": n, "evictions": n, "expirations": n, "errors": n}
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(namespace: str, field: str, amount: int = 1) -> None:
+    if not amount:
+        return
+    with _stats_lock:
+        counters = _stats.setdefault(
+            namespace, {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "errors": 0}
+        )
+        counters[field] += amount
+
+
+def _bound_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, Any]:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _all_data_version(arguments: Dict[str, Any]) -> str:
+    return data_version()
+
+
+def cached_query(
+    version: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ttl: Optional[float] = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Cache a query function's results in the shared result cache.
+
+    version receives the call's bound arguments and returns a token for the
+    data the call depends on; it defaults to the version of every upload.
+    The wrapped function keeps a cache_clear() that drops only its own
+    entries, so existing callers of the old lru_cache API keep working.
+    """
+    version_for = version or _all_data_version
+    entry_ttl = QUERY_CACHE_TTL_SECONDS if ttl is None else ttl
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        namespace = func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                arguments = _bound_arguments(signature, args, kwargs)
+                normalized = json.dumps(arguments, sort_keys=True, default=str)
+                key_source = f"{namespace}|{normalized}|{version_for(arguments)}"
+                key = hashlib.sha1(key_source.encode("utf-8")).hexdigest()
+                payload, expired = _backend.get(key)
+            except Exception as cache_error:
+                # A broken cache must never take the analytics endpoints down.
+                print(f"[WARN] Query cache lookup failed for {namespace}: {cache_error}")
+                _count(namespace, "errors")
+                return func(*args, **kwargs)
+
+            _count(namespace, "expirations", int(expired))
+            if payload is not None:
+                _count(namespace, "hits")
+                return pickle.loads(payload)
+
+            _count(namespace, "misses")
+            result = func(*args, **kwargs)
+            try:
+                evicted = _backend.set(key, namespace, pickle.dumps(result, pickle.HIGHEST_PROTOCOL), entry_ttl)
+                _count(namespace, "evictions", evicted)
+            except Exception as cache_error:
+                print(f"[WARN] Query cache store failed for {namespace}: {cache_error}")
+                _count(namespace, "errors")
+            return result
+
+        wrapper.cache_clear = lambda: _backend.clear(namespace)
+        return wrapper
+
+    return decorator
+
+
+def clear_query_cache() -> None:
+    """Drop every cached query result."""
+    _backend.clear()
+
+
+def query_cache_stats() -> Dict[str, Any]:
+    """Return backend settings, current size and per-function hit/miss counters."""
+    with _stats_lock:
+        per_function = {namespace: dict(counters) for namespace, counters in _stats.items()}
+
+    totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "errors": 0}
+    for counters in per_function.values():
+        for field, value in counters.items():
+            totals[field] += value
+    lookups = totals["hits"] + totals["misses"]
+
+    return {
+        "backend": _backend.name,
+        "ttl_seconds": QUERY_CACHE_TTL_SECONDS,
+        "max_bytes": QUERY_CACHE_MAX_BYTES,
+        **_backend.size(),
+        **totals,
+        "hit_rate": round(totals["hits"] / lookups, 4) if lookups else None,
+        "functions": per_function,
+    }
@@ -0,0 +1,136 @@
+# Background job tracking for /api/system/refresh.
+#
+# A refresh (Drive sync, cleaning, Firestore uploads, summaries, model
+# retraining) takes minutes, so the route only starts it here and returns a
+# job ID. The job runs in a worker thread and reports each stage it enters
+# through a progress callback; /api/system/status and
+# /api/system/refresh/{job_id} read the recorded state.
+#
+# State is per process. At most one refresh runs at a time in a process, and
+# the last few finished jobs are kept for status lookups.
+from __future__ import annotations
+
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+
+FINISHED_JOBS_KEPT = 20
+
+# job_id -> job state dict (see _new_job)
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_running_job_id: Optional[str] = None
+_last_finished_job_id: Optional[str] = None
+_jobs_lock = threading.Lock()
+
+
+class RefreshAlreadyRunning(Exception):
+    """Raised when a refresh is requested while another one is in progress."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Refresh job {job_id} is already running.")
+        self.job_id = job_id
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _new_job(job_id: str) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": "running",
+        "stage": None,
+        "stages": [],
+        "started_at": _now(),
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+
+
+def _enter_stage(job_id: str, stage: str) -> None:
+    """Close the job's current stage and open a new one."""
+    with _jobs_lock:
+        job = _jobs[job_id]
+        now = _now()
+        if job["stages"] and job["stages"][-1]["finished_at"] is None:
+            job["stages"][-1]["finished_at"] = now
+        job["stages"].append({"name": stage, "started_at": now, "finished_at": None})
+        job["stage"] = stage
+    print(f"[INFO] Refresh job {job_id}: {stage}")
+
+
+def _finish(job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+    global _running_job_id, _last_finished_job_id
+
+    with _jobs_lock:
+        job = _jobs[job_id]
+        now = _now()
+        if job["stages"] and job["stages"][-1]["finished_at"] is None:
+            job["stages"][-1]["finished_at"] = now
+        job.update(status=status, stage=None, finished_at=now, result=result, error=error)
+        _running_job_id = None
+        _last_finished_job_id = job_id
+
+        finished = [key for key, value in _jobs.items() if value["status"] != "running"]
+        for old_job_id in finished[:-FINISHED_JOBS_KEPT]:
+            del _jobs[old_job_id]
+
+
+def _run(job_id: str, target: Callable[[Callable[[str], None]], Any]) -> None:
+    try:
+        result = target(lambda stage: _enter_stage(job_id, stage))
+    except Exception as e:
+        traceback.print_exc()
+        _finish(job_id, "failed", error=str(e))
+        return
+    _finish(job_id, "succeeded", result=result)
+
+
+def start_job(target: Callable[[Callable[[str], None]], Any]) -> str:
+    """
+    Run target(progress) in a background thread and return the new job ID.
+
+    target calls progress(stage_name) as it moves through its stages and
+    returns a JSON-serializable result. Raises RefreshAlreadyRunning when a
+    job is still in progress.
+    """
+    global _running_job_id
+
+    with _jobs_lock:
+        if _running_job_id is not None:
+            raise RefreshAlreadyRunning(_running_job_id)
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = _new_job(job_id)
+        _running_job_id = job_id
+
+    threading.Thread(target=_run, args=(job_id, target), name=f"refresh-{job_id[:8]}", daemon=True).start()
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a snapshot of one job's state, or None if it is unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return _copy(job) if job else None
+
+
+def refresh_status() -> Dict[str, Any]:
+    """Return whether a job is running, the current job and the last finished one."""
+    with _jobs_lock:
+        running = _jobs.get(_running_job_id) if _running_job_id else None
+        last = _jobs.get(_last_finished_job_id) if _last_finished_job_id else None
+        return {
+            "job_running": running is not None,
+            "current_job": _copy(running) if running else None,
+            "last_updated": last["finished_at"] if last else None,
+            "last_result": _copy(last) if last else None,
+        }
+
+
+def _copy(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {**job, "stages": [dict(stage) for stage in job["stages"]]}
@@ -6,6 +6,7 @@ from app.analytics import get_item_freq, get_spend_over_time
 from app.analytics_bookstore import get_campus_store_item_insights
 from app.data_config import dataset_schema
 from app.firebase import bucket
+from app.json_response import FastJSONResponse
 from app.bigquery_service import (
     query_item_spend_over_time_from_bigquery,
     query_period_summary_from_bigquery,
@@ -13,7 +14,7 @@ from app.bigquery_service import (
     query_top_items_from_bigquery,
 )
 
-router = APIRouter(tags=["analytics"])
+router = APIRouter(tags=["analytics"], default_response_class=FastJSONResponse)
 
 # Fixed path in Firebase Storage — uploaded once via scripts/upload_external_vendors.py.
 # Re-upload whenever data_mining.ipynb regenerates the CSV.
@@ -24,7 +25,7 @@ _EXTERNAL_VENDORS_STORAGE_PATH = "reference/external_vendors_combined.csv"
 def get_top_items(user_id: str):
     try:
         data = get_item_freq(user_id)
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -55,7 +56,7 @@ def get_top_items_bigquery(
             category_originals=category_originals,
             high_impact_only=high_impact_only,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -63,7 +64,7 @@ def get_top_items_bigquery(
 def get_dataset_config(dataset: str = "overall"):
     try:
         normalized = dataset.strip().lower()
-        return {"status": "success", "data": dataset_schema(normalized)}
+        return FastJSONResponse({"status": "success", "data": dataset_schema(normalized)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -92,7 +93,7 @@ def spend_over_time(
             interval=interval,
             include_refunds=include_refunds,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -110,7 +111,7 @@ def spend_over_time_bigquery(
             selected_year=selected_year,
             selected_quarter=selected_quarter,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -128,7 +129,7 @@ def period_summary_bigquery(
             date=date,
             limit=limit,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -151,7 +152,7 @@ def item_spend_over_time_bigquery(
             selected_quarter=selected_quarter,
             limit=limit,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -198,14 +199,14 @@ def external_vendors(limit: int = 10):
                 "spend_share_pct": float(row.get("spend_share_pct") or 0),
             })
 
-        return {
+        return FastJSONResponse({
             "status": "success",
             "data": {
                 "vendors": rows,
                 "total_vendors": total_vendors,
                 "source": f"gs://{bucket.name}/{_EXTERNAL_VENDORS_STORAGE_PATH}",
             },
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -226,7 +227,7 @@ def campus_store_items(top_n: int = 5, lookback_days: int = 90, account: str = "
     Returns most/least purchased Campus Store items and stock priority recommendations.
     """
     try:
-        return _bookstore_items_response(top_n, lookback_days, account)
+        return FastJSONResponse(_bookstore_items_response(top_n, lookback_days, account))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -236,7 +237,7 @@ def api_bookstore_items(top_n: int = 5, lookback_days: int = 90, account: str =
     Standardized Bookstore analytics endpoint.
     """
     try:
-        return _bookstore_items_response(top_n, lookback_days, account)
+        return FastJSONResponse(_bookstore_items_response(top_n, lookback_days, account))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -246,6 +247,6 @@ def api_campus_store_items(top_n: int = 5, lookback_days: int = 90, account: str
     Alias for Campus Store analytics endpoint.
     """
     try:
-        return _bookstore_items_response(top_n, lookback_days, account)
+        return FastJSONResponse(_bookstore_items_response(top_n, lookback_days, account))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,11 +1,35 @@
+import os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.services.chatbot_service import generate_chatbot_guidance
 from app.bigquery_service import query_top_items_from_bigquery
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 router = APIRouter()
 
+# Seconds a precomputed analytics context is served before it is rebuilt in
+# the background. Older snapshots are still returned while the rebuild runs.
+CHATBOT_CONTEXT_TTL_SECONDS = float(os.getenv("CHATBOT_CONTEXT_TTL_SECONDS") or "600")
+
+CHATBOT_QUARTERS = ["All Quarters", "Fall", "Winter", "Spring", "Summer"]
+
+# (dataset, sort_mode, group_by) for each list the chatbot is given as context.
+CONTEXT_QUERIES = {
+    "top_items": ("overall", "frequency", "item"),
+    "top_vendors_by_spend": ("overall", "cost", "merchant"),
+    "bookstore_top_items": ("bookstore", "frequency", "item"),
+}
+
+_context_pool = ThreadPoolExecutor(max_workers=len(CONTEXT_QUERIES), thread_name_prefix="chatbot-context")
+
+# (selected_year, selected_quarter) -> (built_at, analytics_context)
+_context_snapshots: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+# (selected_year, selected_quarter) -> Future of the build already running, so
+# concurrent callers wait on it instead of starting their own queries
+_context_builds: Dict[Tuple[str, str], Future] = {}
+_context_lock = threading.Lock()
+
 ALLOWED_DATASETS = {
     "overall",
     "amazon",
@@ -58,6 +82,108 @@ def is_blocked_message(message: str) -> bool:
     return any(term in lowered for term in BLOCKED_TERMS)
 
 
+def _build_analytics_context(selected_year: str, selected_quarter: str) -> Dict[str, Any]:
+    """Run the context queries concurrently and assemble the chatbot's analytics context."""
+    futures = {
+        key: _context_pool.submit(
+            query_top_items_from_bigquery,
+            dataset=dataset,
+            selected_year=selected_year,
+            selected_quarter=selected_quarter,
+            limit=5,
+            sort_mode=sort_mode,
+            group_by=group_by,
+        )
+        for key, (dataset, sort_mode, group_by) in CONTEXT_QUERIES.items()
+    }
+
+    analytics_context = {"data_scope": "all approved datasets: amazon, cruzbuy, onecard, bookstore"}
+    for key, future in futures.items():
+        analytics_context[key] = future.result().get("items", [])
+    analytics_context["selected_year"] = selected_year
+    analytics_context["selected_quarter"] = selected_quarter
+    return analytics_context
+
+
+def _claim_build(snapshot_key: Tuple[str, str]) -> Tuple[Future, bool]:
+    """Return the in-flight build for a key and whether the caller must run it. Hold _context_lock."""
+    build = _context_builds.get(snapshot_key)
+    if build is not None:
+        return build, False
+    build = Future()
+    _context_builds[snapshot_key] = build
+    return build, True
+
+
+def _run_build(snapshot_key: Tuple[str, str], build: Future) -> Dict[str, Any]:
+    try:
+        analytics_context = _build_analytics_context(*snapshot_key)
+    except BaseException as e:
+        with _context_lock:
+            _context_builds.pop(snapshot_key, None)
+        build.set_exception(e)
+        raise
+
+    with _context_lock:
+        _context_snapshots[snapshot_key] = (time.monotonic(), analytics_context)
+        _context_builds.pop(snapshot_key, None)
+    build.set_result(analytics_context)
+    return analytics_context
+
+
+def _refresh_analytics_context(selected_year: str, selected_quarter: str) -> Dict[str, Any]:
+    snapshot_key = (selected_year, selected_quarter)
+    with _context_lock:
+        build, owner = _claim_build(snapshot_key)
+    if not owner:
+        return build.result()
+    return _run_build(snapshot_key, build)
+
+
+def _background_refresh(snapshot_key: Tuple[str, str], build: Future) -> None:
+    try:
+        _run_build(snapshot_key, build)
+    except Exception as e:
+        print(f"[CHATBOT ANALYTICS CONTEXT ERROR] Background refresh failed: {e}")
+
+
+def get_analytics_context(selected_year: str, selected_quarter: str) -> Dict[str, Any]:
+    """
+    Return the analytics context for a year/quarter from its snapshot.
+
+    A fresh snapshot is returned as-is. A stale one is still returned while a
+    single background rebuild replaces it. With no snapshot yet, the first
+    caller builds it and concurrent callers wait for that same build, so only
+    one set of BigQuery queries runs per quarter.
+    """
+    snapshot_key = (selected_year, selected_quarter)
+    build, owner = None, False
+    with _context_lock:
+        snapshot = _context_snapshots.get(snapshot_key)
+        refresh_due = snapshot is None or time.monotonic() - snapshot[0] >= CHATBOT_CONTEXT_TTL_SECONDS
+        if refresh_due:
+            build, owner = _claim_build(snapshot_key)
+
+    if snapshot is None:
+        return _run_build(snapshot_key, build) if owner else build.result()
+    if owner:
+        threading.Thread(target=_background_refresh, args=(snapshot_key, build), daemon=True).start()
+    return snapshot[1]
+
+
+def invalidate_analytics_context() -> None:
+    """Mark every snapshot stale so the next question triggers a rebuild."""
+    with _context_lock:
+        for snapshot_key, (_, analytics_context) in list(_context_snapshots.items()):
+            _context_snapshots[snapshot_key] = (float("-inf"), analytics_context)
+
+
+def warm_analytics_context() -> None:
+    """Build the all-time snapshot for every quarter the chatbot recognizes."""
+    for selected_quarter in CHATBOT_QUARTERS:
+        _refresh_analytics_context("All Time", selected_quarter)
+
+
 @router.post("/guidance")
 def get_chatbot_guidance(request: ChatbotRequest):
     try:
@@ -141,41 +267,7 @@ def get_chatbot_guidance(request: ChatbotRequest):
             elif "summer" in message_lower:
                 selected_quarter = "Summer"
 
-            top_items = query_top_items_from_bigquery(
-                dataset="overall",
-                selected_year=selected_year,
-                selected_quarter=selected_quarter,
-                limit=5,
-                sort_mode="frequency",
-                group_by="item",
-            )
-
-            top_vendors = query_top_items_from_bigquery(
-                dataset="overall",
-                selected_year=selected_year,
-                selected_quarter=selected_quarter,
-                limit=5,
-                sort_mode="cost",
-                group_by="merchant",
-            )
-
-            bookstore_items = query_top_items_from_bigquery(
-                dataset="bookstore",
-                selected_year=selected_year,
-                selected_quarter=selected_quarter,
-                limit=5,
-                sort_mode="frequency",
-                group_by="item",
-            )
-
-            analytics_context = {
-                "data_scope": "all approved datasets: amazon, cruzbuy, onecard, bookstore",
-                "top_items": top_items.get("items", []),
-                "top_vendors_by_spend": top_vendors.get("items", []),
-                "bookstore_top_items": bookstore_items.get("items", []),
-                "selected_year": selected_year,
-                "selected_quarter": selected_quarter,
-            }
+            analytics_context = get_analytics_context(selected_year, selected_quarter)
 
         except Exception as e:
             print(f"[CHATBOT ANALYTICS CONTEXT ERROR] {e}")
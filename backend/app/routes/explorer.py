@@ -1,10 +1,10 @@
-import io
-import pandas as pd
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from app.dataset_explorer import export_dataset_explorer_rows, get_dataset_explorer_rows
+from app.dataset_export import EXPORT_MEDIA_TYPES, stream_export
+from app.json_response import FastJSONResponse
 
-router = APIRouter(tags=["explorer"])
+router = APIRouter(tags=["explorer"], default_response_class=FastJSONResponse)
 
 @router.get("/api/dataset-explorer")
 def dataset_explorer(
@@ -19,6 +19,7 @@ def dataset_explorer(
     end_date: str = "",
     sort_by: str = "Transaction Date",
     sort_dir: str = "desc",
+    facet_scope: str = Query("all", pattern="^(all|filtered)$"),
 ):
     try:
         data = get_dataset_explorer_rows(
@@ -33,8 +34,9 @@ def dataset_explorer(
             end_date=end_date,
             sort_by=sort_by,
             sort_dir=sort_dir,
+            facet_scope=facet_scope,
         )
-        return {"status": "success", "data": data}
+        return FastJSONResponse({"status": "success", "data": data})
     except HTTPException:
         raise
     except Exception as e:
@@ -52,7 +54,7 @@ def dataset_explorer_export(
     end_date: str = "",
     sort_by: str = "Transaction Date",
     sort_dir: str = "desc",
-    format: str = Query("csv", pattern="^(csv|xlsx|json)$"),
+    format: str = Query("csv", pattern="^(csv|xlsx|json|ndjson)$"),
 ):
     try:
         export_payload = export_dataset_explorer_rows(
@@ -67,37 +69,15 @@ def dataset_explorer_export(
             sort_dir=sort_dir,
         )
 
-        rows = export_payload["rows"]
-        columns = export_payload["columns"]
-        df = pd.DataFrame(rows, columns=columns)
         base_name = f"{export_payload['dataset']}_dataset_export"
-
-        if format == "csv":
-            buffer = io.StringIO()
-            df.to_csv(buffer, index=False)
-            file_buffer = io.BytesIO(buffer.getvalue().encode("utf-8"))
-            file_buffer.seek(0)
-            media_type = "text/csv"
-            filename = f"{base_name}.csv"
-        elif format == "xlsx":
-            file_buffer = io.BytesIO()
-            with pd.ExcelWriter(file_buffer, engine="openpyxl") as writer:
-                df.to_excel(writer, index=False, sheet_name="Dataset Explorer")
-            file_buffer.seek(0)
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            filename = f"{base_name}.xlsx"
-        else:
-            json_buffer = io.StringIO()
-            df.to_json(json_buffer, orient="records", indent=2, force_ascii=False)
-            file_buffer = io.BytesIO(json_buffer.getvalue().encode("utf-8"))
-            file_buffer.seek(0)
-            media_type = "application/json"
-            filename = f"{base_name}.json"
+        filename = f"{base_name}.{format}"
+        media_type = EXPORT_MEDIA_TYPES[format]
+        body = stream_export(export_payload["batches"], export_payload["columns"], format)
 
         headers = {
             "Content-Disposition": f'attachment; filename="{filename}"'
         }
-        return StreamingResponse(file_buffer, media_type=media_type, headers=headers)
+        return StreamingResponse(body, media_type=media_type, headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -86,7 +86,7 @@ def get_item_history(
 
 @router.get("/cache/clear")
 def clear_cache():
-    """Dev utility: clears all lru_cache entries so new SQL takes effect without restart."""
+    """Dev utility: clears cached insight results so new SQL takes effect without restart."""
     fetch_bookstore_forecast_from_bigquery.cache_clear()
     fetch_amazon_forecast_from_bigquery.cache_clear()
     fetch_item_history.cache_clear()
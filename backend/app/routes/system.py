@@ -1,37 +1,31 @@
-import os, asyncio
+import os
 from fastapi import APIRouter, HTTPException, status
 from app.drive import sync_drive_folder, list_available_years
 from jobs.run_full_pipeline import run_full_pipeline
 from jobs.retrain_models import retrain_arima_model
 from app.drive import list_files_recursive
 from app.firebase import db
-from app.bigquery_service import (
-    query_top_items_from_bigquery,
-    query_spend_over_time_from_bigquery,
-    query_period_summary_from_bigquery,
-    query_item_spend_over_time_from_bigquery
-)
+from app.query_cache import query_cache_stats
+from app.upload_metadata import invalidate_upload_metadata
+from app.bigquery_service import invalidate_bigquery_metadata
+from app.routes.chatbot import invalidate_analytics_context
+from app.refresh_jobs import RefreshAlreadyRunning, get_job, refresh_status, start_job
 
 router = APIRouter(
     prefix="/api/system",
     tags=["system"]
 )
 
-# global lock to ensure synchronous task execution
-refresh_lock = asyncio.Lock()
-
 @router.get("/health")
 # Simple health check endpoint to verify the backend is running.
 def health():
     return {"ok": True}
 
 @router.get("/status")
-# Simple backend status check.
-def status():
+# Backend status check, including the state of the latest refresh job.
+def get_status():
     return {
-        "job_running": False,
-        "last_updated": None,
-        "last_result": None,
+        **refresh_status(),
         "message": "Backend is up",
     }
 
@@ -146,6 +140,13 @@ def get_sync_status():
 
 
 
+@router.get("/cache-stats")
+def get_cache_stats():
+    """Reports the BigQuery result cache backend, size, and hit/miss/eviction counters."""
+    return {"status": "success", "data": query_cache_stats()}
+
+
+
 @router.get("/drive/available-years")
 def get_available_years():
     try:
@@ -159,62 +160,81 @@ def get_available_years():
 
 
 
-@router.post("/refresh")
-async def refresh_data():
+def _run_refresh(progress):
     """
-    Triggers the global data refresh pipeline safely.
-    
-    Checks the global refresh_lock. If the system is currently processing a refresh,
-    it returns a 409 Conflict to prevent concurrent executions. If free, it sequentially
-    pulls new data from Google Drive and retrains the BigQuery prediction models.
+    Runs the data refresh pipeline, reporting each stage through progress().
+
+    Pulls new data from Google Drive, and only when files changed, cleans and
+    uploads it and retrains the BigQuery prediction models.
     """
-    # check if a task is already running
-    if refresh_lock.locked():
+    folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
+
+    # If Vercel is detected, route all file writes to the temporary /tmp directory
+    is_vercel = os.environ.get("VERCEL") == "1"
+    base_write_dir = "/tmp" if is_vercel else os.path.dirname(os.path.dirname(__file__))
+    raw_dir = os.path.join(base_write_dir, "data_cleaning", "data", "raw")
+
+    # Ensure the directories actually exist before downloading
+    os.makedirs(raw_dir, exist_ok=True)
+    progress("drive_sync")
+    sync_result = sync_drive_folder(folder_id, raw_dir)
+
+    # if no files changed, skip ML retraining and exit early
+    if not sync_result["changed"]:
+        return {"message": "No changes made to the data. Skipped ML retraining.", "changed_files": []}
+
+    # process new data
+    try:
+        result = run_full_pipeline(base_dir=base_write_dir, progress=progress)
+    finally:
+        # Re-read the upload docs and table versions as soon as the pipeline
+        # has written anything, even if it or the retraining below fails.
+        # Cached query results are keyed by those versions, so only datasets
+        # that actually changed miss; everything else keeps serving warm results.
+        invalidate_upload_metadata()
+        invalidate_bigquery_metadata()
+        invalidate_analytics_context()
+
+    # trigger ML retraining only because new data was processed successfully
+    progress("retraining")
+    try:
+        retrain_arima_model()
+    finally:
+        # Pick up the retrained models' creation times
+        invalidate_bigquery_metadata()
+
+    return {
+        "message": "New Drive updates detected and prediction models retrained.",
+        "changed_files": sync_result["files"],
+        "result": result,
+    }
+
+
+@router.post("/refresh", status_code=status.HTTP_202_ACCEPTED)
+def refresh_data():
+    """
+    Starts the global data refresh pipeline as a background job.
+
+    Returns the job ID immediately; progress and the final result are reported
+    by /api/system/refresh/{job_id} and /api/system/status. If a refresh is
+    already running, returns a 409 Conflict to prevent concurrent executions.
+    """
+    try:
+        job_id = start_job(_run_refresh)
+    except RefreshAlreadyRunning as e:
         print("[WARNING] Refresh requested but a task is already ongoing!")
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="A refresh task is already ongoing. Please wait for it to complete before requesting another one."
+            detail=f"A refresh task is already ongoing (job {e.job_id}). Please wait for it to complete before requesting another one."
         )
 
+    return {"status": "accepted", "job_id": job_id}
+
 
-    # acquire lock and execute tasks
-    async with refresh_lock:
-        print("[INFO] Refresh lock acquired. Starting background tasks.")
-        try:
-            folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
-
-            # If Vercel is detected, route all file writes to the temporary /tmp directory
-            is_vercel = os.environ.get("VERCEL") == "1"
-            base_write_dir = "/tmp" if is_vercel else os.path.dirname(os.path.dirname(__file__))
-            raw_dir = os.path.join(base_write_dir, "data_cleaning", "data", "raw")
-
-            # Ensure the directories actually exist before downloading
-            os.makedirs(raw_dir, exist_ok=True)
-            sync_result = sync_drive_folder(folder_id, raw_dir)
-
-            # if no files changed, skip ML retraining and exit early
-            if not sync_result["changed"]:
-                return {"status": "ok", "message": "No changes made to the data. Skipped ML retraining.", "changed_files": []}
-
-            # process new data
-            result = run_full_pipeline(base_dir=base_write_dir)
-
-            # trigger ML retraining only because new data was processed successfully
-            print("[INFO] New data processed. Executing ML model retraining.")
-            retrain_arima_model()
-
-            # Clear BigQuery query caches to ensure insights reflect the newly updated data and models
-            query_top_items_from_bigquery.cache_clear()
-            query_spend_over_time_from_bigquery.cache_clear()
-            query_period_summary_from_bigquery.cache_clear()
-            query_item_spend_over_time_from_bigquery.cache_clear()
-
-            return {
-                "status": "ok", 
-                "message": "New Drive updates detected and prediction models retrained.", 
-                "changed_files": sync_result["files"], 
-                "result": result
-                }
-    
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+@router.get("/refresh/{job_id}")
+def get_refresh_job(job_id: str):
+    """Reports one refresh job's status, current stage, stage timings and result."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown refresh job.")
+    return {"status": "success", "data": job}
@@ -0,0 +1,101 @@
+# In-process cache for the Firestore uploads/{dataset} documents.
+#
+# Every BigQuery query and Dataset Explorer request needs the latest upload
+# metadata (storagePath, createdAt, ...) for one or more datasets. Those docs
+# only change when the pipeline pushes a new upload, so they are cached for a
+# short TTL and refreshed all at once with a single get_all() round trip.
+# /api/system/refresh invalidates the cache after a pipeline run.
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+
+# Upload document IDs are stable per dataset.
+UPLOAD_DOC_IDS = ("amazon", "cruzbuy", "onecard", "bookstore")
+
+UPLOAD_METADATA_TTL_SECONDS = float(os.getenv("UPLOAD_METADATA_TTL_SECONDS") or "300")
+
+# upload_id -> {"fetched_at": <monotonic seconds>, "payload": <dict or None>}
+_metadata_cache: Dict[str, Dict[str, Any]] = {}
+_metadata_lock = threading.Lock()
+
+
+def get_upload_metadata(upload_id: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of uploads/{upload_id}, or None when the doc doesn't exist."""
+    return get_upload_metadata_many([upload_id])[upload_id]
+
+
+def get_upload_metadata_many(upload_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Return {upload_id: metadata or None} for several uploads.
+
+    Any expired or missing entry triggers one batched read of every known
+    upload doc (plus the requested ones), so an "overall" query costs at most
+    one Firestore round trip.
+    """
+    requested = list(dict.fromkeys(upload_ids))
+
+    with _metadata_lock:
+        if any(not _is_fresh(upload_id) for upload_id in requested):
+            _refresh_locked(list(dict.fromkeys([*UPLOAD_DOC_IDS, *requested])))
+
+        return {
+            upload_id: _copy(_metadata_cache.get(upload_id, {}).get("payload"))
+            for upload_id in requested
+        }
+
+
+def data_version(upload_ids: Iterable[str] = UPLOAD_DOC_IDS) -> str:
+    """
+    Return a short token that changes whenever any of the given uploads is
+    replaced, built from each doc's storagePath and createdAt.
+    """
+    metadata = get_upload_metadata_many(upload_ids)
+    parts = [
+        f"{upload_id}:{payload.get('storagePath')}:{payload.get('createdAt')}" if payload else f"{upload_id}:-"
+        for upload_id, payload in sorted(metadata.items())
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def invalidate_upload_metadata(upload_ids: Optional[Iterable[str]] = None) -> None:
+    """Drop cached metadata for the given uploads, or for all of them."""
+    with _metadata_lock:
+        if upload_ids is None:
+            _metadata_cache.clear()
+            return
+        for upload_id in upload_ids:
+            _metadata_cache.pop(upload_id, None)
+
+
+def _is_fresh(upload_id: str) -> bool:
+    entry = _metadata_cache.get(upload_id)
+    return entry is not None and time.monotonic() - entry["fetched_at"] < UPLOAD_METADATA_TTL_SECONDS
+
+
+def _refresh_locked(upload_ids: list[str]) -> None:
+    from .firebase import db
+
+    collection = db.collection("uploads")
+    refs = [collection.document(upload_id) for upload_id in upload_ids]
+    fetched_at = time.monotonic()
+
+    found: Dict[str, Dict[str, Any]] = {}
+    for snapshot in db.get_all(refs):
+        if snapshot.exists:
+            payload = snapshot.to_dict() or {}
+            payload["upload_id"] = snapshot.id
+            found[snapshot.id] = payload
+
+    # Missing docs are cached as None too, so absent datasets don't cause a
+    # Firestore read on every request.
+    for upload_id in upload_ids:
+        _metadata_cache[upload_id] = {"fetched_at": fetched_at, "payload": found.get(upload_id)}
+
+
+def _copy(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return dict(payload) if payload is not None else None
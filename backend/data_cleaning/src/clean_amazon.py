@@ -2,6 +2,7 @@ import os
 import re
 import glob
 import pandas as pd
+from .clean_store import load_manifest, pending_raw_files, save_clean_data, write_partition
 from ..config.amazon_config import STATE_MAP, UNNECESSARY_COLUMNS
 
 RAW_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "raw")
@@ -35,17 +36,19 @@ def load_amazon():
 
     file_paths = sorted(file_paths)  # Sort files alphabetically (oldest to newest)
 
-    if not file_paths:
-        if os.path.exists(clean_file_path):
-            print(f"[INFO] No new Amazon raw files. Loading historical clean data.")
-            return pd.read_csv(clean_file_path, low_memory=False)
-            
+    manifest = load_manifest("amazon", clean_file_path)
+
+    if not file_paths and not manifest["partitions"]:
         print(f"[WARNING] No Amazon files found in {RAW_DIR} and no history exists.")
         return pd.DataFrame()
 
-    dfs = []
+    # Only raw files that are new or changed since the last run get cleaned
+    pending = pending_raw_files(manifest, file_paths)
+    if not pending:
+        print(f"[INFO] No new Amazon raw files. Loading historical clean data.")
 
-    for file_path in file_paths:
+    for raw_file in pending:
+        file_path = raw_file["path"]
         # Dynamically read based on extension
         if file_path.endswith('.csv'):
             df = pd.read_csv(file_path, low_memory=False)
@@ -58,11 +61,9 @@ def load_amazon():
         if year is not None:
             df["Year"] = year
 
-        dfs.append(df)
-
-    combined_df = pd.concat(dfs, ignore_index=True)
+        write_partition(manifest, raw_file, df, year)
 
-    return save_clean_data(combined_df, clean_file_path)
+    return save_clean_data(manifest, clean_file_path, changed=bool(pending))
 # ----------------------------------------------------------------------------
 
 
@@ -238,24 +239,5 @@ def format_currency(df, cols):
 
 
 # -------------------------------- STEP 4: SAVE ------------------------------
-# Save the cleaned dataset
-def save_clean_data(new_df, output_path):
-    os.makedirs(CLEAN_DIR, exist_ok=True)
-    
-    if os.path.exists(output_path):
-        existing_df = pd.read_csv(output_path, low_memory=False)
-        
-        # Append the brand new rows to the historical rows
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        
-        # Drop exact duplicates so re-running the script doesn't bloat the CSV/Database
-        combined_df = combined_df.drop_duplicates(ignore_index=True)
-    else:
-        # If no history exists, the new data becomes the baseline
-        combined_df = new_df
-
-    combined_df.to_csv(output_path, index=False)
-    
-    # Return the combined master dataframe back up the chain to Firestore
-    return combined_df
+# Saving is shared by every cleaner, see clean_store.save_clean_data
 # ----------------------------------------------------------------------------
\ No newline at end of file
@@ -1,7 +1,9 @@
 import os
+import numpy as np
 import pandas as pd
 import re
 import glob
+from .clean_store import load_manifest, pending_raw_files, save_clean_data, write_partition
 from ..config.onecard_config import (
     MERCHANT_MAP,
     NON_ITEM_DESCRIPTION_PATTERNS,
@@ -17,6 +19,36 @@ CLEAN_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "clean")
 PHONE_PATTERN = re.compile(r"\d{3}[\-\s\.]?\d{3}[\-\s\.]?\d{4}")
 URL_PATTERN = re.compile(r"(http|www|\.com|\.net|\.org)", re.IGNORECASE)
 
+# Regexes used in cleaning Merchant Name, applied in order. Later patterns
+# depend on what earlier ones removed (e.g. trailing digits are only trailing
+# once the store number is gone), so they run as a sequence, not one alternation
+MERCHANT_NAME_CLEANUPS = [
+    # Remove anything after *
+    (re.compile(r"\*.*"), ""),
+    # Remove anything after #
+    (re.compile(r"#.*"), ""),
+    # Remove phone numbers
+    (re.compile(r"\b\d{3}[- ]?\d{3}[- ]?\d{3,4}\b"), ""),
+    # Remove dates YYYY-MM-DD
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), ""),
+    # Remove long numeric sequences (5+ digits)
+    (re.compile(r"\d{5,}"), ""),
+    # Remove long trailing alphanumeric tokens (6+ chars)
+    (re.compile(r"\b[A-Za-z0-9]{6,}\b$"), ""),
+    # Remove digits glued to words at end (Fedex37928331)
+    (re.compile(r"(\D)\d+$"), r"\1"),
+    # Remove trailing slash
+    (re.compile(r"/$"), ""),
+]
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# NON_ITEM_DESCRIPTION_PATTERNS combined so each description is scanned once
+NON_ITEM_DESCRIPTION_PATTERN = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in NON_ITEM_DESCRIPTION_PATTERNS),
+    re.IGNORECASE,
+)
+SPECIAL_PURCHASE_PATTERN = re.compile(r"^Sp\s.*")
+
 # For filtering out non-items in the Item Description column
 MISSING_ITEM_VALUES = {"", "N/A", "NA", "NAN", "NONE", "NULL", "<NA>"}
 
@@ -45,17 +77,19 @@ def load_onecard():
 
     file_paths = sorted(file_paths)  # Sort files alphabetically (oldest to newest)
 
-    if not file_paths:
-        if os.path.exists(clean_file_path):
-            print(f"[INFO] No new Onecard raw files. Loading historical clean data.")
-            return pd.read_csv(clean_file_path, low_memory=False)
-            
+    manifest = load_manifest("onecard", clean_file_path)
+
+    if not file_paths and not manifest["partitions"]:
         print(f"[WARNING] No Onecard files found in {RAW_DIR} and no history exists.")
         return pd.DataFrame()
 
-    dfs = []
+    # Only raw files that are new or changed since the last run get cleaned
+    pending = pending_raw_files(manifest, file_paths)
+    if not pending:
+        print(f"[INFO] No new Onecard raw files. Loading historical clean data.")
 
-    for file_path in file_paths:
+    for raw_file in pending:
+        file_path = raw_file["path"]
         df = pd.read_csv(file_path, low_memory=False)
 
         df = clean_onecard(df)
@@ -64,11 +98,9 @@ def load_onecard():
         if year is not None:
             df["Year"] = year
 
-        dfs.append(df)
+        write_partition(manifest, raw_file, df, year)
 
-    combined_df = pd.concat(dfs, ignore_index=True)
-
-    return save_clean_data(combined_df, clean_file_path)
+    return save_clean_data(manifest, clean_file_path, changed=bool(pending))
 # ----------------------------------------------------------------------------
 
 
@@ -138,9 +170,7 @@ def clean_numbers(df):
     # For Subtotal (negative values), create a new column called
     # 'Transaction Type' that classifies negative values as 'Refund' and
     # positive values as 'Purchase'
-    df["Transaction Type"] = df["Subtotal"].apply(
-        lambda price: "Refund" if price < 0 else "Purchase"
-    )
+    df["Transaction Type"] = np.where(df["Subtotal"] < 0, "Refund", "Purchase")
 
     # For Quantity, should be numeric and > 0
     if "Quantity" in df.columns:
@@ -156,65 +186,30 @@ def clean_numbers(df):
 # STEP 2.3 - CLEAN CATEGORIES
 # ---------------------------
 def clean_categories(df):
-    text_cols = ["Category",
-                 "Merchant Name",
-                 "Merchant City",
-                 "Merchant State",
-                 "Item Description",
-    ]
- 
-    # For Merchant Name, remove number/letter weirdness to make names consistent
+    # Merchant Name, Merchant State and Merchant City hold far fewer distinct
+    # values than rows, so each distinct value is normalized once and mapped back
+
+    # For Merchant Name, remove number/letter weirdness to make names consistent,
+    # remove inconsistencies in names, and title case
     # Ex: Safeway #0640, Safeway #1929 -> Safeway
-    df["Merchant Name"] = (
-        df["Merchant Name"]
-        .astype(str)
-        # Remove anything after *
-        .str.replace(r"\*.*", "", regex=True)
-        # Remove anything after #
-        .str.replace(r"#.*", "", regex=True)
-        # Remove phone numbers
-        .str.replace(r"\b\d{3}[- ]?\d{3}[- ]?\d{3,4}\b", "", regex=True)
-        # Remove dates YYYY-MM-DD
-        .str.replace(r"\b\d{4}-\d{2}-\d{2}\b", "", regex=True)
-        # Remove long numeric sequences (5+ digits)
-        .str.replace(r"\d{5,}", "", regex=True)
-        # Remove long trailing alphanumeric tokens (6+ chars)
-        .str.replace(r"\b[A-Za-z0-9]{6,}\b$", "", regex=True)
-        # Remove digits glued to words at end (Fedex37928331)
-        .str.replace(r"(\D)\d+$", r"\1", regex=True)
-        # Remove trailing slash
-        .str.replace(r"/$", "", regex=True)
-        # Collapse whitespace
-        .str.replace(r"\s+", " ", regex=True)
-        .str.strip()
-    )
-            
-    # For Merchant Name, remove inconsistencies in names
     if "Merchant Name" in df.columns:
-        df["Merchant Name"] = df["Merchant Name"].apply(normalize_merchant_name)
+        df["Merchant Name"] = map_unique(df["Merchant Name"].astype(str), clean_merchant_name)
 
     # For Merchant State, convert initials to full city names
     if "Merchant State" in df.columns:
-        df["Merchant State"] = df["Merchant State"].apply(normalize_state)
+        df["Merchant State"] = map_unique(df["Merchant State"], lambda value: title_case(normalize_state(value)))
 
     # Clean up and title case category columns
-    for col in text_cols:
+    for col in ["Category", "Item Description"]:
         if col in df.columns:
             df[col] = (
                 normalize_whitespace(df[col])
                 .str.title()
             )
-    
-    # For Merchant Name, combine all "Sp ___" Merchant Names into a single bucket
-    df["Merchant Name"] = df["Merchant Name"].str.replace(
-        r"^Sp\s.*",
-        "Special Purchase",
-        regex=True
-    )
 
-    # For Merchant City, simple clean using clean_merchant_city helper function
+    # For Merchant City, title case then simple clean using clean_merchant_city helper function
     if "Merchant City" in df.columns:
-        df["Merchant City"] = df["Merchant City"].apply(clean_merchant_city)
+        df["Merchant City"] = map_unique(df["Merchant City"], lambda value: clean_merchant_city(title_case(value)))
 
     return df
 
@@ -236,14 +231,39 @@ def clean_non_items(df):
     item_description = normalize_whitespace(df["Item Description"])
     non_item_mask = item_description.isin(NON_ITEM_DESCRIPTIONS)
 
-    for pattern in NON_ITEM_DESCRIPTION_PATTERNS:
-        non_item_mask |= item_description.str.contains(pattern, case=False, regex=True, na=False)
+    non_item_mask |= item_description.str.contains(NON_ITEM_DESCRIPTION_PATTERN, na=False)
 
     return df[~non_item_mask].copy()
 
 
 # HELPER FUNCTIONS
 # -----------------
+# Apply func to each distinct non-missing value once and map the results back
+# onto every row; missing values stay missing
+def map_unique(series, func):
+    codes, uniques = pd.factorize(series)
+    results = np.array([func(value) for value in uniques] + [pd.NA], dtype=object)
+    mapped = pd.Series(results[codes], index=series.index, dtype=object)
+    return mapped.astype("string")
+
+
+def title_case(value):
+    if pd.isna(value):
+        return pd.NA
+    return WHITESPACE_PATTERN.sub(" ", str(value)).strip().title()
+
+
+def clean_merchant_name(value):
+    for pattern, replacement in MERCHANT_NAME_CLEANUPS:
+        value = pattern.sub(replacement, value)
+    value = WHITESPACE_PATTERN.sub(" ", value).strip()
+
+    value = title_case(normalize_merchant_name(value))
+
+    # Combine all "Sp ___" Merchant Names into a single bucket
+    return SPECIAL_PURCHASE_PATTERN.sub("Special Purchase", value)
+
+
 def normalize_merchant_name(value):
     if pd.isna(value):
         return pd.NA
@@ -300,35 +320,15 @@ def finalize_dataframe(df):
 
     # Create a new column called Merchant Type, labels a row as "Campus" if
     # the purchase comes from the campus store, else "External"
-    df["Merchant Type"] = df["Merchant Name"].apply(
-        lambda x: "Campus" if "Ucsc Bay Tree Bkstore" in str(x) else "External"
-    )
+    is_campus = df["Merchant Name"].astype(str).str.contains("Ucsc Bay Tree Bkstore", regex=False, na=False)
+    df["Merchant Type"] = np.where(is_campus, "Campus", "External")
 
     return df
 # ----------------------------------------------------------------------------
 
 
 # -------------------------------- STEP 4: SAVE ------------------------------
-# Save the cleaned dataset
-def save_clean_data(new_df, output_path):
-    os.makedirs(CLEAN_DIR, exist_ok=True)
-    
-    if os.path.exists(output_path):
-        existing_df = pd.read_csv(output_path, low_memory=False)
-        
-        # Append the brand new rows to the historical rows
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        
-        # Drop exact duplicates so re-running the script doesn't bloat the CSV/Database
-        combined_df = combined_df.drop_duplicates(ignore_index=True)
-    else:
-        # If no history exists, the new data becomes the baseline
-        combined_df = new_df
-
-    combined_df.to_csv(output_path, index=False)
-    
-    # Return the combined master dataframe back up the chain to Firestore
-    return combined_df
+# Saving is shared by every cleaner, see clean_store.save_clean_data
 # ----------------------------------------------------------------------------
 
 # Note: the removed item descriptions are based on high-frequency items from the
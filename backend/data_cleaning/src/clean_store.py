@@ -0,0 +1,369 @@
+# Incremental clean store shared by the four cleaners
+#
+# Every raw file is cleaned once into its own Parquet partition at
+# data/clean/store/{dataset}/{year}/{raw file name}.parquet, and a per-dataset
+# manifest records the content hash, mtime and size of each raw file already
+# processed. A run only re-cleans raw files that are new or whose content
+# changed, writes just those partitions, and never rewrites the rest of history.
+#
+# Rows are deduplicated by fingerprint: a 64-bit hash over each row's
+# normalized non-empty fields, stored with the row in its partition. Each
+# partition keeps every distinct row of its raw file, so a row found in two raw
+# files is stored in both and survives either file being edited or removed.
+# The fingerprints of every stored row are persisted as one sorted array with
+# the number of partitions holding each, so incoming rows are checked against
+# history with a set lookup and no partition has to be loaded for that.
+#
+# The {dataset}_clean.csv export (read by the Firebase/BigQuery uploads and the
+# DuckDB engine) is rebuilt from the partitions only when a partition changed,
+# keeping the first copy of each fingerprint. That rebuild still reads every
+# partition, so a run that changes anything costs time in proportion to the
+# whole history; runs with no new or changed raw files just reuse the export.
+#
+# The legacy partition seeded from a pre-existing export is never released: we
+# can't tell which raw files its rows came from, so a row later corrected out
+# of a raw file is still exported through legacy/history.parquet. Delete the
+# dataset's store folder and its export to re-clean from the raw files alone.
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+CLEAN_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "clean")
+STORE_DIR = os.path.join(CLEAN_DIR, "store")
+
+# Partition seeded from a pre-existing {dataset}_clean.csv, so history cleaned
+# before the store existed is kept even if its raw files are gone
+LEGACY_PARTITION = os.path.join("legacy", "history.parquet")
+
+FINGERPRINT_COLUMN = "_row_fingerprint"
+
+# fingerprints.npy: each stored fingerprint and how many partitions hold it
+FINGERPRINT_DTYPE = np.dtype([("fingerprint", np.uint64), ("partitions", np.uint32)])
+
+
+def _dataset_dir(dataset: str) -> str:
+    return os.path.join(STORE_DIR, dataset)
+
+
+def _manifest_path(dataset: str) -> str:
+    return os.path.join(_dataset_dir(dataset), "manifest.json")
+
+
+def _fingerprints_path(dataset: str) -> str:
+    return os.path.join(_dataset_dir(dataset), "fingerprints.npy")
+
+
+# Load a dataset's manifest. The first time the store is used for a dataset,
+# an existing {dataset}_clean.csv is kept as its legacy partition
+def load_manifest(dataset: str, output_path: str) -> Dict[str, Any]:
+    path = _manifest_path(dataset)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    else:
+        manifest = {"files": {}, "partitions": []}
+    manifest["dataset"] = dataset
+
+    if not manifest["partitions"] and os.path.exists(output_path):
+        print(f"[INFO] Seeding {dataset} clean store from {os.path.basename(output_path)}.")
+        df = pd.read_csv(output_path, low_memory=False)
+        _add_partition(manifest, LEGACY_PARTITION, df)
+        save_manifest(manifest)
+
+    return manifest
+
+
+# Persist the manifest, and the fingerprint set when it was loaded this run.
+# The fingerprints are written first so the count in the manifest never
+# describes a file that isn't on disk yet
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    fingerprints = manifest.get("_fingerprints")
+    if fingerprints is not None:
+        fingerprints_path = _fingerprints_path(manifest["dataset"])
+        os.makedirs(os.path.dirname(fingerprints_path), exist_ok=True)
+        tmp_fingerprints = f"{fingerprints_path}.{os.getpid()}.tmp.npy"
+        stored = np.empty(len(fingerprints), dtype=FINGERPRINT_DTYPE)
+        stored["fingerprint"] = fingerprints
+        stored["partitions"] = manifest["_fingerprint_refs"]
+        np.save(tmp_fingerprints, stored)
+        os.replace(tmp_fingerprints, fingerprints_path)
+        manifest["fingerprint_count"] = int(len(fingerprints))
+
+    path = _manifest_path(manifest["dataset"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({key: value for key, value in manifest.items() if not key.startswith("_")}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Return the raw files that still need cleaning. Files whose mtime and size
+# match the manifest are skipped without hashing; a touched file whose content
+# hash is unchanged only has its manifest entry refreshed
+def pending_raw_files(manifest: Dict[str, Any], file_paths: List[str]) -> List[Dict[str, Any]]:
+    pending = []
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        entry = manifest["files"].get(name)
+
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            continue
+
+        sha256 = file_sha256(file_path)
+        if entry and entry["sha256"] == sha256:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            continue
+
+        pending.append({
+            "path": file_path,
+            "name": name,
+            "sha256": sha256,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        })
+    return pending
+
+
+# Write one raw file's cleaned rows as its partition and record it in the manifest
+def write_partition(manifest: Dict[str, Any], raw_file: Dict[str, Any], df: pd.DataFrame, year: Optional[int]) -> None:
+    partition = os.path.join(str(year) if year is not None else "unknown", f"{raw_file['name']}.parquet")
+
+    # A changed raw file replaces its old partition, so its rows stop counting
+    # as history before the new rows are checked
+    previous = manifest["files"].get(raw_file["name"])
+    if previous:
+        _remove_partition(manifest, previous["partition"])
+
+    rows, duplicates = _add_partition(manifest, partition, df)
+    manifest["files"][raw_file["name"]] = {
+        "sha256": raw_file["sha256"],
+        "mtime_ns": raw_file["mtime_ns"],
+        "size": raw_file["size"],
+        "partition": partition,
+        "rows": rows,
+        "duplicates_dropped": duplicates,
+    }
+
+
+# ---------------------------------- DEDUP ----------------------------------
+# Normalize one column to the text the fingerprint hashes. Numbers compare by
+# value whether they came in as 5, 5.0 or "5"; datetimes and date strings
+# compare the same with or without a midnight time; text is whitespace-trimmed
+def _normalized_column(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+    elif pd.api.types.is_bool_dtype(series):
+        text = series.astype("string")
+    elif pd.api.types.is_numeric_dtype(series):
+        text = pd.Series(np.round(series.astype("float64").to_numpy(), 6), index=series.index).astype("string")
+    else:
+        text = series.astype("string").str.strip()
+        numbers = pd.to_numeric(text, errors="coerce")
+        is_number = numbers.notna()
+        if is_number.any():
+            text = text.mask(is_number, pd.Series(np.round(numbers.to_numpy(dtype="float64"), 6), index=series.index).astype("string"))
+
+    text = text.str.replace(r" 00:00:00$", "", regex=True)
+    return text.fillna("").replace({"nan": "", "<NA>": ""})
+
+
+# Fingerprint each row from its non-empty fields, keyed by column name, so a
+# column that is missing in one file and empty in another doesn't change it
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+
+    row_text = pd.Series("", index=df.index, dtype="string")
+    for column in sorted(c for c in df.columns if c != FINGERPRINT_COLUMN):
+        values = _normalized_column(df[column])
+        row_text = row_text + (f"{column}=" + values + "\x1f").where(values != "", "")
+
+    return pd.util.hash_pandas_object(row_text, index=False).to_numpy(dtype=np.uint64)
+
+
+def _fingerprints(manifest: Dict[str, Any]) -> np.ndarray:
+    """Sorted, unique fingerprints of every stored row, loaded once per run."""
+    if manifest.get("_fingerprints") is not None:
+        return manifest["_fingerprints"]
+
+    path = _fingerprints_path(manifest["dataset"])
+    stored = None
+    if os.path.exists(path):
+        stored = np.load(path)
+        # Files from before partition counts were kept are rebuilt
+        if stored.dtype != FINGERPRINT_DTYPE or len(stored) != manifest.get("fingerprint_count"):
+            stored = None
+
+    if stored is None:
+        _rebuild_fingerprints(manifest)
+    else:
+        manifest["_fingerprints"] = stored["fingerprint"]
+        manifest["_fingerprint_refs"] = stored["partitions"]
+    return manifest["_fingerprints"]
+
+
+# Rebuild the fingerprint counts from the partitions in one pass. Partitions
+# written before rows carried fingerprints are fingerprinted, deduplicated and
+# rewritten once
+def _rebuild_fingerprints(manifest: Dict[str, Any]) -> None:
+    held = [np.empty(0, dtype=np.uint64)]
+    for partition in manifest["partitions"]:
+        path = os.path.join(_dataset_dir(manifest["dataset"]), partition)
+        if FINGERPRINT_COLUMN in pq.read_schema(path).names:
+            held.append(_stored_fingerprints(path))
+        else:
+            held.append(_write_distinct_rows(path, pd.read_parquet(path)))
+
+    fingerprints, refs = np.unique(np.concatenate(held), return_counts=True)
+    manifest["_fingerprints"] = fingerprints
+    manifest["_fingerprint_refs"] = refs.astype(np.uint32)
+
+
+def _stored_fingerprints(path: str) -> np.ndarray:
+    return np.unique(pd.read_parquet(path, columns=[FINGERPRINT_COLUMN])[FINGERPRINT_COLUMN].to_numpy(dtype=np.uint64))
+
+
+# Binary-search sorted fingerprints in the sorted history. Returns each one's
+# insertion slot and whether it is already stored there
+def _lookup_fingerprints(history: np.ndarray, fingerprints: np.ndarray):
+    slots = np.searchsorted(history, fingerprints)
+    found = slots < len(history)
+    found[found] = history[slots[found]] == fingerprints[found]
+    return slots, found
+
+
+# Add (change=1) or release (change=-1) one partition's sorted, unique
+# fingerprints. Counts of stored fingerprints are adjusted in place; only
+# fingerprints new to the store are inserted, and only those no partition
+# holds anymore are deleted
+def _count_fingerprints(manifest: Dict[str, Any], fingerprints: np.ndarray, change: int) -> None:
+    history = manifest["_fingerprints"]
+    refs = manifest["_fingerprint_refs"]
+    slots, found = _lookup_fingerprints(history, fingerprints)
+    hits = slots[found]
+
+    if change > 0:
+        refs[hits] += 1
+        missing = ~found
+        if missing.any():
+            manifest["_fingerprints"] = np.insert(history, slots[missing], fingerprints[missing])
+            manifest["_fingerprint_refs"] = np.insert(refs, slots[missing], 1).astype(np.uint32)
+    else:
+        refs[hits] -= 1
+        released = hits[refs[hits] == 0]
+        if len(released):
+            manifest["_fingerprints"] = np.delete(history, released)
+            manifest["_fingerprint_refs"] = np.delete(refs, released)
+
+
+# Write a frame's distinct rows with their fingerprints to path, returning the
+# sorted fingerprints written
+def _write_distinct_rows(path: str, df: pd.DataFrame) -> np.ndarray:
+    fingerprints = row_fingerprints(df)
+    distinct = ~pd.Series(fingerprints).duplicated().to_numpy()
+    kept = df[distinct].copy()
+    kept[FINGERPRINT_COLUMN] = fingerprints[distinct]
+    _write_parquet(path, kept)
+    return np.sort(fingerprints[distinct])
+
+
+# Store a frame as a partition, keeping each distinct row once. Returns
+# (rows new to the dataset, rows that were already stored or repeated in the frame)
+def _add_partition(manifest: Dict[str, Any], partition: str, df: pd.DataFrame):
+    history = _fingerprints(manifest)
+    fingerprints = _write_distinct_rows(os.path.join(_dataset_dir(manifest["dataset"]), partition), df)
+    _, stored = _lookup_fingerprints(history, fingerprints)
+    new_rows = int(np.count_nonzero(~stored))
+
+    _count_fingerprints(manifest, fingerprints, 1)
+    if partition not in manifest["partitions"]:
+        manifest["partitions"].append(partition)
+    return new_rows, int(len(df) - new_rows)
+
+
+def _remove_partition(manifest: Dict[str, Any], partition: str) -> None:
+    _fingerprints(manifest)
+    path = os.path.join(_dataset_dir(manifest["dataset"]), partition)
+    if os.path.exists(path):
+        _count_fingerprints(manifest, _stored_fingerprints(path), -1)
+        os.remove(path)
+    if partition in manifest["partitions"]:
+        manifest["partitions"].remove(partition)
+# ----------------------------------------------------------------------------
+
+
+def _write_parquet(path: str, df: pd.DataFrame) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+    except Exception:
+        # Cleaned columns can still mix numbers and text; Arrow needs one type
+        # per column, so store mixed columns as strings.
+        _parquet_safe_frame(df).to_parquet(tmp_path, index=False)
+    # Atomic rename so a crashed run never leaves a half-written partition.
+    os.replace(tmp_path, path)
+
+
+def _parquet_safe_frame(df: pd.DataFrame) -> pd.DataFrame:
+    safe = df.copy()
+    for column in safe.columns:
+        if safe[column].dtype == object:
+            safe[column] = safe[column].astype("string")
+    return safe
+
+
+# Concatenate the partitions, keeping the first stored copy of each row
+def _read_partitions(manifest: Dict[str, Any]) -> pd.DataFrame:
+    # Makes sure partitions from before fingerprints were stored are migrated
+    _fingerprints(manifest)
+    frames = [
+        pd.read_parquet(os.path.join(_dataset_dir(manifest["dataset"]), partition))
+        for partition in manifest["partitions"]
+    ]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, ignore_index=True)
+    first_copy = ~combined[FINGERPRINT_COLUMN].duplicated().to_numpy()
+    return combined[first_copy].drop(columns=[FINGERPRINT_COLUMN]).reset_index(drop=True)
+
+
+# -------------------------------- STEP 4: SAVE ------------------------------
+# Combine every partition into the dataset's clean frame. The partitions are
+# only read back when one was added or replaced this run (or the export is
+# missing); otherwise the existing CSV export is returned as is
+def save_clean_data(manifest: Dict[str, Any], output_path: str, changed: bool) -> pd.DataFrame:
+    os.makedirs(CLEAN_DIR, exist_ok=True)
+    if not changed and os.path.exists(output_path):
+        save_manifest(manifest)
+        return pd.read_csv(output_path, low_memory=False)
+
+    # Rows held by several partitions are dropped by fingerprint, not by a
+    # frame-wide drop_duplicates
+    combined_df = _read_partitions(manifest)
+
+    if not combined_df.empty:
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        combined_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+
+    save_manifest(manifest)
+
+    # Return the combined master dataframe back up the chain to Firestore
+    return combined_df
+# ----------------------------------------------------------------------------
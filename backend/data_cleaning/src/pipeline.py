@@ -1,7 +1,18 @@
 # Runs all cleaning scripts and returns structured clean data and where
-# it should be stored in the codebase
+# it should be stored in the codebase. The four cleaners share no state and
+# are CPU-bound pandas/regex work, so they run side by side in a process pool
+import multiprocessing
 import os
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Callable, List, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; peak memory is skipped
+    resource = None
 
 # Import cleaning script files
 from .clean_amazon import load_amazon
@@ -9,6 +20,17 @@ from .clean_cruzbuy import load_cruzbuy
 from .clean_onecard import load_onecard
 from .clean_bookstore import load_bookstore
 
+LOADERS = {
+    "amazon": load_amazon,
+    "cruzbuy": load_cruzbuy,
+    "onecard": load_onecard,
+    "bookstore": load_bookstore,
+}
+
+# Worker processes used for cleaning. 1 cleans in-process, one dataset at a
+# time (useful where process pools aren't available, e.g. serverless).
+CLEANING_MAX_WORKERS = int(os.getenv("CLEANING_MAX_WORKERS") or min(len(LOADERS), os.cpu_count() or 1))
+
 
 # Save each cleaned dataset under backend/data_cleaning/data/clean
 def _clean_csv_paths() -> Dict[str, str]:
@@ -21,8 +43,94 @@ def _clean_csv_paths() -> Dict[str, str]:
     }
 
 
-# Run cleaning scripts and return cleaned dataframes and local CSVs
-def run_data_cleaning(base_dir: Optional[str] = None) -> Dict[str, Any]:
+# Clean one dataset and measure it. Runs inside a pool worker, so it returns
+# stats alongside the frame instead of raising; the parent decides the fallback
+def _clean_dataset(dataset: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        df = LOADERS[dataset]()
+        error = None
+    except Exception as e:
+        df = None
+        error = f"{type(e).__name__}: {e}"
+
+    stats = {
+        "seconds": round(time.perf_counter() - started, 3),
+        "rows": len(df) if df is not None else 0,
+        "frame_mb": round(float(df.memory_usage(deep=True).sum()) / 2**20, 2) if df is not None else 0.0,
+        # ru_maxrss is KiB on Linux; it's this worker's peak, which may include
+        # an earlier dataset if the pool reused the process
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1) if resource else None,
+        "pid": os.getpid(),
+        "error": error,
+    }
+    return {"dataset": dataset, "dataframe": df, "stats": stats}
+
+
+# Last successful clean output for a dataset whose cleaner failed this run, or
+# None when there is none to fall back to
+def _fallback_frame(dataset: str) -> Optional[pd.DataFrame]:
+    path = _clean_csv_paths()[dataset]
+    if os.path.exists(path):
+        return pd.read_csv(path, low_memory=False)
+    return None
+
+
+def _failed_outcome(dataset: str, error: Exception) -> Dict[str, Any]:
+    stats = {"seconds": None, "rows": 0, "frame_mb": 0.0, "peak_rss_mb": None, "pid": None,
+             "error": f"{type(error).__name__}: {error}"}
+    return {"dataset": dataset, "dataframe": None, "stats": stats}
+
+
+# Run every cleaner, in the pool when possible, and report each as it finishes
+def _run_cleaners(report: Callable[[str], None]) -> List[Dict[str, Any]]:
+    outcomes = []
+    pool = None
+    if CLEANING_MAX_WORKERS > 1:
+        try:
+            # Spawn, not fork: this runs on the refresh worker thread and next
+            # to live gRPC channels, and forking a threaded process like that
+            # can deadlock the children
+            pool = ProcessPoolExecutor(
+                max_workers=CLEANING_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            futures = {pool.submit(_clean_dataset, dataset): dataset for dataset in LOADERS}
+        except (OSError, NotImplementedError) as e:
+            # No usable process pool here (missing /dev/shm, sandboxing, ...)
+            print(f"[WARN] Cleaning process pool unavailable, cleaning sequentially: {e}")
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            pool = None
+
+    if pool is not None:
+        with pool:
+            for future in as_completed(futures):
+                dataset = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    # e.g. the worker was killed (out of memory) mid-clean
+                    outcome = _failed_outcome(dataset, e)
+                report(f"cleaned:{dataset}")
+                outcomes.append(outcome)
+        return outcomes
+
+    for dataset in LOADERS:
+        outcomes.append(_clean_dataset(dataset))
+        report(f"cleaned:{dataset}")
+    return outcomes
+
+
+# Run cleaning scripts and return cleaned dataframes, local CSVs and
+# per-dataset timing/memory stats. A dataset whose cleaner fails keeps its last
+# clean CSV so the others still go through; if it has none, the run raises
+# before anything is uploaded. progress, if
+# given, is called with "cleaning" and then "cleaned:<dataset>" as each finishes
+def run_data_cleaning(
+    base_dir: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
     # safely configure the output directory
 
     # vercel prod: route to /tmp
@@ -37,17 +145,39 @@ def run_data_cleaning(base_dir: Optional[str] = None) -> Dict[str, Any]:
     # ensure the directory actually exists before Pandas writes to it
     os.makedirs(output_dir, exist_ok=True)
 
-    amazon_df = load_amazon()
-    cruzbuy_df = load_cruzbuy()
-    onecard_df = load_onecard()
-    bookstore_df = load_bookstore()
+    report = progress or (lambda stage: None)
+    report("cleaning")
+
+    started = time.perf_counter()
+    dataframes = {}
+    stats = {}
+    unrecoverable = {}
+    for outcome in _run_cleaners(report):
+        dataset = outcome["dataset"]
+        stats[dataset] = outcome["stats"]
+        error = outcome["stats"]["error"]
+        if not error:
+            dataframes[dataset] = outcome["dataframe"]
+            continue
+
+        previous = _fallback_frame(dataset)
+        if previous is None:
+            print(f"[ERROR] Cleaning {dataset} failed and it has no previous clean data: {error}")
+            unrecoverable[dataset] = error
+        else:
+            print(f"[ERROR] Cleaning {dataset} failed, keeping its previous clean data: {error}")
+            dataframes[dataset] = previous
+
+    # Never hand an empty stand-in to the uploads; it would overwrite the
+    # dataset's Firestore metadata and summaries
+    if unrecoverable:
+        details = "; ".join(f"{dataset}: {error}" for dataset, error in unrecoverable.items())
+        raise RuntimeError(f"Cleaning failed with no previous clean data to keep ({details})")
 
     return {
-        "dataframes": {
-            "amazon": amazon_df,
-            "cruzbuy": cruzbuy_df,
-            "onecard": onecard_df,
-            "bookstore": bookstore_df,
-        },
+        "dataframes": {dataset: dataframes[dataset] for dataset in LOADERS},
+        "stats": stats,
+        "errors": {dataset: s["error"] for dataset, s in stats.items() if s["error"]},
+        "seconds": round(time.perf_counter() - started, 3),
         "local_paths": _clean_csv_paths(),
     }
@@ -0,0 +1,357 @@
+# Pure pandas aggregations behind the dashboard summaries (top values, top
+# items, spend over time). Kept free of Firebase so they can run and be
+# benchmarked without credentials; summaries.py stores their payloads
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+
+# Used for spend over time to show daily, weekly, monthly, and yearly spend
+SPEND_PERIODS = ("day", "week", "month", "year")
+
+
+def top_counts_payload(
+    *,
+    title: str,
+    items: List[Dict[str, Any]],
+    unit: str = "count",
+) -> Dict[str, Any]:
+    return {
+        "type": "top_counts",
+        "title": title,
+        "unit": unit,
+        "items": items,
+    }
+
+
+def spend_over_time_payload(
+    *,
+    title: str,
+    time_period: str,
+    points: List[Dict[str, Any]],
+    currency: str = "USD",
+) -> Dict[str, Any]:
+    return {
+        "type": "spend_over_time",
+        "title": title,
+        "time_period": time_period,
+        "interval": time_period,  # Backward-compatible field
+        "currency": currency,
+        "points": points,
+    }
+
+
+# Could potentially remove this function once cleaning is complete
+def compute_top_values(
+    df: pd.DataFrame,
+    column: str,
+    n: int = 10,
+    fill_value: str = "unlisted",
+    dropna: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Returns [{"name": <value>, "count": <int>}, ...] for top N values in df[column].
+
+    - fill_value: used when values are NaN/empty (unless dropna=True)
+    - dropna: if True, ignores NaNs instead of replacing
+    """
+    if column not in df.columns:
+        print(f"[WARNING] Column '{column}' not found; skipping top-values.")
+        return []
+
+    s = df[column]
+
+    # Normalize to strings (safe for CSV-derived columns)
+    if dropna:
+        s = s.dropna()
+    else:
+        s = s.fillna(fill_value)
+
+    s = s.astype(str).str.strip()
+    if not dropna:
+        s = s.replace("", fill_value)
+
+    counts = s.value_counts().head(n)
+    return [{"name": name, "count": int(count)} for name, count in counts.items()]
+
+
+def compute_spend_over_time(
+    df: pd.DataFrame,
+    *,
+    date_col: str = "Transaction Date",
+    amount_col: str = "Total Price",
+    time_period: str = "month",
+    interval: Optional[str] = None,  # Backward-compatible alias
+    transaction_type_col: Optional[str] = None,
+    include_refunds: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Returns [{"period": <YYYY|YYYY-MM|YYYY-MM-DD|YYYY-Www>, "spend": <float>}, ...].
+    """
+    chosen_time_period = interval or time_period
+    if chosen_time_period not in {"day", "week", "month", "year"}:
+        raise ValueError("time_period must be one of: day, week, month, year")
+
+    series = compute_spend_over_time_all(
+        df,
+        date_col=date_col,
+        amount_col=amount_col,
+        time_periods=(chosen_time_period,),
+        transaction_type_col=transaction_type_col,
+        include_refunds=include_refunds,
+    )
+    return series.get(chosen_time_period, [])
+
+
+# Handle "$2,353.88" and numeric strings. Numeric columns skip the string round trip
+def parse_amounts(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors="coerce")
+    return pd.to_numeric(
+        series.astype(str).str.replace(r"[\$,]", "", regex=True).str.strip(),
+        errors="coerce",
+    )
+
+
+# Label each day with the period it rolls up into (same labels as compute_spend_over_time)
+def _period_labels(days: pd.DatetimeIndex, time_period: str) -> pd.Index:
+    if time_period == "day":
+        return days.strftime("%Y-%m-%d")
+    if time_period == "week":
+        iso = days.isocalendar()
+        return pd.Index(iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2))
+    if time_period == "year":
+        return days.strftime("%Y")
+    return days.strftime("%Y-%m")
+
+
+def compute_spend_over_time_all(
+    df: pd.DataFrame,
+    *,
+    date_col: str = "Transaction Date",
+    amount_col: str = "Total Price",
+    time_periods=SPEND_PERIODS,
+    transaction_type_col: Optional[str] = None,
+    include_refunds: bool = True,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns {time_period: points} for several time periods at once, with the
+    same points compute_spend_over_time returns for each.
+
+    Dates and amounts are parsed once and aggregated to one total per day;
+    weeks, months and years are rolled up from the daily totals.
+    """
+    if date_col not in df.columns or amount_col not in df.columns:
+        print(f"[WARNING] Missing required columns: {date_col}, {amount_col}")
+        return {}
+
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    amounts = parse_amounts(df[amount_col])
+    keep = dates.notna() & amounts.notna()
+
+    if not include_refunds and transaction_type_col and transaction_type_col in df.columns:
+        keep &= df[transaction_type_col].astype(str).str.lower() != "refund"
+    elif not include_refunds:
+        keep &= amounts >= 0
+
+    if not keep.any():
+        return {}
+
+    daily = amounts[keep].groupby(dates[keep].dt.normalize()).sum()
+
+    series = {}
+    for time_period in time_periods:
+        totals = daily.groupby(_period_labels(daily.index, time_period)).sum().sort_index()
+        series[time_period] = [
+            {"period": period, "spend": round(float(spend), 2)}
+            for period, spend in totals.items()
+        ]
+    return series
+
+
+def build_dataset_summaries(
+    df: pd.DataFrame,
+    *,
+    top_values: Optional[Dict[str, Any]] = None,
+    top_items: Optional[Dict[str, Any]] = None,
+    spend: Optional[Dict[str, Any]] = None,
+    spend_periods=SPEND_PERIODS,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Builds every dashboard summary for one dataset in a single pass and
+    returns {summary_name: payload}.
+
+    top_values: {"summary_name", "title", "column", "n"}
+    top_items:  {"summary_name", "title", "item_col", "price_col", "vendor_col", "n"}
+    spend:      {"date_col", "amount_col", "transaction_type_col", "include_refunds"}
+                saved as spend_over_time_{period} for each of spend_periods
+
+    The frame is only read; no summary copies or mutates it.
+    """
+    summaries = {}
+
+    if top_values:
+        items = compute_top_values(df, column=top_values["column"], n=top_values.get("n", 10))
+        if items:
+            summaries[top_values["summary_name"]] = top_counts_payload(title=top_values["title"], items=items)
+
+    if top_items:
+        items = compute_top_items_detailed(
+            df,
+            item_col=top_items["item_col"],
+            price_col=top_items["price_col"],
+            vendor_col=top_items["vendor_col"],
+            n=top_items.get("n", 20),
+        )
+        if items:
+            summaries[top_items["summary_name"]] = top_counts_payload(title=top_items["title"], items=items)
+
+    if spend:
+        series = compute_spend_over_time_all(
+            df,
+            date_col=spend.get("date_col", "Transaction Date"),
+            amount_col=spend.get("amount_col", "Total Price"),
+            time_periods=spend_periods,
+            transaction_type_col=spend.get("transaction_type_col"),
+            include_refunds=spend.get("include_refunds", True),
+        )
+        for time_period, points in series.items():
+            if points:
+                summaries[f"spend_over_time_{time_period}"] = spend_over_time_payload(
+                    title=f"Spend over time ({time_period})",
+                    time_period=time_period,
+                    points=points,
+                )
+
+    return summaries
+
+
+# Cleans a label column the way compute_top_items_detailed groups it
+# (fill missing, str, strip), working on the distinct values only. Returns
+# (codes, labels) where codes index labels and labels are sorted, so grouping
+# on codes orders groups the same way grouping on the strings would
+def _label_codes(series: pd.Series, fill_value: str):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    labels = pd.Index(uniques).astype(str).str.strip().append(pd.Index([fill_value.strip()]))
+    codes = np.where(codes < 0, len(labels) - 1, codes)
+    label_codes, sorted_labels = pd.factorize(labels, sort=True)
+    return label_codes[codes], np.asarray(sorted_labels, dtype=object)
+
+
+# Year labels ("2024", "Unknown" for unparseable dates), parsing each distinct
+# date value once
+def _year_codes(series: pd.Series):
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    years = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce").dt.year
+    labels = years.fillna(0).astype(int).astype(str).replace("0", "Unknown")
+    labels = pd.Index(labels).append(pd.Index(["Unknown"]))
+    codes = np.where(codes < 0, len(labels) - 1, codes)
+    label_codes, sorted_labels = pd.factorize(labels, sort=True)
+    return label_codes[codes], np.asarray(sorted_labels, dtype=object)
+
+
+# Group items by [item, year, vendor], then calculate count, total spent,
+# and vendor breakdowns
+def compute_top_items_detailed(df, item_col, price_col, vendor_col, date_col=None, n=20):
+    """
+    Returns the n most purchased (item, year) pairs, ranked together across
+    all years; year is "All Time" when no date_col is given:
+    [{"clean_item_name", "year", "count", "total_spent",
+      "vendors": [{"name", "count", "spend"}, ...]}, ...]
+
+    Item, vendor and year labels are cleaned once per distinct value and the
+    frame is grouped once by item/year/vendor. Vendor breakdowns are only
+    built for the top n items. The input frame is never copied.
+    """
+    # Standardize column names (case-insensitive search)
+    cols_lower = {c.lower(): c for c in df.columns}
+    actual_item_col = cols_lower.get(item_col.lower(), item_col)
+    actual_price_col = cols_lower.get(price_col.lower(), price_col)
+    
+    # Safely get the actual vendor column name
+    actual_vendor_col = cols_lower.get(vendor_col.lower(), vendor_col)
+
+    # Safely get the actual date column name if provided
+    actual_date_col = None
+    if date_col:
+        actual_date_col = cols_lower.get(date_col.lower(), date_col)
+
+    if actual_item_col not in df.columns:
+        print(f"[WARNING] Item column '{item_col}' not found; skipping top-items detailed.")
+        return []
+    if actual_price_col not in df.columns:
+        print(f"[WARNING] Price column '{price_col}' not found; skipping top-items detailed.")
+        return []
+
+    # DEBUGGING
+    if df.empty:
+        print(f"[TEST] No data remaining after filtering '{item_col}'. Check your column name!")
+        return []
+
+    # Clean the item, vendor and year labels
+    item_codes, item_names = _label_codes(df[actual_item_col], "")
+    if actual_vendor_col in df.columns:
+        vendor_codes, vendor_names = _label_codes(df[actual_vendor_col], "Unknown")
+    else:
+        vendor_codes, vendor_names = np.zeros(len(df), dtype=np.intp), np.array(["Unknown"], dtype=object)
+    if actual_date_col and actual_date_col in df.columns:
+        year_codes, years = _year_codes(df[actual_date_col])
+    else:
+        year_codes, years = np.zeros(len(df), dtype=np.intp), np.array(["All Time"], dtype=object)
+
+    # Clean the price column
+    prices = parse_amounts(df[actual_price_col]).fillna(0.0).astype(float).to_numpy()
+
+    # Calculate precise stats for every Item + Year + Vendor combination
+    vendor_stats = (
+        pd.DataFrame({"item": item_codes, "year": year_codes, "vendor": vendor_codes, "price": prices})
+        .groupby(["item", "year", "vendor"], sort=True)["price"]
+        .agg(vendor_count="size", vendor_spent="sum")
+        .reset_index()
+    )
+
+    # Roll up to the Item level and keep the top n before expanding vendors
+    item_stats = vendor_stats.groupby(["item", "year"], sort=True).agg(
+        count=("vendor_count", "sum"),
+        total_spent=("vendor_spent", "sum"),
+    )
+    top = item_stats.nlargest(n, "count", keep="first")
+
+    # Vendor breakdown for the surviving items only
+    top_vendors = vendor_stats.merge(top[[]], left_on=["item", "year"], right_index=True)
+    vendors: Dict[tuple, List[Dict[str, Any]]] = {}
+    for item, year, vendor, vendor_count, vendor_spent in zip(
+        top_vendors["item"].tolist(),
+        top_vendors["year"].tolist(),
+        top_vendors["vendor"].tolist(),
+        top_vendors["vendor_count"].tolist(),
+        top_vendors["vendor_spent"].tolist(),
+    ):
+        vendors.setdefault((item, year), []).append(
+            {"name": vendor_names[vendor], "count": vendor_count, "spend": vendor_spent}
+        )
+
+    results = [
+        {
+            "clean_item_name": item_names[item],
+            "year": years[year],
+            "count": count,
+            "total_spent": total_spent,
+            "vendors": vendors[(item, year)],
+        }
+        for (item, year), count, total_spent in zip(
+            top.index.tolist(), top["count"].tolist(), top["total_spent"].tolist()
+        )
+    ]
+
+    # DEBUGGING
+    print(f"\n--- DATA PREVIEW ({item_col}) ---")
+    if results:
+        # Print the top 5 to terminal
+        print(pd.DataFrame(results[:5], columns=["clean_item_name", "count"]).to_string(index=False))
+    else:
+        print("Empty results.")
+    print("-----------------------------------\n")
+
+    return results
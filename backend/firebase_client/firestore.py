@@ -1,7 +1,8 @@
 # Takes the cleaned dataframes and uploads them to Firestore in a structured way
-import re, uuid, pandas as pd
+import os, re, threading, uuid, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import time
 from google.api_core.exceptions import DeadlineExceeded
 from app.firebase import db
@@ -11,6 +12,13 @@ BATCH_LIMIT = 200  # Firestore batch write limit
 MAX_COMMIT_RETRIES = 4
 BASE_RETRY_DELAY_SECONDS = 1.0
 
+# Batch commits kept in flight at once. Halved on every DeadlineExceeded and
+# grown back one at a time after a run of successful commits.
+FIRESTORE_WRITE_CONCURRENCY = int(os.getenv("FIRESTORE_WRITE_CONCURRENCY") or "8")
+
+# Rows converted to Firestore values at a time when writing a dataframe
+ROW_CHUNK_SIZE = 5000
+
 # Helper function to get current UTC time in ISO format for metadata timestamps
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -23,28 +31,60 @@ def _sanitize_field_name(name: str) -> str:
     name = re.sub(r"[^\w\-]", "", name)       # drop weird chars
     return name[:150] if name else "field"
 
-# Firestore doesn't allow NaN/NaT values, so we convert them to None. We also 
-# convert numpy types to native Python types for better compatibility
-def _clean_value(v: Any) -> Any:
-    if pd.isna(v):
-        return None
-
-    if hasattr(v, "item"):
-        try:
-            return v.item()
-        except Exception:
-            pass
-    return v
-
-
-# Commits a Firestore batch with retries for transient DeadlineExceeded errors, 
+# Firestore doesn't allow NaN/NaT values, so we convert them to None. We also
+# convert numpy types to native Python types for better compatibility. Done a
+# whole column at a time: tolist() already yields native Python scalars
+def _column_values(series: pd.Series) -> List[Any]:
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+# Converts a chunk of rows to Firestore-ready dicts column by column
+def _chunk_records(chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+    columns = list(chunk.columns)
+    values = [_column_values(chunk[column]) for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+# Limits concurrent batch commits, adapting the limit to how Firestore copes
+class _CommitThrottle:
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.limit = self.max_in_flight
+        self.in_flight = 0
+        self.successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, committed: bool) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self.successes += int(committed)
+            if self.limit < self.max_in_flight and self.successes >= self.limit:
+                self.limit += 1
+                self.successes = 0
+            self._cond.notify_all()
+
+    def timed_out(self) -> None:
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+
+
+# Commits a Firestore batch with retries for transient DeadlineExceeded errors,
 # using exponential backoff
-def _commit_with_retry(batch, *, timeout: int = 120) -> None:
+def _commit_with_retry(batch, *, timeout: int = 120, throttle: Optional[_CommitThrottle] = None) -> None:
     for attempt in range(1, MAX_COMMIT_RETRIES + 1):
         try:
             batch.commit(timeout=timeout)
             return
         except DeadlineExceeded:
+            if throttle is not None:
+                throttle.timed_out()
             if attempt == MAX_COMMIT_RETRIES:
                 raise
             sleep_s = BASE_RETRY_DELAY_SECONDS * (2 ** (attempt - 1))
@@ -52,6 +92,89 @@ def _commit_with_retry(batch, *, timeout: int = 120) -> None:
             time.sleep(sleep_s)
 
 
+class ConcurrentBatchWriter:
+    """
+    Groups writes into BATCH_LIMIT-op batches and keeps several batch commits
+    in flight at once.
+
+    Use as a context manager; leaving the block commits the last partial batch,
+    waits for every commit and re-raises the first failure. flush() ends the
+    current batch early, so writes queued between two flush() calls (at most
+    BATCH_LIMIT of them) are committed atomically.
+    """
+
+    def __init__(self, max_in_flight: int = FIRESTORE_WRITE_CONCURRENCY, timeout: int = 120):
+        self.timeout = timeout
+        self.ops = 0
+        self._throttle = _CommitThrottle(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=self._throttle.max_in_flight, thread_name_prefix="firestore-commit")
+        self._futures = []
+        self._batch = db.batch()
+        self._batch_ops = 0
+        self._started = time.perf_counter()
+
+    def set(self, doc_ref, data: Dict[str, Any], merge: bool = False) -> None:
+        self._batch.set(doc_ref, data, merge=merge)
+        self._batch_ops += 1
+        self.ops += 1
+        if self._batch_ops >= BATCH_LIMIT:
+            self._submit()
+
+    def delete(self, doc_ref) -> None:
+        self._batch.delete(doc_ref)
+        self._batch_ops += 1
+        self.ops += 1
+        if self._batch_ops >= BATCH_LIMIT:
+            self._submit()
+
+    def flush(self) -> None:
+        if self._batch_ops:
+            self._submit()
+
+    def _submit(self) -> None:
+        batch, self._batch, self._batch_ops = self._batch, db.batch(), 0
+        self._throttle.acquire()
+        self._futures.append(self._pool.submit(self._commit, batch))
+
+        # Surface failures early and don't hold on to finished commits
+        pending = []
+        for future in self._futures:
+            if future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self._futures = pending
+
+    def _commit(self, batch) -> None:
+        committed = False
+        try:
+            _commit_with_retry(batch, timeout=self.timeout, throttle=self._throttle)
+            committed = True
+        finally:
+            self._throttle.release(committed)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            for future in self._futures:
+                future.result()
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self._started
+
+    def __enter__(self) -> "ConcurrentBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
 # Takes a cleaned dataframe and uploads it to Firestore as metadata + row
 # documents
 def df_to_firestore(
@@ -108,33 +231,20 @@ def df_to_firestore(
     # Optimized rows collection
     rows_col = meta_ref.collection("rows")
 
-    # Prepare row data (clean column names and values)
-    df_upload = df.copy()
-    df_upload.columns = [_sanitize_field_name(c) for c in df_upload.columns]
-
-    # Convert dataframes to python dicts
-    records = df_upload.to_dict(orient="records")
-
-    # Write rows in batches
-    batch = db.batch()
-    op_count = 0
-
-    for row_dict in records:
-        doc_ref = rows_col.document()  # auto ID
-
-        doc_data = {k: _clean_value(v) for k, v in row_dict.items()}
-
-        batch.set(doc_ref, doc_data)
-        op_count += 1
-
-        if op_count >= BATCH_LIMIT:
-            _commit_with_retry(batch, timeout=120)
-            batch = db.batch()
-            op_count = 0
-
-    # Commit remaining
-    if op_count > 0:
-        _commit_with_retry(batch, timeout=120)
-
-    print(f"[OK] Stored {len(df)} rows for '{dataset}' in Firestore (upload_id={upload_id})")
+    # Clean column names without copying the frame
+    field_names = {c: _sanitize_field_name(c) for c in df.columns}
+
+    # Stream rows in chunks, converting values a column at a time, and keep
+    # several batch commits in flight
+    with ConcurrentBatchWriter() as writer:
+        for start in range(0, len(df), ROW_CHUNK_SIZE):
+            chunk = df.iloc[start:start + ROW_CHUNK_SIZE].rename(columns=field_names)
+            for doc_data in _chunk_records(chunk):
+                writer.set(rows_col.document(), doc_data)  # auto ID
+
+    rate = writer.ops / writer.seconds if writer.seconds else 0.0
+    print(
+        f"[OK] Stored {len(df)} rows for '{dataset}' in Firestore (upload_id={upload_id}) "
+        f"in {writer.seconds:.1f}s ({rate:,.0f} rows/s)"
+    )
     return upload_id
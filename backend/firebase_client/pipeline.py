@@ -1,10 +1,10 @@
 # Transforms cleaned data into dashboard-ready data stored inside Firestore.
 # Takes cleaned dataframes, stores metadata, then generates summaries usable
 # By the dashboard
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from firebase_client.storage import upload_all_to_storage
 from firebase_client.firestore import df_to_firestore
-from firebase_client.summaries import save_top_values_summary, save_spend_over_time_summary, save_top_items_detailed_summary
+from firebase_client.summaries import SPEND_PERIODS, commit_summary_plan, plan_dataset_summaries
 
 DEFAULT_UPLOAD_IDS = {
     "amazon": "amazon",
@@ -13,8 +13,62 @@ DEFAULT_UPLOAD_IDS = {
     "bookstore": "bookstore",
 }
 
-# Used for spend over time to show daily, weekly, monthly, and yearly spend
-SPEND_PERIODS = ("day", "week", "month", "year")
+# Summaries built for each dataset (see summaries.build_dataset_summaries)
+DATASET_SUMMARIES = {
+    "cruzbuy": {
+        "top_values": {"summary_name": "top_manufacturers_10", "title": "Top manufacturers", "column": "Manufacturer", "n": 10},
+        "top_items": {
+            "summary_name": "top_items_detailed",
+            "title": "Top Purchased Items",
+            "item_col": "Item Description",
+            "price_col": "Total Price",
+            "vendor_col": "Supplier Name",
+            "n": 20,
+        },
+        "spend": {"date_col": "Transaction Date", "amount_col": "Total Price"},
+    },
+    "amazon": {
+        "top_values": {"summary_name": "top_manufacturers_10", "title": "Top manufacturers", "column": "Merchant Name", "n": 10},
+        "top_items": {
+            "summary_name": "top_items_detailed",
+            "title": "Top Purchased Items",
+            "item_col": "Item Description",
+            "price_col": "Subtotal",
+            "vendor_col": "Merchant Name",
+            "n": 20,
+        },
+        "spend": {"date_col": "Transaction Date", "amount_col": "Total Price"},
+    },
+    "onecard": {
+        "top_values": {"summary_name": "top_merchants_10", "title": "Top merchants", "column": "Merchant Name", "n": 10},
+        "top_items": {
+            "summary_name": "top_items_detailed",
+            "title": "Top Purchased Items",
+            "item_col": "Item Description",
+            "price_col": "Subtotal",
+            "vendor_col": "Merchant Name",
+            "n": 20,
+        },
+        "spend": {
+            "date_col": "Transaction Date",
+            "amount_col": "Total Price",
+            "transaction_type_col": "Transaction Type",
+            "include_refunds": True,
+        },
+    },
+    "bookstore": {
+        "top_values": {"summary_name": "top_merchants_10", "title": "Top merchants", "column": "Merchant Name", "n": 10},
+        "top_items": {
+            "summary_name": "top_items_detailed",
+            "title": "Top Purchased Items",
+            "item_col": "Item Description",
+            "price_col": "Quantity",
+            "vendor_col": "Category",
+            "n": 20,
+        },
+        "spend": {"date_col": "Transaction Date", "amount_col": "Total Price"},
+    },
+}
 
 
 def upload_cleaned_data(
@@ -23,10 +77,13 @@ def upload_cleaned_data(
     local_paths: Dict[str, str],
     upload_ids: Optional[Dict[str, str]] = None,
     upload_storage: bool = False,
+    progress: Optional[Callable[[str], None]] = None,
 ) -> Dict[str, Any]:
     # Optionally upload cleaned CSVs to Firebase Storage. Else, set paths 
     # to None. More useful for backups/downloads, not the dashboard itself
     chosen_upload_ids = {**DEFAULT_UPLOAD_IDS, **(upload_ids or {})}
+    report = progress or (lambda stage: None)
+    report("uploads")
     if upload_storage:
         storage_paths = upload_all_to_storage(local_paths)
     else:
@@ -69,156 +126,24 @@ def upload_cleaned_data(
         ),
     }
 
-    # Generate summaries
-    save_top_values_summary(
-        upload_id=upload_ids["cruzbuy"],
-        dataset="cruzbuy",
-        storage_path=storage_paths["cruzbuy"],
-        summary_name="top_manufacturers_10",
-        title="Top manufacturers",
-        df=dataframes["cruzbuy"],
-        column="Manufacturer",
-        n=10,
-    )
-
-    save_top_items_detailed_summary(
-        upload_id=upload_ids["cruzbuy"],
-        dataset="cruzbuy",
-        storage_path=storage_paths["cruzbuy"],
-        summary_name="top_items_detailed",
-        title="Top Purchased Items",
-        df=dataframes["cruzbuy"],
-        item_col="Item Description",     
-        price_col="Total Price",       
-        vendor_col="Supplier Name",
-        n=20
-    )
-
-    save_top_values_summary(
-        upload_id=upload_ids["amazon"],
-        dataset="amazon",
-        storage_path=storage_paths["amazon"],
-        summary_name="top_manufacturers_10",
-        title="Top manufacturers",
-        df=dataframes["amazon"],
-        column="Merchant Name",
-        n=10,
-    )
-
-    save_top_items_detailed_summary(
-        upload_id=upload_ids["amazon"],
-        dataset="amazon",
-        storage_path=storage_paths["amazon"],
-        summary_name="top_items_detailed",
-        title="Top Purchased Items",
-        df=dataframes["amazon"],
-        item_col="Item Description",
-        price_col="Subtotal",
-        vendor_col="Merchant Name",
-        n=20
-    )
-
-    save_top_values_summary(
-        upload_id=upload_ids["onecard"],
-        dataset="onecard",
-        storage_path=storage_paths["onecard"],
-        summary_name="top_merchants_10",
-        title="Top merchants",
-        df=dataframes["onecard"],
-        column="Merchant Name",
-        n=10,
-    )
-
-    save_top_items_detailed_summary(
-        upload_id=upload_ids["onecard"],
-        dataset="onecard",
-        storage_path=storage_paths["onecard"],
-        summary_name="top_items_detailed",
-        title="Top Purchased Items",
-        df=dataframes["onecard"],
-        item_col="Item Description",
-        price_col="Subtotal",
-        vendor_col="Merchant Name",
-        n=20
-    )
-
-    save_top_values_summary(
-        upload_id=upload_ids["bookstore"],
-        dataset="bookstore",
-        storage_path=storage_paths["bookstore"],
-        summary_name="top_merchants_10",
-        title="Top merchants",
-        df=dataframes["bookstore"],
-        column="Merchant Name",
-        n=10,
-    )
-
-    save_top_items_detailed_summary(
-        upload_id=upload_ids["bookstore"],
-        dataset="bookstore",
-        storage_path=storage_paths["bookstore"],
-        summary_name="top_items_detailed",
-        title="Top Purchased Items",
-        df=dataframes["bookstore"],
-        item_col="Item Description",
-        price_col="Quantity",
-        vendor_col="Category",
-        n=20
-    )
-
-    
-    for period in SPEND_PERIODS:
-        save_spend_over_time_summary(
-            upload_id=upload_ids["amazon"],
-            dataset="amazon",
-            storage_path=storage_paths["amazon"],
-            summary_name=f"spend_over_time_{period}",
-            title=f"Spend over time ({period})",
-            df=dataframes["amazon"],
-            date_col="Transaction Date",
-            amount_col="Total Price",
-            time_period=period,
-        )
-
-        save_spend_over_time_summary(
-            upload_id=upload_ids["cruzbuy"],
-            dataset="cruzbuy",
-            storage_path=storage_paths["cruzbuy"],
-            summary_name=f"spend_over_time_{period}",
-            title=f"Spend over time ({period})",
-            df=dataframes["cruzbuy"],
-            date_col="Transaction Date",
-            amount_col="Total Price",
-            time_period=period,
-        )
-
-        save_spend_over_time_summary(
-            upload_id=upload_ids["onecard"],
-            dataset="onecard",
-            storage_path=storage_paths["onecard"],
-            summary_name=f"spend_over_time_{period}",
-            title=f"Spend over time ({period})",
-            df=dataframes["onecard"],
-            date_col="Transaction Date",
-            amount_col="Total Price",
-            time_period=period,
-            transaction_type_col="Transaction Type",
-            include_refunds=True,
-        )
-
-        save_spend_over_time_summary(
-            upload_id=upload_ids["bookstore"],
-            dataset="bookstore",
-            storage_path=storage_paths["bookstore"],
-            summary_name=f"spend_over_time_{period}",
-            title=f"Spend over time ({period})",
-            df=dataframes["bookstore"],
-            date_col="Transaction Date",
-            amount_col="Total Price",
-            time_period=period,
+    # Generate summaries, one pass per dataset, then write them all as one
+    # summary generation
+    report("summaries")
+    summary_plan = {}
+    for dataset, specs in DATASET_SUMMARIES.items():
+        plan_dataset_summaries(
+            summary_plan,
+            upload_id=upload_ids[dataset],
+            dataset=dataset,
+            storage_path=storage_paths[dataset],
+            df=dataframes[dataset],
+            spend_periods=SPEND_PERIODS,
+            **specs,
         )
+    summary_generation = commit_summary_plan(summary_plan)
 
     return {
         "uploaded": storage_paths,
         "firestore_upload_ids": upload_ids,
+        "summary_generation": summary_generation,
     }
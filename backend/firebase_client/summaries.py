@@ -5,161 +5,189 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 from app.firebase import db
+from firebase_client.aggregates import (
+    SPEND_PERIODS,
+    build_dataset_summaries,
+    compute_spend_over_time,
+    compute_top_items_detailed,
+    compute_top_values,
+    spend_over_time_payload,
+    top_counts_payload,
+)
+from firebase_client.firestore import BATCH_LIMIT, ConcurrentBatchWriter
 import pandas as pd
 
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
-# Stores data as summary documents in Firestore
-def save_summary(
-    *,
-    upload_id: str,
-    name: str,
-    payload: Dict[str, Any],
-    dataset: Optional[str] = None,
-    storage_path: Optional[str] = None,
-) -> None:
-    doc_ref = (
+def summary_doc_ref(upload_id: str, name: str):
+    return (
         db.collection("uploads")
         .document(upload_id)
         .collection("summaries")
         .document(name)
     )
 
+
+def summary_document(
+    *,
+    name: str,
+    payload: Dict[str, Any],
+    dataset: Optional[str] = None,
+    storage_path: Optional[str] = None,
+    generated_at: Optional[str] = None,
+    generation: Optional[int] = None,
+) -> Dict[str, Any]:
     doc = {
         "name": name,
         "dataset": dataset,
         "storagePath": storage_path,
-        "generatedAt": utc_now_iso(),
+        "generatedAt": generated_at or utc_now_iso(),
         "payload": payload,
     }
+    if generation is not None:
+        doc["generation"] = generation
+    return doc
 
-    doc_ref.set(doc, merge=True)
-
-def top_counts_payload(
+# Stores data as summary documents in Firestore
+def save_summary(
     *,
-    title: str,
-    items: List[Dict[str, Any]],
-    unit: str = "count",
-) -> Dict[str, Any]:
-    return {
-        "type": "top_counts",
-        "title": title,
-        "unit": unit,
-        "items": items,
-    }
-
+    upload_id: str,
+    name: str,
+    payload: Dict[str, Any],
+    dataset: Optional[str] = None,
+    storage_path: Optional[str] = None,
+) -> None:
+    doc = summary_document(name=name, payload=payload, dataset=dataset, storage_path=storage_path)
+    summary_doc_ref(upload_id, name).set(doc, merge=True)
 
-def spend_over_time_payload(
+# Summary names whose specs can run on this frame: every input column they
+# need is present (see build_dataset_summaries)
+def _valid_summary_names(
+    df: pd.DataFrame,
+    top_values: Optional[Dict[str, Any]],
+    top_items: Optional[Dict[str, Any]],
+    spend: Optional[Dict[str, Any]],
+    spend_periods,
+) -> List[str]:
+    columns = set(df.columns)
+    # compute_top_items_detailed matches its columns case-insensitively
+    lowered_columns = {column.lower() for column in df.columns}
+
+    names = []
+    if top_values and top_values["column"] in columns:
+        names.append(top_values["summary_name"])
+    if top_items and {top_items["item_col"].lower(), top_items["price_col"].lower()} <= lowered_columns:
+        names.append(top_items["summary_name"])
+    if spend and {spend.get("date_col", "Transaction Date"), spend.get("amount_col", "Total Price")} <= columns:
+        names += [f"spend_over_time_{time_period}" for time_period in spend_periods]
+    return names
+
+
+def plan_dataset_summaries(
+    plan: Dict[str, Dict[str, Any]],
     *,
-    title: str,
-    time_period: str,
-    points: List[Dict[str, Any]],
-    currency: str = "USD",
-) -> Dict[str, Any]:
-    return {
-        "type": "spend_over_time",
-        "title": title,
-        "time_period": time_period,
-        "interval": time_period,  # Backward-compatible field
-        "currency": currency,
-        "points": points,
-    }
-
-
-# Could potentially remove this function once cleaning is complete
-def compute_top_values(
+    upload_id: str,
+    dataset: str,
+    storage_path: Optional[str],
     df: pd.DataFrame,
-    column: str,
-    n: int = 10,
-    fill_value: str = "unlisted",
-    dropna: bool = False,
-) -> List[Dict[str, Any]]:
+    top_values: Optional[Dict[str, Any]] = None,
+    top_items: Optional[Dict[str, Any]] = None,
+    spend: Optional[Dict[str, Any]] = None,
+    spend_periods=SPEND_PERIODS,
+) -> Dict[str, Dict[str, Any]]:
     """
-    Returns [{"name": <value>, "count": <int>}, ...] for top N values in df[column].
+    Builds every summary for a dataset with build_dataset_summaries and adds
+    it to plan[upload_id] without writing anything; commit_summary_plan writes
+    the whole plan. Returns {summary_name: payload}.
 
-    - fill_value: used when values are NaN/empty (unless dropna=True)
-    - dropna: if True, ignores NaNs instead of replacing
+    An empty frame is left out of the plan, so the upload keeps its previous
+    summaries.
     """
-    if column not in df.columns:
-        print(f"[WARNING] Column '{column}' not found; skipping top-values.")
-        return []
-
-    s = df[column]
+    if df is None or df.empty:
+        print(f"[WARN] No rows for '{dataset}'; keeping its previous summaries (upload_id={upload_id})")
+        return {}
 
-    # Normalize to strings (safe for CSV-derived columns)
-    if dropna:
-        s = s.dropna()
-    else:
-        s = s.fillna(fill_value)
+    summaries = build_dataset_summaries(
+        df, top_values=top_values, top_items=top_items, spend=spend, spend_periods=spend_periods
+    )
+    plan[upload_id] = {
+        "dataset": dataset,
+        "storage_path": storage_path,
+        "summaries": summaries,
+        # Specs that ran on their columns and came out empty are deleted rather
+        # than left behind from an older generation. A spec whose columns are
+        # missing this run keeps its previous summary
+        "stale": [
+            name
+            for name in _valid_summary_names(df, top_values, top_items, spend, spend_periods)
+            if name not in summaries
+        ],
+    }
+    return summaries
 
-    s = s.astype(str).str.strip()
-    if not dropna:
-        s = s.replace("", fill_value)
 
-    counts = s.value_counts().head(n)
-    return [{"name": name, "count": int(count)} for name, count in counts.items()]
+def _next_summary_generation(upload_ids: List[str]) -> int:
+    refs = [db.collection("uploads").document(upload_id) for upload_id in upload_ids]
+    current = [(snapshot.to_dict() or {}).get("summaryGeneration") or 0 for snapshot in db.get_all(refs)]
+    return max(current, default=0) + 1
 
 
-def compute_spend_over_time(
-    df: pd.DataFrame,
-    *,
-    date_col: str = "Transaction Date",
-    amount_col: str = "Total Price",
-    time_period: str = "month",
-    interval: Optional[str] = None,  # Backward-compatible alias
-    transaction_type_col: Optional[str] = None,
-    include_refunds: bool = True,
-) -> List[Dict[str, Any]]:
-    """
-    Returns [{"period": <YYYY|YYYY-MM|YYYY-MM-DD|YYYY-Www>, "spend": <float>}, ...].
+def commit_summary_plan(plan: Dict[str, Dict[str, Any]]) -> int:
     """
-    chosen_time_period = interval or time_period
-    if chosen_time_period not in {"day", "week", "month", "year"}:
-        raise ValueError("time_period must be one of: day, week, month, year")
-
-    if date_col not in df.columns or amount_col not in df.columns:
-        print(f"[WARNING] Missing required columns: {date_col}, {amount_col}")
-        return []
-
-    tmp = df[[date_col, amount_col] + ([transaction_type_col] if transaction_type_col and transaction_type_col in df.columns else [])].copy()
-    tmp[date_col] = pd.to_datetime(tmp[date_col], errors="coerce")
-
-    # Handle "$2,353.88" and numeric strings.
-    tmp[amount_col] = (
-        tmp[amount_col]
-        .astype(str)
-        .str.replace(r"[\$,]", "", regex=True)
-        .str.strip()
-    )
-    tmp[amount_col] = pd.to_numeric(tmp[amount_col], errors="coerce")
-    tmp = tmp.dropna(subset=[date_col, amount_col])
-
-    if not include_refunds and transaction_type_col and transaction_type_col in tmp.columns:
-        tmp = tmp[tmp[transaction_type_col].astype(str).str.lower() != "refund"]
-    elif not include_refunds:
-        tmp = tmp[tmp[amount_col] >= 0]
-
-    if tmp.empty:
-        return []
-
-    if chosen_time_period == "day":
-        tmp["period"] = tmp[date_col].dt.strftime("%Y-%m-%d")
-    elif chosen_time_period == "week":
-        iso = tmp[date_col].dt.isocalendar()
-        tmp["period"] = iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2)
-    elif chosen_time_period == "year":
-        tmp["period"] = tmp[date_col].dt.strftime("%Y")
-    else:
-        tmp["period"] = tmp[date_col].dt.strftime("%Y-%m")
+    Writes a plan built by plan_dataset_summaries and returns its summary
+    generation number.
 
-    grouped = (
-        tmp.groupby("period", as_index=False)[amount_col]
-        .sum()
-        .sort_values("period")
+    Each upload's summaries, deletions of its stale summaries and its
+    uploads/{upload_id} "summaryGeneration" marker go into one batch, so
+    readers see either all of the previous generation or all of the new one.
+    The batches for different uploads are committed concurrently.
+    """
+    if not plan:
+        return 0
+
+    generation = _next_summary_generation(list(plan))
+    generated_at = utc_now_iso()
+
+    for upload_id, entry in plan.items():
+        ops = len(entry["summaries"]) + len(entry["stale"]) + 1
+        if ops > BATCH_LIMIT:
+            raise ValueError(
+                f"Summaries for upload '{upload_id}' need {ops} writes; one atomic batch allows {BATCH_LIMIT}"
+            )
+
+    with ConcurrentBatchWriter() as writer:
+        for upload_id, entry in plan.items():
+            for name, payload in entry["summaries"].items():
+                writer.set(
+                    summary_doc_ref(upload_id, name),
+                    summary_document(
+                        name=name,
+                        payload=payload,
+                        dataset=entry["dataset"],
+                        storage_path=entry["storage_path"],
+                        generated_at=generated_at,
+                        generation=generation,
+                    ),
+                )
+            for name in entry["stale"]:
+                writer.delete(summary_doc_ref(upload_id, name))
+            writer.set(
+                db.collection("uploads").document(upload_id),
+                {
+                    "summaryGeneration": generation,
+                    "summariesUpdatedAt": generated_at,
+                },
+                merge=True,
+            )
+            writer.flush()
+
+    print(
+        f"[OK] Saved summary generation {generation} for {len(plan)} uploads "
+        f"({writer.ops} writes in {writer.seconds:.1f}s)"
     )
-    return [{"period": row["period"], "spend": round(float(row[amount_col]), 2)} for _, row in grouped.iterrows()]
+    return generation
 
 
 def save_top_values_summary(
@@ -192,94 +220,6 @@ def save_top_values_summary(
         )
 
 
-# Group items by [item, year, vendor], then calculate count, total spent,
-# and vendor breakdowns
-def compute_top_items_detailed(df, item_col, price_col, vendor_col, date_col=None, n=20):
-    df_clean = df.copy()
-    
-    # Standardize column names (case-insensitive search)
-    cols_lower = {c.lower(): c for c in df.columns}
-    actual_item_col = cols_lower.get(item_col.lower(), item_col)
-    actual_price_col = cols_lower.get(price_col.lower(), price_col)
-    
-    # Safely get the actual vendor column name
-    actual_vendor_col = cols_lower.get(vendor_col.lower(), vendor_col)
-
-    # Safely get the actual date column name if provided
-    actual_date_col = None
-    if date_col:
-        actual_date_col = cols_lower.get(date_col.lower(), date_col)
-
-    if actual_item_col not in df_clean.columns:
-        print(f"[WARNING] Item column '{item_col}' not found; skipping top-items detailed.")
-        return []
-    if actual_price_col not in df_clean.columns:
-        print(f"[WARNING] Price column '{price_col}' not found; skipping top-items detailed.")
-        return []
-    
-    # Extract and clean the strings
-    df_clean['clean_item_name'] = df_clean[actual_item_col].fillna("").astype(str).str.strip()
-
-    # Clean the vendor column
-    if actual_vendor_col in df_clean.columns:
-        df_clean['clean_vendor_name'] = df_clean[actual_vendor_col].fillna("Unknown").astype(str).str.strip()
-    else:
-        df_clean['clean_vendor_name'] = "Unknown"
-
-    # Extract the Year from the Date Column
-    if actual_date_col and actual_date_col in df_clean.columns:
-        df_clean['year'] = pd.to_datetime(df_clean[actual_date_col], errors='coerce').dt.year.fillna(0).astype(int).astype(str)
-        df_clean['year'] = df_clean['year'].replace('0', 'Unknown')
-    else:
-        df_clean['year'] = 'All Time'
-
-    # DEBUGGING
-    if df_clean.empty:
-        print(f"[TEST] No data remaining after filtering '{item_col}'. Check your column name!")
-        return []
-
-    # Clean the price column
-    df_clean[actual_price_col] = df_clean[actual_price_col].astype(str).str.replace(r'[\$,]', '', regex=True)
-    df_clean[actual_price_col] = pd.to_numeric(df_clean[actual_price_col], errors='coerce').fillna(0.0)
-
-
-
-    # Calculate precise stats for every Item + Year + Vendor combination
-    vendor_stats = df_clean.groupby(['clean_item_name', 'year', 'clean_vendor_name']).agg(
-        vendor_count=('clean_item_name', 'count'),
-        vendor_spent=(actual_price_col, 'sum')
-    ).reset_index()
-
-    # Pack these stats into a dictionary column so it serializes cleanly to JSON
-    vendor_stats['vendor_dict'] = vendor_stats.apply(
-        lambda r: {
-            "name": r['clean_vendor_name'], 
-            "count": r['vendor_count'], 
-            "spend": r['vendor_spent']
-        },
-        axis=1
-    )
-
-    # Roll up everything to the Item level
-    stats = vendor_stats.groupby(['clean_item_name', 'year']).agg(
-        count=('vendor_count', 'sum'),
-        total_spent=('vendor_spent', 'sum'),
-        vendors=('vendor_dict', list)
-    ).reset_index()
-    
-    stats = stats.sort_values(by='count', ascending=False).head(n)
-
-    # DEBUGGING
-    print(f"\n--- DATA PREVIEW ({item_col}) ---")
-    if not stats.empty:
-        # Print the top 5 to terminal
-        print(stats[['clean_item_name', 'count']].head(5).to_string(index=False))
-    else:
-        print("Empty results.")
-    print("-----------------------------------\n")
-
-    return stats.to_dict(orient='records')
-
 def save_top_items_detailed_summary(
     *,
     upload_id: str,
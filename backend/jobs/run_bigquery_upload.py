@@ -1,8 +1,14 @@
 import os
+import sys
 import pandas as pd
 from google.cloud import bigquery
 from dotenv import load_dotenv
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+BACKEND_ROOT = os.path.abspath(os.path.join(current_dir, ".."))
+if BACKEND_ROOT not in sys.path:
+    sys.path.insert(0, BACKEND_ROOT)
+
 # Load environment variables from the .env file
 load_dotenv()
 
@@ -103,7 +109,6 @@ def main():
               instead of the real production tables. Use this after running
               generate_mock_data.py to prepare a dev BigQuery table for model testing.
     """
-    import sys
     dev_mode = "--dev" in sys.argv
 
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data_cleaning", "data"))
@@ -178,6 +183,21 @@ def main():
         else:
             print(f"[SKIP] File not found: {filename}. Skipping upload for {table_name}.")
 
+    # Rebuild the partitioned canonical table the dashboard queries read from,
+    # then the daily rollup the time-series and period summaries read from.
+    try:
+        from app.bigquery_service import materialize_canonical_table, materialize_rollup_table
+
+        print("\nMaterializing canonical purchases table...")
+        table_id = materialize_canonical_table()
+        print(f"[SUCCESS] Table {table_id} is now live in BigQuery!")
+
+        print("Materializing daily spend rollup...")
+        table_id = materialize_rollup_table()
+        print(f"[SUCCESS] Table {table_id} is now live in BigQuery!")
+    except Exception as e:
+        print(f"[ERROR] Failed to materialize canonical tables: {e}")
+
     print("\nUpload sequence complete.")
 
 
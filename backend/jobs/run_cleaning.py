@@ -5,7 +5,7 @@
 # If this file is ran directly, it just prints row counts
 import os
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 BACKEND_ROOT = os.path.abspath(os.path.join(current_dir, ".."))
@@ -15,16 +15,21 @@ if BACKEND_ROOT not in sys.path:
 from data_cleaning.src.pipeline import run_data_cleaning
 
 
-def run_cleaning() -> Dict[str, Any]:
+def run_cleaning(
+    base_dir: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
     """
     Runs the data cleaning pipeline only.
     """
-    cleaning_result = run_data_cleaning()
+    cleaning_result = run_data_cleaning(base_dir=base_dir, progress=progress)
     dataframes = cleaning_result["dataframes"]
 
     return {
         "dataframes": dataframes,
         "local_paths": cleaning_result["local_paths"],
+        "stats": cleaning_result["stats"],
+        "errors": cleaning_result["errors"],
         "row_counts": {
             "amazon": len(dataframes["amazon"]),
             "cruzbuy": len(dataframes["cruzbuy"]),
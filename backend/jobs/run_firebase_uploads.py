@@ -5,7 +5,7 @@
 # upload success info, and Firestore upload IDs
 import os
 import sys
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 BACKEND_ROOT = os.path.abspath(os.path.join(current_dir, ".."))
@@ -19,13 +19,15 @@ from jobs.run_cleaning import run_cleaning
 def run_firebase_uploads(
     cleaning_result: Optional[Dict[str, Any]] = None,
     upload_ids: Optional[Dict[str, str]] = None,
+    base_dir: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
 ) -> Dict[str, Any]:
     """
     Runs Firebase upload pipeline.
     If cleaning_result is not provided, this job runs cleaning first.
     """
     if cleaning_result is None:
-        cleaning_result = run_cleaning()
+        cleaning_result = run_cleaning(base_dir=base_dir, progress=progress)
 
     dataframes = cleaning_result["dataframes"]
     local_paths = cleaning_result["local_paths"]
@@ -34,6 +36,7 @@ def run_firebase_uploads(
         local_paths=local_paths,
         upload_ids=upload_ids,
         upload_storage=True,
+        progress=progress,
     )
 
     return {
@@ -44,6 +47,8 @@ def run_firebase_uploads(
         "bundle_keys": ["amazon", "cruzbuy", "onecard", "bookstore"],
         "uploaded": upload_result["uploaded"],
         "firestore_upload_ids": upload_result["firestore_upload_ids"],
+        "cleaning_stats": cleaning_result.get("stats"),
+        "cleaning_errors": cleaning_result.get("errors"),
     }
 
 
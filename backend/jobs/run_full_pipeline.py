@@ -1,7 +1,7 @@
 # Runs whole backend pipeline
 import os
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 BACKEND_ROOT = os.path.abspath(os.path.join(current_dir, ".."))
@@ -11,11 +11,15 @@ if BACKEND_ROOT not in sys.path:
 from jobs.run_firebase_uploads import run_firebase_uploads
 
 
-def run_full_pipeline() -> Dict[str, Any]:
+def run_full_pipeline(
+    base_dir: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
     """
     Runs end-to-end pipeline: cleaning + Firebase uploads.
+    progress, if given, is called with the name of each stage as it starts.
     """
-    return run_firebase_uploads()
+    return run_firebase_uploads(base_dir=base_dir, progress=progress)
 
 
 if __name__ == "__main__":
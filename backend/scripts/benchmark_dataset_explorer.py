@@ -0,0 +1,167 @@
+"""
+Benchmark Dataset Explorer paging on a synthetic OneCard-shaped frame.
+
+Compares the old per-request path (copy the frame, coerce the sort column,
+sort_values, slice one page) against the precomputed sort permutations kept on
+the resident dataset entry, and full-column str.contains scans against the
+inverted search index.
+
+Run from the backend/ directory:
+    python -m scripts.benchmark_dataset_explorer --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ensure backend package is importable when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app import dataset_explorer  # noqa: E402 — must come after sys.path tweak
+from app.dataset_index import sort_permutation  # noqa: E402
+
+_PAGE_SIZE = 25
+_SORTS = [
+    ("Transaction Date", "desc"),
+    ("Total Price", "desc"),
+    ("Merchant Name", "asc"),
+    ("Item Description", "asc"),
+]
+_SEARCHES = [("all", "merchant 01"), ("item", "supplies"), ("item", "item 123"), ("merchant", "0042")]
+
+
+def _synthetic_onecard(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Build a cleaned-CSV-shaped OneCard frame (strings, as read_csv returns)."""
+    rng = np.random.default_rng(seed)
+    merchants = np.array([f"Merchant {i:04d}" for i in range(2_000)], dtype=object)
+    categories = np.array([f"Category {i:03d}" for i in range(300)], dtype=object)
+    items = np.array([f"item {i:05d} supplies" for i in range(20_000)], dtype=object)
+    dates = pd.Timestamp("2019-07-01") + pd.to_timedelta(rng.integers(0, 6 * 365, rows), unit="D")
+    prices = rng.gamma(2.0, 120.0, rows).round(2)
+
+    return pd.DataFrame(
+        {
+            "Transaction Date": dates.strftime("%Y-%m-%d"),
+            "Item Description": items[rng.integers(0, len(items), rows)],
+            "Category": categories[rng.integers(0, len(categories), rows)],
+            "Subtotal": prices,
+            "Sales Tax": (prices * 0.0925).round(2),
+            "Total Price": (prices * 1.0925).round(2),
+            "Quantity": rng.integers(1, 20, rows),
+            "Merchant Name": merchants[rng.integers(0, len(merchants), rows)],
+            "Merchant State": np.where(rng.random(rows) < 0.8, "CA", "NY"),
+            "Merchant City": np.where(rng.random(rows) < 0.5, "Santa Cruz", "San Jose"),
+            "Merchant Type": "Retail",
+            "Transaction Type": np.where(rng.random(rows) < 0.97, "Purchase", "Refund"),
+        }
+    )
+
+
+def _legacy_page(df: pd.DataFrame, sort_by: str, sort_dir: str, page: int) -> pd.DataFrame:
+    """The per-request sort the explorer used before sort permutations."""
+    sortable = df.copy()
+    numeric_series = pd.to_numeric(sortable[sort_by], errors="coerce")
+    if numeric_series.notna().any():
+        sortable["_sort_value"] = numeric_series
+    else:
+        sortable["_sort_value"] = sortable[sort_by].fillna("").astype(str).str.lower()
+    sortable = sortable.sort_values(by="_sort_value", ascending=sort_dir != "desc", na_position="last")
+    start = (page - 1) * _PAGE_SIZE
+    return sortable.drop(columns=["_sort_value"]).iloc[start:start + _PAGE_SIZE]
+
+
+def _legacy_search(df: pd.DataFrame, search_field: str, query: str) -> pd.DataFrame:
+    """The per-request str.contains scan the explorer used before the index."""
+    targets = dataset_explorer.SEARCH_FIELD_MAP[search_field] or list(df.columns)
+    mask = pd.Series(False, index=df.index)
+    for column in targets:
+        mask = mask | df[column].fillna("").astype(str).str.lower().str.contains(query, regex=False)
+    return df[mask]
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Building synthetic OneCard frame with {args.rows:,} rows...")
+    raw = _synthetic_onecard(args.rows)
+    normalized = dataset_explorer._normalize_frame(raw, "onecard")
+    entry = {"version": "benchmark", "frame": dataset_explorer._typed_frame(normalized.copy())}
+
+    # Serve the explorer from the synthetic entry instead of Firebase/local CSVs.
+    dataset_explorer._resident_dataset = lambda dataset: entry
+
+    last_page = max(args.rows // _PAGE_SIZE, 1)
+    for sort_by, sort_dir in _SORTS:
+        started = time.perf_counter()
+        sort_permutation(entry, sort_by, sort_dir == "desc")
+        build_ms = (time.perf_counter() - started) * 1000
+
+        for page in (1, last_page):
+            legacy_ms = _timed(lambda: _legacy_page(normalized, sort_by, sort_dir, page), args.repeat)
+            current_ms = _timed(
+                lambda: dataset_explorer.get_dataset_explorer_rows(
+                    dataset="onecard",
+                    page=page,
+                    page_size=_PAGE_SIZE,
+                    search="",
+                    search_field="all",
+                    merchant="",
+                    category="",
+                    start_date="",
+                    end_date="",
+                    sort_by=sort_by,
+                    sort_dir=sort_dir,
+                ),
+                args.repeat,
+            )
+            print(
+                f"{sort_by:>18} {sort_dir:<4} page {page:>6}: "
+                f"legacy {legacy_ms:8.1f} ms | permutation {current_ms:7.1f} ms "
+                f"(one-time build {build_ms:.1f} ms)"
+            )
+
+    for search_field, query in _SEARCHES:
+        search = lambda: dataset_explorer.get_dataset_explorer_rows(
+            dataset="onecard",
+            page=1,
+            page_size=_PAGE_SIZE,
+            search=query,
+            search_field=search_field,
+            merchant="",
+            category="",
+            start_date="",
+            end_date="",
+            sort_by="Transaction Date",
+            sort_dir="desc",
+        )
+        started = time.perf_counter()
+        search()
+        first_ms = (time.perf_counter() - started) * 1000
+
+        legacy_ms = _timed(lambda: _legacy_search(normalized, search_field, query), args.repeat)
+        current_ms = _timed(search, args.repeat)
+        print(
+            f"search {search_field:>8} {query!r:<14}: "
+            f"legacy {legacy_ms:8.1f} ms | index {current_ms:7.1f} ms "
+            f"(first request incl. index build {first_ms:.1f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark compute_top_items_detailed on a synthetic CruzBuy-shaped frame.
+
+Compares the old implementation (copy the frame, clean every row's labels,
+build each vendor dict with a row-wise apply, sort the whole item table)
+against the current one (labels cleaned per distinct value, one groupby,
+nlargest before the vendor breakdown).
+
+Run from the backend/ directory:
+    python -m scripts.benchmark_top_items --rows 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ensure backend package is importable when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from firebase_client.aggregates import compute_top_items_detailed  # noqa: E402 — must come after sys.path tweak
+
+
+def _synthetic_cruzbuy(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Build a cleaned-CSV-shaped CruzBuy frame (strings, as read_csv returns)."""
+    rng = np.random.default_rng(seed)
+    suppliers = np.array([f"Supplier {i:04d}" for i in range(1_500)], dtype=object)
+    manufacturers = np.array([f"Manufacturer {i:03d}" for i in range(400)], dtype=object)
+    items = np.array([f"item {i:05d} lab supplies" for i in range(25_000)], dtype=object)
+    dates = pd.Timestamp("2019-07-01") + pd.to_timedelta(rng.integers(0, 6 * 365, rows), unit="D")
+    prices = rng.gamma(2.0, 150.0, rows).round(2)
+
+    return pd.DataFrame(
+        {
+            "Transaction Date": dates.strftime("%Y-%m-%d"),
+            "Item Description": items[rng.zipf(1.3, rows) % len(items)],
+            "Supplier Name": suppliers[rng.integers(0, len(suppliers), rows)],
+            "Manufacturer": manufacturers[rng.integers(0, len(manufacturers), rows)],
+            "Quantity": rng.integers(1, 20, rows),
+            "Unit Price": prices,
+            "Total Price": pd.Series(prices * 3).map("${:,.2f}".format),
+        }
+    )
+
+
+def _legacy_top_items(df, item_col, price_col, vendor_col, date_col=None, n=20):
+    """The implementation compute_top_items_detailed used before vectorizing."""
+    df_clean = df.copy()
+    df_clean["clean_item_name"] = df_clean[item_col].fillna("").astype(str).str.strip()
+    if vendor_col in df_clean.columns:
+        df_clean["clean_vendor_name"] = df_clean[vendor_col].fillna("Unknown").astype(str).str.strip()
+    else:
+        df_clean["clean_vendor_name"] = "Unknown"
+    if date_col and date_col in df_clean.columns:
+        df_clean["year"] = pd.to_datetime(df_clean[date_col], errors="coerce").dt.year.fillna(0).astype(int).astype(str)
+        df_clean["year"] = df_clean["year"].replace("0", "Unknown")
+    else:
+        df_clean["year"] = "All Time"
+    df_clean[price_col] = df_clean[price_col].astype(str).str.replace(r"[\$,]", "", regex=True)
+    df_clean[price_col] = pd.to_numeric(df_clean[price_col], errors="coerce").fillna(0.0)
+
+    vendor_stats = df_clean.groupby(["clean_item_name", "year", "clean_vendor_name"]).agg(
+        vendor_count=("clean_item_name", "count"),
+        vendor_spent=(price_col, "sum"),
+    ).reset_index()
+    vendor_stats["vendor_dict"] = vendor_stats.apply(
+        lambda r: {"name": r["clean_vendor_name"], "count": r["vendor_count"], "spend": r["vendor_spent"]},
+        axis=1,
+    )
+    stats = vendor_stats.groupby(["clean_item_name", "year"]).agg(
+        count=("vendor_count", "sum"),
+        total_spent=("vendor_spent", "sum"),
+        vendors=("vendor_dict", list),
+    ).reset_index()
+    return stats.sort_values(by="count", ascending=False).head(n).to_dict(orient="records")
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        # compute_top_items_detailed prints a preview on every call
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Building synthetic CruzBuy frame with {args.rows:,} rows...")
+    df = _synthetic_cruzbuy(args.rows)
+
+    cases = [
+        ("all time", ("Item Description", "Total Price", "Supplier Name", None)),
+        ("per year", ("Item Description", "Total Price", "Supplier Name", "Transaction Date")),
+    ]
+    for label, columns in cases:
+        legacy_ms = _timed(lambda: _legacy_top_items(df, *columns, n=args.top), args.repeat)
+        current_ms = _timed(lambda: compute_top_items_detailed(df, *columns, n=args.top), args.repeat)
+        print(
+            f"top {args.top} items {label:<8}: legacy {legacy_ms:8.1f} ms | "
+            f"vectorized {current_ms:7.1f} ms ({legacy_ms / current_ms:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ import { cn } from '../components/ui/utils';
 type DatasetKey = 'amazon' | 'onecard' | 'cruzbuy' | 'bookstore';
 type SearchField = 'all' | 'item' | 'merchant' | 'category';
 type SortDirection = 'asc' | 'desc';
-type ExportFormat = 'csv' | 'xlsx' | 'json';
+type ExportFormat = 'csv' | 'xlsx' | 'json' | 'ndjson';
 
 type DatasetSchemaColumn = {
   canonical_name: string;
@@ -49,8 +49,13 @@ type DatasetExplorerResponse = {
   sort_by: string;
   sort_dir: SortDirection;
   available_filters: {
+    scope: 'all' | 'filtered';
     merchants: string[];
     categories: string[];
+    counts: {
+      merchants: Record<string, number>;
+      categories: Record<string, number>;
+    };
   };
   schema: {
     metric_type: 'currency' | 'quantity' | 'mixed';
@@ -318,6 +323,8 @@ export default function DatasetExplorer() {
                   {(data?.available_filters.categories || []).map((category) => (
                     <SelectItem key={category} value={category}>
                       {category}
+                      {data?.available_filters.counts?.categories[category] !== undefined &&
+                        ` (${data.available_filters.counts.categories[category].toLocaleString()})`}
                     </SelectItem>
                   ))}
                 </SelectContent>
@@ -394,6 +401,7 @@ export default function DatasetExplorer() {
                   <SelectItem value="csv">.csv</SelectItem>
                   <SelectItem value="xlsx">.xlsx</SelectItem>
                   <SelectItem value="json">.json</SelectItem>
+                  <SelectItem value="ndjson">.ndjson</SelectItem>
                 </SelectContent>
               </Select>
               <Button